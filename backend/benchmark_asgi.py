@@ -0,0 +1,221 @@
+"""
+Benchmark de carga: rotas síncronas (WSGI) x rotas assíncronas (ASGI).
+
+Sobe um servidor falso do Semantic Scholar com latência fixa e, contra ele:
+  - WSGI: researchflow.wsgi num servidor com um pool fixo de threads
+    (como um worker gthread do gunicorn), chamando /api/search/;
+  - ASGI: researchflow.asgi no uvicorn (1 worker), chamando /api/async/search/.
+Cada requisição usa um offset diferente, então nenhuma é servida pelo cache de
+resultados; as palavras-chave da consulta são pré-carregadas no cache do
+Gemini, então o Gemini não é chamado.
+
+Uso (requer httpx e uvicorn):
+    python benchmark_asgi.py --requests 400 --concurrency 100 --latency 0.5 --wsgi-threads 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BASE_DIR, 'funcionalidades')
+QUERY = "aprendizado de máquina benchmark"
+
+STUB_PAYLOAD = json.dumps({
+    "total": 1000,
+    "data": [
+        {
+            "title": f"Artigo {i}",
+            "authors": [{"name": "Autor Exemplo"}],
+            "year": 2020,
+            "url": f"https://example.org/{i}",
+            "abstract": "Resumo de exemplo.",
+            "citationCount": i,
+            "journal": {"name": "Journal"},
+        }
+        for i in range(20)
+    ],
+}).encode()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# --- Servidor falso do Semantic Scholar ---
+
+async def _stub_handler(reader, writer, latency):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            await asyncio.sleep(latency)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(STUB_PAYLOAD)).encode() + b"\r\n\r\n" + STUB_PAYLOAD
+            )
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def serve_stub(port: int, latency: float):
+    async def main():
+        server = await asyncio.start_server(lambda r, w: _stub_handler(r, w, latency), '127.0.0.1', port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+# --- Servidor WSGI com pool fixo de threads ---
+
+class PooledWSGIServer(ThreadingMixIn, WSGIServer):
+    request_queue_size = 1024
+    pool = None
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_wsgi(port: int, threads: int):
+    sys.path.insert(0, APP_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'researchflow.settings')
+    from researchflow.wsgi import application
+    PooledWSGIServer.pool = ThreadPoolExecutor(max_workers=threads)
+    httpd = make_server('127.0.0.1', port, application, server_class=PooledWSGIServer, handler_class=QuietHandler)
+    httpd.serve_forever()
+
+
+# --- Cliente de carga ---
+
+def wait_for(port: int, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Servidor na porta {port} não respondeu.")
+
+
+async def run_load(url: str, total: int, concurrency: int) -> dict:
+    import httpx
+    latencies, errors = [], 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                body = {"query": QUERY, "sort_by": "default", "offset": 1000 + i, "pipeline": False}
+                started = time.perf_counter()
+                try:
+                    response = await client.post(url, json=body)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def seed_keywords_cache(db_path: str):
+    """Pré-carrega as palavras-chave da consulta no cache em disco do explorer."""
+    sys.path.insert(0, APP_DIR)
+    from core.cache import TTLCache, normalize_query
+    TTLCache(name="keywords", ttl=3600, db_path=db_path).set(normalize_query(QUERY), QUERY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.5, help="Latência do upstream falso, em segundos.")
+    parser.add_argument('--wsgi-threads', type=int, default=8)
+    parser.add_argument('--serve-stub', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--serve-wsgi', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_stub:
+        return serve_stub(args.serve_stub, args.latency)
+    if args.serve_wsgi:
+        return serve_wsgi(args.serve_wsgi, args.wsgi_threads)
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench-asgi-')
+    keywords_db = os.path.join(tmp_dir, 'keywords.sqlite3')
+    seed_keywords_cache(keywords_db)
+
+    stub_port, wsgi_port, asgi_port = free_port(), free_port(), free_port()
+    env = {
+        **os.environ,
+        'SEMANTIC_SCHOLAR_API_URL': f'http://127.0.0.1:{stub_port}/graph/v1',
+        'SEMANTIC_API_KEY': 'benchmark',
+        'GOOGLE_API_KEY': 'benchmark',
+        'SEMANTIC_SCHOLAR_RPS': '100000',
+        'SEMANTIC_SCHOLAR_BURST': '100000',
+        'KEYWORDS_CACHE_DB': keywords_db,
+        'HTTP_POOL_MAXSIZE': str(max(args.concurrency, 16)),
+        'PDF_CACHE_ENABLED': 'false',
+    }
+    quiet = dict(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    processes = [
+        subprocess.Popen([sys.executable, __file__, '--serve-stub', str(stub_port), '--latency', str(args.latency)], **quiet),
+        subprocess.Popen([sys.executable, __file__, '--serve-wsgi', str(wsgi_port), '--wsgi-threads', str(args.wsgi_threads)], **quiet),
+        subprocess.Popen([sys.executable, '-m', 'uvicorn', 'researchflow.asgi:application', '--port', str(asgi_port),
+                          '--workers', '1', '--no-access-log', '--log-level', 'warning'], cwd=APP_DIR, **quiet),
+    ]
+    try:
+        for port in (stub_port, wsgi_port, asgi_port):
+            wait_for(port)
+        print(f"Upstream com {args.latency * 1000:.0f} ms de latência, {args.requests} requisições, "
+              f"concorrência {args.concurrency}.")
+        for name, url in (
+            (f"WSGI ({args.wsgi_threads} threads)", f'http://127.0.0.1:{wsgi_port}/api/search/'),
+            ("ASGI (1 worker)", f'http://127.0.0.1:{asgi_port}/api/async/search/'),
+        ):
+            result = asyncio.run(run_load(url, args.requests, args.concurrency))
+            print(f"{name:<20} " + "  ".join(f"{k}={v}" for k, v in result.items()))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark de concorrência dos favoritos: escritas (POST /api/favorites/) misturadas
+com leituras autenticadas por token (GET /api/favorites/?fields=url&page_size=50).
+
+Para cada perfil de banco, cria um banco novo (migrate + usuários com token), sobe
+researchflow.wsgi num servidor com um pool fixo de threads (como um worker gthread
+do gunicorn) e mede vazão, latência e erros (ex.: 500 por "database is locked").
+Perfis:
+  - sqlite-default: SQLite com a configuração padrão do Django (SQLITE_TUNING=false);
+  - sqlite-tuned: WAL (SQLITE_WAL=true), synchronous=NORMAL, busy timeout, mmap e transações IMMEDIATE;
+  - postgres: usa as variáveis POSTGRES_* (e DB_POOL) do ambiente; o banco indicado
+    é migrado e recebe usuários de teste, então use um banco descartável.
+
+Uso (requer httpx):
+    python benchmark_favorites.py --requests 2000 --concurrency 50 --write-ratio 0.3
+    python benchmark_favorites.py --profiles postgres --wsgi-threads 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_asgi import APP_DIR, PooledWSGIServer, QuietHandler, free_port, wait_for
+
+PROFILES = {
+    'sqlite-default': {'DB_ENGINE': 'sqlite', 'SQLITE_TUNING': 'false'},
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite', 'SQLITE_TUNING': 'true', 'SQLITE_WAL': 'true'},
+    'postgres': {'DB_ENGINE': 'postgres'},
+}
+
+
+def setup_django():
+    sys.path.insert(0, APP_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'researchflow.settings')
+    import django
+    django.setup()
+
+
+def prepare(users: int):
+    """Migra o banco do perfil e cria os usuários; imprime os tokens na última linha."""
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    call_command('migrate', verbosity=0)
+    tokens = []
+    for i in range(users):
+        user, _ = User.objects.get_or_create(username=f'benchmark-{i}')
+        tokens.append(Token.objects.get_or_create(user=user)[0].key)
+    print(json.dumps(tokens))
+
+
+def serve_wsgi(port: int, threads: int):
+    from concurrent.futures import ThreadPoolExecutor
+    from wsgiref.simple_server import make_server
+    setup_django()
+    from researchflow.wsgi import application
+    PooledWSGIServer.pool = ThreadPoolExecutor(max_workers=threads)
+    httpd = make_server('127.0.0.1', port, application, server_class=PooledWSGIServer, handler_class=QuietHandler)
+    httpd.serve_forever()
+
+
+# --- Cliente de carga ---
+
+def _summary(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 1),
+    }
+
+
+async def run_load(base_url: str, tokens: list, total: int, concurrency: int, write_ratio: float) -> dict:
+    import httpx
+    latencies = {"write": [], "read": []}
+    errors = {"write": 0, "read": 0}
+    counter = iter(range(total))
+    rng = random.Random(42)
+    run_id = int(time.time())
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker():
+            for i in counter:
+                headers = {"Authorization": f"Token {rng.choice(tokens)}"}
+                kind = "write" if rng.random() < write_ratio else "read"
+                started = time.perf_counter()
+                try:
+                    if kind == "write":
+                        body = {
+                            "title": f"Artigo de benchmark {i}",
+                            "url": f"https://example.org/benchmark/{run_id}/{i}",
+                            "authors": "Autor Exemplo",
+                            "year": 2000 + i % 25,
+                            "abstract": "Resumo de exemplo. " * 20,
+                            "citation_count": i,
+                        }
+                        response = await client.post(f"{base_url}/api/favorites/", json=body, headers=headers)
+                    else:
+                        response = await client.get(f"{base_url}/api/favorites/?fields=url&page_size=50", headers=headers)
+                    if response.status_code >= 400:
+                        errors[kind] += 1
+                except httpx.HTTPError:
+                    errors[kind] += 1
+                latencies[kind].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    result = {"requests": total, "seconds": round(elapsed, 2), "req_per_s": round(total / elapsed, 1)}
+    for kind in ("write", "read"):
+        result[f"{kind}s"] = len(latencies[kind])
+        result[f"{kind}_errors"] = errors[kind]
+        result.update({f"{kind}_{key}": value for key, value in _summary(latencies[kind]).items()})
+    return result
+
+
+def run_profile(name: str, args) -> dict:
+    tmp_dir = tempfile.mkdtemp(prefix='bench-favorites-')
+    env = {
+        **os.environ,
+        **PROFILES[name],
+        'SQLITE_PATH': os.path.join(tmp_dir, 'db.sqlite3'),
+        'SEARCH_INDEX_DB': os.path.join(tmp_dir, 'search_index.sqlite3'),
+        'GOOGLE_API_KEY': os.environ.get('GOOGLE_API_KEY', 'benchmark'),
+        'PDF_CACHE_ENABLED': 'false',
+    }
+    prepared = subprocess.run(
+        [sys.executable, __file__, '--prepare', '--users', str(args.users)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+    )
+    tokens = json.loads(prepared.stdout.strip().splitlines()[-1])
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, __file__, '--serve-wsgi', str(port), '--wsgi-threads', str(args.wsgi_threads)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port)
+        return asyncio.run(run_load(f'http://127.0.0.1:{port}', tokens, args.requests, args.concurrency, args.write_ratio))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--write-ratio', type=float, default=0.3, help="Fração das requisições que são escritas.")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--wsgi-threads', type=int, default=16)
+    parser.add_argument('--profiles', default='sqlite-default,sqlite-tuned',
+                        help=f"Perfis separados por vírgula: {', '.join(PROFILES)}.")
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--serve-wsgi', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        return prepare(args.users)
+    if args.serve_wsgi:
+        return serve_wsgi(args.serve_wsgi, args.wsgi_threads)
+
+    print(f"{args.requests} requisições ({args.write_ratio:.0%} escritas), concorrência {args.concurrency}, "
+          f"{args.wsgi_threads} threads WSGI.")
+    for name in args.profiles.split(','):
+        name = name.strip()
+        if name not in PROFILES:
+            parser.error(f"Perfil desconhecido: {name}")
+        result = run_profile(name, args)
+        print(f"{name:<16} " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+from datetime import timedelta
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from analyzer.models import ChatDocument, ChatMessage, ChatSession
+from analyzer.services import chat_with_context
+
+# Sessões de chat no servidor: o documento é enviado uma vez e cada turno traz
+# só a nova mensagem. O histórico guardado é limitado e sessões paradas expiram.
+
+CHAT_SESSION_MAX_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "40"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", str(24 * 3600)))
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", "1000"))
+# Documentos sem sessão só são apagados depois disso: uma sessão pode estar sendo criada com eles
+CHAT_DOCUMENT_GRACE = 60
+
+
+def evict_sessions() -> int:
+    """Remove sessões expiradas, as mais antigas além do limite e documentos sem sessão."""
+    removed, _ = ChatSession.objects.filter(
+        last_used_at__lt=timezone.now() - timedelta(seconds=CHAT_SESSION_TTL)
+    ).delete()
+    overflow = ChatSession.objects.order_by('-last_used_at').values_list('pk', flat=True)[CHAT_SESSION_MAX_SESSIONS:]
+    overflow_ids = list(overflow)
+    if overflow_ids:
+        removed += ChatSession.objects.filter(pk__in=overflow_ids).delete()[0]
+    ChatDocument.objects.filter(
+        sessions__isnull=True, touched_at__lt=timezone.now() - timedelta(seconds=CHAT_DOCUMENT_GRACE)
+    ).delete()
+    return removed
+
+
+def create_session(context: Optional[str] = None, document_hash: Optional[str] = None, mode: str = "full",
+                   owner=None) -> dict:
+    """Cria uma sessão a partir do texto do artigo ou do hash de um documento já enviado."""
+    evict_sessions()
+    with transaction.atomic():
+        if context:
+            sha = hashlib.sha256(context.encode("utf-8")).hexdigest()
+            document, created = ChatDocument.objects.get_or_create(sha256=sha, defaults={"text": context})
+        else:
+            document, created = ChatDocument.objects.filter(sha256=document_hash).first(), False
+            if document is None:
+                return {"error": "Documento não encontrado. Envie o texto do artigo em 'context'."}
+        # Marca o documento como em uso antes de criar a sessão (evict_sessions de outra requisição o poupa)
+        if not created and not ChatDocument.objects.filter(pk=document.pk).update(touched_at=timezone.now()):
+            # Apagado pela limpeza entre a busca e a marcação
+            if not context:
+                return {"error": "Documento não encontrado. Envie o texto do artigo em 'context'."}
+            document = ChatDocument.objects.create(sha256=sha, text=context)
+        session = ChatSession.objects.create(document=document, mode=mode, owner=owner)
+    return {"session_id": str(session.id), "document_hash": document.sha256, "mode": session.mode}
+
+
+def get_session(session_id, user=None) -> Optional[ChatSession]:
+    """
+    Sessão visível para o usuário: as anônimas para qualquer um com o id, as de um
+    usuário só para ele. Sessão de outro usuário é tratada como inexistente.
+    """
+    sessions = ChatSession.objects.select_related('document').filter(pk=session_id)
+    if user is not None and user.is_authenticated:
+        sessions = sessions.filter(Q(owner__isnull=True) | Q(owner=user))
+    else:
+        sessions = sessions.filter(owner__isnull=True)
+    return sessions.first()
+
+
+def session_history(session: ChatSession) -> list:
+    return [{"role": m.role, "content": m.content} for m in session.messages.all()]
+
+
+def _trim_history(session: ChatSession) -> None:
+    stale = session.messages.order_by('-id').values_list('pk', flat=True)[CHAT_SESSION_MAX_MESSAGES:]
+    stale_ids = list(stale)
+    if stale_ids:
+        ChatMessage.objects.filter(pk__in=stale_ids).delete()
+
+
+def post_message(session: ChatSession, content: str) -> dict:
+    """Responde a nova mensagem usando o documento e o histórico guardados na sessão."""
+    messages = session_history(session) + [{"role": "user", "content": content}]
+    result = chat_with_context(session.document.text, messages, mode=session.mode)
+    if "error" in result:
+        return result
+
+    with transaction.atomic():
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, role="user", content=content),
+            ChatMessage(session=session, role="assistant", content=result["response"]),
+        ])
+        _trim_history(session)
+        # auto_now atualiza last_used_at
+        session.save(update_fields=['last_used_at'])
+    return {**result, "session_id": str(session.id)}
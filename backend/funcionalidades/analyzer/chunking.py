@@ -0,0 +1,55 @@
+import re
+from typing import List
+
+# Divisão de artigos longos em trechos, respeitando limites de seção e de
+# página/parágrafo (o extrator de PDF separa páginas com linha em branco).
+
+SECTION_HEADING = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?\s+[A-ZÀ-Ý]"
+    r"|(?:abstract|introduction|related work|background|method(?:s|ology)?|experiments?|results?"
+    r"|discussion|conclusions?|references|resumo|introdução|trabalhos relacionados|metodologia"
+    r"|experimentos|resultados|discussão|conclus(?:ão|ões)|referências)\b)",
+    re.IGNORECASE,
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Quebra um bloco maior que max_chars em fim de frase (ou no meio, em último caso)."""
+    pieces, current = [], ""
+    for sentence in SENTENCE_END.split(block):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_text_into_chunks(text: str, max_chars: int = 20000) -> List[str]:
+    """
+    Agrupa blocos (separados por linha em branco) em trechos de até max_chars.
+    Um título de seção começa um trecho novo quando o atual já passou da metade.
+    """
+    blocks = [b.strip() for b in re.split(r"\n\s*\n", text or "") if b.strip()]
+    chunks, current = [], ""
+    for block in blocks:
+        parts = _split_oversized(block, max_chars) if len(block) > max_chars else [block]
+        for part in parts:
+            starts_section = bool(SECTION_HEADING.match(part))
+            too_big = current and len(current) + len(part) + 2 > max_chars
+            if too_big or (starts_section and len(current) >= max_chars // 2):
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{part}" if current else part
+    if current:
+        chunks.append(current)
+    return chunks
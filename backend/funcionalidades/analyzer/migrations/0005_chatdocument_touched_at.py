@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_chatsession_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatdocument',
+            name='touched_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
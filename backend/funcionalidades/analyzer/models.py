@@ -1,3 +1,70 @@
+import uuid
+
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
+
+class SummaryCache(models.Model):
+    """
+    Resumo estruturado já gerado pelo Gemini, chaveado por
+    (hash do texto, consulta normalizada, modelo, versão do prompt).
+    """
+    text_hash = models.CharField(max_length=64)
+    query_hash = models.CharField(max_length=64)
+    query = models.TextField(blank=True, default='')
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['text_hash', 'query_hash', 'model_name', 'prompt_version'],
+                name='unique_summary_cache_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.text_hash[:12]} / {self.model_name} v{self.prompt_version}"
+
+
+class ChatDocument(models.Model):
+    """Texto de um artigo usado em sessões de chat, guardado uma vez por hash."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Última vez que uma sessão foi criada com ele: a limpeza poupa os recém-usados
+    touched_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({len(self.text)} caracteres)"
+
+
+class ChatSession(models.Model):
+    """Conversa sobre um documento; o histórico fica no servidor."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document = models.ForeignKey(ChatDocument, on_delete=models.CASCADE, related_name='sessions')
+    mode = models.CharField(max_length=10, default='full')
+    # Usuário que criou a sessão; sem login a sessão é anônima e basta conhecer o id
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='chat_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Sessão {self.id} ({self.mode})"
+
+
+class ChatMessage(models.Model):
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=20)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.role}: {self.content[:40]}"
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# Cache em disco de PDFs baixados/enviados e do texto extraído deles.
+# Os arquivos são endereçados pelo SHA-256 dos bytes do PDF; as URLs (a original
+# enviada pelo usuário e a URL final do PDF) apontam para esse hash.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", str(BASE_DIR / ".cache" / "pdf")))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Depois desse tempo a URL é revalidada com ETag/Last-Modified antes de servir do cache
+PDF_CACHE_REVALIDATE_AFTER = float(os.getenv("PDF_CACHE_REVALIDATE_AFTER", str(24 * 3600)))
+
+
+def sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PdfCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = None
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        # Criado sob demanda para não gerar arquivos só por importar o módulo
+        if self._db is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=10, check_same_thread=False)
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    has_text INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    source_url TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS urls_sha256 ON urls (sha256);
+                """
+            )
+            self._db = db
+        return self._db
+
+    def _paths(self, sha: str):
+        folder = self.root / sha[:2]
+        return folder / f"{sha}.pdf", folder / f"{sha}.txt"
+
+    def lookup_url(self, url: str) -> Optional[dict]:
+        """Entrada da URL no cache (com o texto já extraído), ou None."""
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT u.sha256, u.source_url, u.etag, u.last_modified, u.checked_at FROM urls u"
+                " JOIN documents d ON d.sha256 = u.sha256 WHERE u.url = ? AND d.has_text = 1",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "sha256": row[0], "source_url": row[1], "etag": row[2],
+            "last_modified": row[3], "checked_at": row[4],
+        }
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["checked_at"] < PDF_CACHE_REVALIDATE_AFTER
+
+    def get_text(self, sha: str) -> Optional[str]:
+        _, txt_path = self._paths(sha)
+        try:
+            text = txt_path.read_text(encoding="utf-8")
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+            self._conn().execute("UPDATE documents SET last_access = ? WHERE sha256 = ?", (time.time(), sha))
+            self._conn().commit()
+        return text
+
+    def put(self, sha: str, pdf_path, text: str) -> None:
+        """Guarda o PDF (copiado de pdf_path, se informado) e o texto extraído."""
+        pdf_dest, txt_dest = self._paths(sha)
+        pdf_dest.parent.mkdir(parents=True, exist_ok=True)
+        if pdf_path and not pdf_dest.exists():
+            shutil.copyfile(pdf_path, pdf_dest)
+        txt_dest.write_text(text, encoding="utf-8")
+        size = (pdf_dest.stat().st_size if pdf_dest.exists() else 0) + txt_dest.stat().st_size
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO documents (sha256, size, has_text, last_access) VALUES (?, ?, 1, ?)",
+                (sha, size, time.time()),
+            )
+            self._conn().commit()
+        self.evict()
+
+    def put_bytes(self, sha: str, pdf_bytes: bytes, text: str) -> None:
+        pdf_dest, _ = self._paths(sha)
+        pdf_dest.parent.mkdir(parents=True, exist_ok=True)
+        if not pdf_dest.exists():
+            pdf_dest.write_bytes(pdf_bytes)
+        self.put(sha, None, text)
+
+    def link_url(self, url: str, sha: str, source_url: Optional[str] = None,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO urls (url, sha256, source_url, etag, last_modified, checked_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, sha, source_url or url, etag, last_modified, time.time()),
+            )
+            self._conn().commit()
+
+    def mark_revalidated(self, url: str) -> None:
+        with self._lock:
+            self._revalidations += 1
+            self._conn().execute("UPDATE urls SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn().commit()
+
+    def evict(self) -> None:
+        """Remove os documentos menos usados recentemente até caber no limite de tamanho."""
+        with self._lock:
+            db = self._conn()
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for sha, size in db.execute("SELECT sha256, size FROM documents ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(sha):
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+                db.execute("DELETE FROM urls WHERE sha256 = ?", (sha,))
+                db.execute("DELETE FROM documents WHERE sha256 = ?", (sha,))
+                total -= size
+            db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "revalidations": self._revalidations,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "max_bytes": self.max_bytes,
+            }
+            if self._db is not None:
+                count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents").fetchone()
+                stats.update({"documents": count, "bytes": size})
+            return stats
+
+
+pdf_cache = PdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES) if PDF_CACHE_ENABLED else None
@@ -0,0 +1,83 @@
+import hashlib
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import List
+
+from analyzer.chunking import split_text_into_chunks
+from core.cache import TTLCache
+
+# Recuperação local de trechos para o chat: o artigo é dividido uma vez em
+# trechos pequenos e indexado com BM25; a cada pergunta só os trechos mais
+# relevantes vão para o prompt.
+
+CHAT_CHUNK_CHARS = int(os.getenv("CHAT_CHUNK_CHARS", "1500"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Índices por hash do documento (objetos em memória, sem camada em disco)
+index_cache = TTLCache(
+    name="chat_indexes",
+    maxsize=int(os.getenv("CHAT_INDEX_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("CHAT_INDEX_CACHE_TTL", str(6 * 3600))),
+)
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a o e de da do das dos em no na nos nas um uma para por com que se os as ao é ou como mais "
+    "the of and to in for on with by is are was were be as at an or that this from it its which "
+    "what qual quais como onde quando este esta isso artigo paper".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acentos e sem stopwords."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in _TOKEN.findall(text) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    def __init__(self, chunks: List[str]):
+        self.chunks = chunks
+        self.lengths = []
+        self.postings = {}
+        for position, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            self.lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self.postings.setdefault(term, []).append((position, freq))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 5) -> List[int]:
+        """Posições dos k trechos mais relevantes, na ordem em que aparecem no artigo."""
+        scores = Counter()
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, freq in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / (self.avg_length or 1))
+                scores[position] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+        best = [position for position, _ in scores.most_common(k)]
+        if not best:
+            # Pergunta genérica ("do que trata o artigo?"): usa o início do texto
+            best = list(range(min(k, len(self.chunks))))
+        return sorted(best)
+
+
+def get_index(document: str) -> BM25Index:
+    """Índice do documento, construído só na primeira pergunta sobre ele."""
+    key = hashlib.sha256(document.encode("utf-8")).hexdigest()
+    index = index_cache.get(key)
+    if index is None:
+        index = BM25Index(split_text_into_chunks(document, max_chars=CHAT_CHUNK_CHARS))
+        index_cache.set(key, index)
+    return index
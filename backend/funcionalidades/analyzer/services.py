@@ -2,13 +2,25 @@ import os
 import json
 import google.generativeai as genai
 from dotenv import load_dotenv
-import requests
+from core import http_client, ratelimit
+import asyncio
+from asgiref.sync import sync_to_async
 import tempfile
 import re
-from typing import Optional, List, Dict
-from PyPDF2 import PdfReader
+from typing import Optional, List, Dict, Iterator
 import urllib.parse
 from pathlib import Path
+import hashlib
+import io
+import time
+from analyzer.pdf_cache import pdf_cache
+from core.pdf import extract_pdf_text
+from analyzer.summary_cache import get_cached_summary, store_summary
+from analyzer.chunking import split_text_into_chunks
+from analyzer.retrieval import get_index
+from core.cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -16,6 +28,15 @@ load_dotenv(dotenv_path=env_path)
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+SEMANTIC_SCHOLAR_API_URL = os.getenv("SEMANTIC_SCHOLAR_API_URL", "https://api.semanticscholar.org/graph/v1").rstrip('/')
+
+# Limites do download de PDFs
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(100 * 1024 * 1024)))
+PDF_MEMORY_LIMIT = int(os.getenv("PDF_MEMORY_LIMIT", str(16 * 1024 * 1024)))
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+_MIN_CHUNK = 64 * 1024
+_MAX_CHUNK = 1024 * 1024
+_DEFAULT_CHUNK = 256 * 1024
 
 SUMMARY_SCHEMA = {
     "type": "object",
@@ -28,6 +49,37 @@ SUMMARY_SCHEMA = {
     "required": ["problem", "methodology", "results", "conclusion"],
 }
 
+# Versão do prompt de resumo. Altere sempre que o prompt ou o schema mudar:
+# os resumos em cache de versões anteriores deixam de ser usados.
+SUMMARY_PROMPT_VERSION = "2"
+
+# Textos até esse tamanho são resumidos numa chamada só; acima disso, em map-reduce.
+SUMMARY_DIRECT_LIMIT = 60000
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "20000"))
+CHUNK_PROMPT_VERSION = "1"
+_summary_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SUMMARY_MAP_WORKERS", "4")),
+    thread_name_prefix="summary-map",
+)
+# Resumos parciais por trecho (independem da consulta do usuário)
+chunk_summary_cache = TTLCache(
+    name="chunk_summaries",
+    maxsize=int(os.getenv("CHUNK_SUMMARY_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CHUNK_SUMMARY_CACHE_TTL", str(7 * 24 * 3600))),
+    db_path=os.getenv("CHUNK_SUMMARY_CACHE_DB") or None,
+)
+# Resumo em lote: cada item (download + resumo) roda no pool de lote; downloads
+# são limitados por host e as chamadas ao Gemini por um semáforo global.
+SUMMARY_BATCH_MAX_ITEMS = int(os.getenv("SUMMARY_BATCH_MAX_ITEMS", "20"))
+_batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SUMMARY_BATCH_WORKERS", "8")),
+    thread_name_prefix="summary-batch",
+)
+BATCH_PER_HOST = int(os.getenv("SUMMARY_BATCH_PER_HOST", "2"))
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+_gemini_slots = threading.BoundedSemaphore(int(os.getenv("SUMMARY_BATCH_GEMINI_CONCURRENCY", "4")))
+
 def extract_first_json(text: str) -> Optional[str]:
     """Helper de fallback para extrair JSON de texto sujo"""
     start = text.find('{')
@@ -60,6 +112,8 @@ def call_model_structured(model, prompt_text: str, schema: dict) -> str:
     }
 
     try:
+        # Resumos são trabalho de fundo: buscas interativas passam na frente na fila
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.BACKGROUND)
         response = model.generate_content(prompt_text, generation_config=config)
         return response.text
     except Exception as e:
@@ -68,13 +122,7 @@ def call_model_structured(model, prompt_text: str, schema: dict) -> str:
 
 def extract_pdf_text_from_file(file_input) -> Optional[str]:
     try:
-        reader = PdfReader(file_input)
-        parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                parts.append(text)
-        full_text = '\n\n'.join(parts).strip()
+        full_text = extract_pdf_text(file_input)['text']
         return full_text or None
     except Exception as e:
         print(f"Erro ao ler/extrair PDF do arquivo: {e}")
@@ -84,7 +132,7 @@ def get_wayback_machine_url(target_url: str) -> Optional[str]:
     print(f"Tentando resgatar via Wayback Machine: {target_url}")
     try:
         api_url = f"http://archive.org/wayback/available?url={target_url}"
-        resp = requests.get(api_url, timeout=10)
+        resp = http_client.get(api_url, timeout=10)
         data = resp.json()
         if 'archived_snapshots' in data and 'closest' in data['archived_snapshots']:
             snapshot_url = data['archived_snapshots']['closest']['url']
@@ -108,8 +156,9 @@ def resolve_semantic_scholar_url(url: str) -> Optional[str]:
         api_key = os.getenv("SEMANTIC_API_KEY")
         headers = {'x-api-key': api_key} if api_key else {}
         try:
-            api_url = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}?fields=openAccessPdf,url"
-            resp = requests.get(api_url, headers=headers, timeout=10)
+            api_url = f"{SEMANTIC_SCHOLAR_API_URL}/paper/{paper_id}?fields=openAccessPdf,url"
+            ratelimit.acquire("semantic_scholar", api_key)
+            resp = http_client.get(api_url, headers=headers, timeout=10)
             if resp.status_code == 200:
                 data = resp.json()
                 open_access = data.get('openAccessPdf')
@@ -121,12 +170,85 @@ def resolve_semantic_scholar_url(url: str) -> Optional[str]:
             print(f"Erro ao resolver Semantic Scholar URL: {e}")
     return None
 
+def _revalidate_cached_pdf(entry: dict, headers: dict) -> bool:
+    """Pergunta à origem se o PDF mudou (ETag/Last-Modified). True se ainda é válido."""
+    conditional = dict(headers)
+    if entry.get('etag'):
+        conditional['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        conditional['If-Modified-Since'] = entry['last_modified']
+    if len(conditional) == len(headers):
+        return False
+    try:
+        resp = http_client.get(entry['source_url'], headers=conditional, stream=True, timeout=10)
+        resp.close()
+        return resp.status_code == 304
+    except Exception as e:
+        print(f"Falha ao revalidar PDF em cache: {e}")
+        return False
+
+def _stream_pdf_download(resp) -> Optional[tuple]:
+    """
+    Lê o corpo da resposta em blocos dimensionados pelo Content-Length, calculando o
+    SHA-256 durante o download. Aborta cedo se os primeiros bytes não forem de um PDF
+    ou se o tamanho passar de PDF_MAX_BYTES. PDFs pequenos ficam só em memória; acima
+    de PDF_MEMORY_LIMIT o conteúdo vai para um arquivo de spool, lido depois via mmap.
+
+    Retorna (fonte, sha256, caminho_do_spool) ou None. A fonte são bytes ou o caminho.
+    """
+    declared = int(resp.headers.get('Content-Length') or 0)
+    if declared > PDF_MAX_BYTES:
+        print(f"PDF grande demais ({declared} bytes). Limite: {PDF_MAX_BYTES}.")
+        resp.close()
+        return None
+    chunk_size = min(max(declared // 32, _MIN_CHUNK), _MAX_CHUNK) if declared else _DEFAULT_CHUNK
+
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    spool = None
+    head = b''
+    total = 0
+    try:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            if len(head) < 1024:
+                head += chunk[:1024 - len(head)]
+                if len(head) >= 1024 and b'%PDF-' not in head:
+                    print("Conteúdo baixado não é um PDF (assinatura %PDF- ausente). Abortando.")
+                    return None
+            total += len(chunk)
+            if total > PDF_MAX_BYTES:
+                print(f"Download abortado: passou de {PDF_MAX_BYTES} bytes.")
+                return None
+            digest.update(chunk)
+            if spool is None and total > PDF_MEMORY_LIMIT:
+                spool = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=PDF_SPOOL_DIR)
+                spool.write(buffer.getvalue())
+                buffer = None
+            (spool or buffer).write(chunk)
+
+        if b'%PDF-' not in head:
+            print("Conteúdo baixado não é um PDF (assinatura %PDF- ausente).")
+            return None
+        if spool is not None:
+            spool.close()
+            return spool.name, digest.hexdigest(), spool.name
+        return buffer.getvalue(), digest.hexdigest(), None
+    except Exception:
+        if spool is not None:
+            spool.close()
+            os.remove(spool.name)
+        raise
+    finally:
+        resp.close()
+        if spool is not None and not spool.closed:
+            spool.close()
+            os.remove(spool.name)
+
 def fetch_pdf_text_from_url(url: str) -> Optional[str]:
     tmp_path = None
     target_url = url
-    resolved_url = resolve_semantic_scholar_url(url)
-    if resolved_url:
-        target_url = resolved_url
 
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -135,9 +257,25 @@ def fetch_pdf_text_from_url(url: str) -> Optional[str]:
         'Upgrade-Insecure-Requests': '1'
     }
 
+    # 0. Cache em disco: evita baixar e reprocessar o mesmo artigo
+    if pdf_cache is not None:
+        entry = pdf_cache.lookup_url(url)
+        if entry:
+            if pdf_cache.is_fresh(entry) or _revalidate_cached_pdf(entry, headers):
+                text = pdf_cache.get_text(entry['sha256'])
+                if text:
+                    if not pdf_cache.is_fresh(entry):
+                        pdf_cache.mark_revalidated(url)
+                    print(f"Texto do PDF obtido do cache ({entry['sha256'][:12]}).")
+                    return text
+
+    resolved_url = resolve_semantic_scholar_url(url)
+    if resolved_url:
+        target_url = resolved_url
+
     try:
         print(f"Baixando (Tentativa 1): {target_url}")
-        resp = requests.get(target_url, headers=headers, stream=True, timeout=20)
+        resp = http_client.get(target_url, headers=headers, stream=True, timeout=20)
         resp.raise_for_status()
     except Exception as e:
         print(f"Falha no download direto: {e}")
@@ -146,7 +284,7 @@ def fetch_pdf_text_from_url(url: str) -> Optional[str]:
         if wayback_url:
             try:
                 print(f"Baixando do Arquivo: {wayback_url}")
-                resp = requests.get(wayback_url, headers=headers, stream=True, timeout=30)
+                resp = http_client.get(wayback_url, headers=headers, stream=True, timeout=30)
                 resp.raise_for_status()
             except Exception as wb_e:
                 print(f"Falha também no Wayback Machine: {wb_e}")
@@ -182,29 +320,34 @@ def fetch_pdf_text_from_url(url: str) -> Optional[str]:
             if pdf_link:
                 pdf_link = urllib.parse.urljoin(final_url, pdf_link)
                 print(f"Redirecionando para o PDF real: {pdf_link}")
-                resp = requests.get(pdf_link, headers=headers, stream=True, timeout=20)
+                resp = http_client.get(pdf_link, headers=headers, stream=True, timeout=20)
                 resp.raise_for_status()
             else:
                 print("Não foi possível encontrar um link de PDF nesta página HTML.")
                 return None
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    tmp.write(chunk)
-            tmp_path = tmp.name
+        download = _stream_pdf_download(resp)
+        if download is None:
+            return None
+        source, sha, tmp_path = download
+
+        if pdf_cache is not None:
+            # O mesmo PDF pode ter chegado por outra URL
+            text = pdf_cache.get_text(sha)
+            if text:
+                _link_pdf_urls(url, sha, resp)
+                return text
 
         try:
-            reader = PdfReader(tmp_path)
-            parts = []
-            for p in reader.pages:
-                text = p.extract_text()
-                if text:
-                    parts.append(text)
-            
-            full_text = '\n\n'.join(parts).strip()
+            full_text = extract_pdf_text(source)['text']
             if not full_text:
                 return None
+            if pdf_cache is not None:
+                if tmp_path:
+                    pdf_cache.put(sha, tmp_path, full_text)
+                else:
+                    pdf_cache.put_bytes(sha, source, full_text)
+                _link_pdf_urls(url, sha, resp)
             return full_text
             
         except Exception as e:
@@ -219,6 +362,14 @@ def fetch_pdf_text_from_url(url: str) -> Optional[str]:
             try: os.remove(tmp_path)
             except Exception: pass
 
+def _link_pdf_urls(url: str, sha: str, resp) -> None:
+    """Associa a URL pedida e a URL final do PDF ao documento em cache."""
+    etag = resp.headers.get('ETag')
+    last_modified = resp.headers.get('Last-Modified')
+    pdf_cache.link_url(url, sha, source_url=resp.url, etag=etag, last_modified=last_modified)
+    if resp.url != url:
+        pdf_cache.link_url(resp.url, sha, etag=etag, last_modified=last_modified)
+
 def extract_text_content(input_value: str, is_url: bool = False) -> dict:
     text = ""
     if is_url:
@@ -234,82 +385,135 @@ def extract_text_content(input_value: str, is_url: bool = False) -> dict:
 
 def extract_text_from_file_obj(file_obj) -> dict:
     try:
-        reader = PdfReader(file_obj)
-        parts = [p.extract_text() or '' for p in reader.pages]
-        text = '\n\n'.join(parts).strip()
+        pdf_bytes = file_obj.read()
+        sha = hashlib.sha256(pdf_bytes).hexdigest()
+        if pdf_cache is not None:
+            cached = pdf_cache.get_text(sha)
+            if cached:
+                print(f"Texto do upload obtido do cache ({sha[:12]}).")
+                return {"text": cached}
+
+        text = extract_pdf_text(pdf_bytes)['text']
         if not text:
              return {"error": "Não foi possível extrair texto do arquivo PDF."}
+        if pdf_cache is not None:
+            pdf_cache.put_bytes(sha, pdf_bytes, text)
         return {"text": text}
     except Exception as e:
         return {"error": f"Erro ao ler arquivo: {str(e)}"}
 
-def chat_with_context(context_text: str, messages: List[Dict[str, str]]) -> dict:
-    limit_chars = 100000
-    
+CHAT_TOP_K = int(os.getenv("CHAT_TOP_K", "5"))
+# Mensagens anteriores enviadas junto com a pergunta no modo "rag"
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "6"))
+
+def _chat_context(context_text: str, messages: List[Dict[str, str]], mode: str) -> tuple:
+    """Texto do artigo que vai no prompt e histórico considerado, conforme o modo."""
+    if mode == "full":
+        return context_text[:100000], messages
+
+    index = get_index(context_text)
+    user_turns = [m.get('content') or "" for m in messages if m.get('role') == 'user']
+    # A pergunta anterior ajuda em perguntas de seguimento ("e os resultados?")
+    query = " ".join(user_turns[-2:])
+    positions = index.search(query, k=CHAT_TOP_K)
+    excerpts = "\n\n[...]\n\n".join(index.chunks[i] for i in positions)
+    return excerpts, messages[-(CHAT_HISTORY_WINDOW + 1):]
+
+def _build_chat_prompt(context_text: str, messages: List[Dict[str, str]], mode: str) -> str:
+    context_excerpt, history = _chat_context(context_text, messages, mode)
+    source_label = "ARTIGO" if mode == "full" else "TRECHOS DO ARTIGO"
+
     prompt_system = f"""
     Você é um assistente acadêmico especialista.
     Use o seguinte texto extraído de um artigo científico como sua única fonte de verdade para responder à pergunta do usuário.
-    
-    --- INÍCIO DO ARTIGO ---
-    {context_text[:limit_chars]}
-    --- FIM DO ARTIGO ---
+
+    --- INÍCIO DO {source_label} ---
+    {context_excerpt}
+    --- FIM DO {source_label} ---
 
     Instruções:
     1. Responda de forma direta, educada e técnica.
     2. Se a resposta não estiver no contexto, diga que o artigo não menciona isso.
     3. Use formatação Markdown para deixar a resposta clara.
     """
+    # 1. Constrói o histórico da conversa para dar memória à IA
+    chat_history_str = ""
+    for msg in history:
+         # Acessa com get() para evitar erros
+         role = "Usuário" if msg.get('role') == 'user' else "Assistente"
+         chat_history_str += f"{role}: {msg.get('content')}\n"
+
+    # 2. Pega a última pergunta do usuário de forma segura
+    last_user_msg = messages[-1].get('content') if messages and messages[-1].get('role') == 'user' else "Qual é o principal tema deste documento?"
+
+    return f"{prompt_system}\n\nHistórico da Conversa:\n{chat_history_str}\n\nUsuário: {last_user_msg}\nResposta:"
+
+def chat_with_context(context_text: str, messages: List[Dict[str, str]], mode: str = "full") -> dict:
+    """
+    Responde a última pergunta do usuário sobre o artigo.
+    mode="rag" envia só os trechos mais relevantes (BM25) e as últimas mensagens;
+    mode="full" envia o artigo inteiro (até 100000 caracteres) e todo o histórico.
+    """
+    started = time.perf_counter()
     try:
+        full_prompt = _build_chat_prompt(context_text, messages, mode)
         model = genai.GenerativeModel("gemini-2.5-flash") # Usando um modelo estável
-        
-        # 1. Constrói o histórico da conversa para dar memória à IA
-        chat_history_str = ""
-        for msg in messages:
-             # Acessa com get() para evitar erros
-             role = "Usuário" if msg.get('role') == 'user' else "Assistente"
-             chat_history_str += f"{role}: {msg.get('content')}\n"
-        
-        # 2. Pega a última pergunta do usuário de forma segura
-        last_user_msg = messages[-1].get('content') if messages and messages[-1].get('role') == 'user' else "Qual é o principal tema deste documento?"
-        
-        full_prompt = f"{prompt_system}\n\nHistórico da Conversa:\n{chat_history_str}\n\nUsuário: {last_user_msg}\nResposta:"
-        
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.INTERACTIVE)
         response = model.generate_content(full_prompt)
-        return {"response": response.text}
+        return {
+            "response": response.text,
+            "mode": mode,
+            "prompt_chars": len(full_prompt),
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
     except Exception as e:
         # Retorna o erro exato para debugging
         return {"error": str(e)}
 
-def summarize_article_with_gemini(article_text: str, natural_language_query: Optional[str] = None) -> dict:
-    
-    # 1. Instrução de foco
-    instruction_block = ""
+def stream_chat_with_context(context_text: str, messages: List[Dict[str, str]], mode: str = "full") -> Iterator[tuple]:
+    """
+    Versão em streaming do chat_with_context. Gera eventos (nome, dados):
+    ("token", {"text": ...}) a cada pedaço da resposta, depois ("done", {...}) ou ("error", {...}).
+    """
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    try:
+        full_prompt = _build_chat_prompt(context_text, messages, mode)
+        model = genai.GenerativeModel("gemini-2.5-flash")
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.INTERACTIVE)
+        for chunk in model.generate_content(full_prompt, stream=True):
+            text = chunk.text
+            if not text:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            parts.append(text)
+            yield "token", {"text": text}
+    except Exception as e:
+        yield "error", {"error": str(e)}
+        return
+    yield "done", {
+        "response": "".join(parts),
+        "mode": mode,
+        "prompt_chars": len(full_prompt),
+        "time_to_first_token": round(first_token or 0.0, 3),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+def _summary_instruction(natural_language_query: Optional[str]) -> str:
+    """Instrução de foco do resumo (consulta do usuário ou resumo técnico geral)."""
     if natural_language_query and natural_language_query.strip():
-        instruction_block = f"""
+        return f"""
         USER PRIORITY INSTRUCTION: "{natural_language_query}".
         
         You should filter and adapt the fields below to focus on this query.
         If the article does not answer the query, please state this in the conclusion.
         """
-    else:
-        instruction_block = "Generate a comprehensive technical summary."
+    return "Generate a comprehensive technical summary."
 
-    # 2. Prompt principal
-    prompt = f"""
-    You are an expert in scientific synthesis. Analyze the provided text and fill in the requested fields.
-    
-    {instruction_block}
-    
-    Please fill in the fields in Brazilian Portuguese in detail.
-    Article Text:
-    {article_text[:60000]} 
-    """
-    
-    model = genai.GenerativeModel(MODEL_NAME)
-    
-    # CHAMADA COM SCHEMA REFORÇADO
-    raw = call_model_structured(model, prompt, schema=SUMMARY_SCHEMA)
-    
+def _parse_summary(raw: str) -> dict:
+    """Converte a resposta estruturada do modelo nos quatro campos do SUMMARY_SCHEMA."""
     if not raw:
         return {"error": "O modelo retornou uma resposta vazia."}
 
@@ -337,6 +541,213 @@ def summarize_article_with_gemini(article_text: str, natural_language_query: Opt
         'conclusion': _normalize_field(data.get('conclusion')),
     }
 
+def _direct_summary_prompt(article_text: str, natural_language_query: Optional[str]) -> str:
+    """Prompt do resumo em uma única chamada, para textos que cabem no prompt."""
+    return f"""
+    You are an expert in scientific synthesis. Analyze the provided text and fill in the requested fields.
+    
+    {_summary_instruction(natural_language_query)}
+    
+    Please fill in the fields in Brazilian Portuguese in detail.
+    Article Text:
+    {article_text[:SUMMARY_DIRECT_LIMIT]} 
+    """
+
+def _summarize_chunk(chunk: str, index: int, total: int) -> str:
+    """Etapa "map": resumo em texto corrido de um trecho. Não depende da consulta do usuário."""
+    cache_key = (hashlib.sha256(chunk.encode('utf-8')).hexdigest(), MODEL_NAME, CHUNK_PROMPT_VERSION)
+    cached = chunk_summary_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = f"""
+    You are an expert in scientific synthesis. The text below is part {index} of {total} of a scientific article.
+    Write a dense summary of this part in Brazilian Portuguese (at most 400 words), keeping:
+    the research problem, methods and datasets, metrics and numeric results, and conclusions.
+    Use only information present in this part. If it only contains references or appendices, say so in one sentence.
+
+    Article Part:
+    {chunk}
+    """
+    try:
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.BACKGROUND)
+        model = genai.GenerativeModel(MODEL_NAME)
+        response = model.generate_content(prompt, generation_config={"temperature": 0.2})
+        summary = response.text.strip()
+    except Exception as e:
+        print(f"Erro ao resumir o trecho {index}/{total}: {e}")
+        return ""
+    if summary:
+        chunk_summary_cache.set(cache_key, summary)
+    return summary
+
+def _map_reduce_summary_prompt(article_text: str, natural_language_query: Optional[str]) -> tuple:
+    """
+    Resumo de documentos longos: divide o texto em trechos (seções/páginas), resume
+    os trechos em paralelo e monta o prompt que combina os resumos parciais nos campos
+    do SUMMARY_SCHEMA. Os resumos dos trechos ficam em cache, então mudar a consulta só
+    refaz a etapa final. Retorna (prompt, completo): prompt é None se nenhum trecho pôde
+    ser resumido, e completo é False se algum trecho falhou (o resumo não vai para o cache).
+    """
+    chunks = split_text_into_chunks(article_text, max_chars=SUMMARY_CHUNK_CHARS)
+    print(f"Texto longo ({len(article_text)} caracteres): resumindo {len(chunks)} trechos em paralelo.")
+    partials = list(_summary_executor.map(
+        _summarize_chunk, chunks, range(1, len(chunks) + 1), [len(chunks)] * len(chunks)
+    ))
+    if not any(partials):
+        return None, False
+    failed = sum(1 for partial in partials if not partial)
+    if failed:
+        print(f"{failed} de {len(chunks)} trechos não foram resumidos; o resumo final não será guardado no cache.")
+
+    joined = "\n\n".join(
+        f"[Parte {i}/{len(chunks)}]\n{partial}" for i, partial in enumerate(partials, start=1) if partial
+    )
+    prompt = f"""
+    You are an expert in scientific synthesis. The text below contains summaries of consecutive parts
+    of a single scientific article, in order. Combine them and fill in the requested fields for the whole article.
+    
+    {_summary_instruction(natural_language_query)}
+    
+    Please fill in the fields in Brazilian Portuguese in detail.
+    Part Summaries:
+    {joined}
+    """
+    return prompt, not failed
+
+def _summary_prompt(article_text: str, natural_language_query: Optional[str]) -> tuple:
+    """Retorna (prompt, completo); veja _map_reduce_summary_prompt."""
+    if len(article_text) > SUMMARY_DIRECT_LIMIT:
+        return _map_reduce_summary_prompt(article_text, natural_language_query)
+    return _direct_summary_prompt(article_text, natural_language_query), True
+
+def _completed_fields(buffer: str, pending: list) -> list:
+    """Campos do JSON parcial cujo valor (string) já chegou por completo."""
+    decoder = json.JSONDecoder()
+    completed = []
+    for field in pending:
+        match = re.search(r'[{,]\s*"%s"\s*:\s*' % field, buffer)
+        if not match:
+            continue
+        try:
+            value, _ = decoder.raw_decode(buffer, match.end())
+        except json.JSONDecodeError:
+            continue
+        completed.append((field, value))
+    return completed
+
+def stream_summary_with_gemini(article_text: str, natural_language_query: Optional[str] = None) -> Iterator[tuple]:
+    """
+    Versão em streaming do summarize_article_with_gemini. Gera eventos (nome, dados):
+    ("field", {"name", "value"}) assim que cada campo do SUMMARY_SCHEMA termina de chegar,
+    depois ("done", resumo completo) ou ("error", {...}).
+    """
+    cached = get_cached_summary(article_text, natural_language_query, MODEL_NAME, SUMMARY_PROMPT_VERSION)
+    if cached is not None:
+        for field in SUMMARY_SCHEMA["required"]:
+            yield "field", {"name": field, "value": cached.get(field, "")}
+        yield "done", cached
+        return
+
+    if len(article_text) > SUMMARY_DIRECT_LIMIT:
+        yield "status", {"stage": "map", "message": "Texto longo: resumindo as partes do artigo."}
+    prompt, complete = _summary_prompt(article_text, natural_language_query)
+    if prompt is None:
+        yield "error", {"error": "O modelo retornou uma resposta vazia."}
+        return
+
+    config = {
+        "max_output_tokens": 8192,
+        "temperature": 0.2,
+        "response_mime_type": "application/json",
+        "response_schema": SUMMARY_SCHEMA,
+    }
+    pending = list(SUMMARY_SCHEMA["required"])
+    buffer = ""
+    try:
+        # Resumo é trabalho de fundo em qualquer transporte (JSON, stream, ASGI); só o chat é interativo
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.BACKGROUND)
+        model = genai.GenerativeModel(MODEL_NAME)
+        for chunk in model.generate_content(prompt, generation_config=config, stream=True):
+            buffer += chunk.text or ""
+            for field, value in _completed_fields(buffer, pending):
+                pending.remove(field)
+                yield "field", {"name": field, "value": value}
+    except Exception as e:
+        yield "error", {"error": str(e)}
+        return
+
+    summary = _parse_summary(buffer)
+    if "error" in summary:
+        yield "error", summary
+        return
+    for field in pending:
+        yield "field", {"name": field, "value": summary[field]}
+    if complete:
+        store_summary(article_text, natural_language_query, MODEL_NAME, SUMMARY_PROMPT_VERSION, summary)
+    yield "done", summary
+
+def summarize_article_with_gemini(article_text: str, natural_language_query: Optional[str] = None) -> dict:
+    cached = get_cached_summary(article_text, natural_language_query, MODEL_NAME, SUMMARY_PROMPT_VERSION)
+    if cached is not None:
+        print("Resumo obtido do cache.")
+        return cached
+
+    prompt, complete = _summary_prompt(article_text, natural_language_query)
+    if prompt is None:
+        return {"error": "O modelo retornou uma resposta vazia."}
+
+    model = genai.GenerativeModel(MODEL_NAME)
+    # CHAMADA COM SCHEMA REFORÇADO
+    summary = _parse_summary(call_model_structured(model, prompt, schema=SUMMARY_SCHEMA))
+    # Resumo montado sem algum trecho (429, timeout...) não fica no cache: a próxima vez refaz só o que faltou
+    if complete and "error" not in summary:
+        store_summary(article_text, natural_language_query, MODEL_NAME, SUMMARY_PROMPT_VERSION, summary)
+    return summary
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urllib.parse.urlsplit(url).netloc.lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(BATCH_PER_HOST)
+        return _host_semaphores[host]
+
+def _summarize_batch_item(input_value: str, is_url: bool, natural_language_query: Optional[str]) -> dict:
+    """Um item do lote: baixa (respeitando o limite por host) e resume (respeitando o limite do Gemini)."""
+    if is_url:
+        with _host_semaphore(input_value):
+            text = fetch_pdf_text_from_url(input_value)
+        if not text:
+            return {"error": "Falha ao baixar/ler o PDF."}
+    else:
+        text = input_value or ''
+
+    if not text.strip():
+        return {"error": "Texto vazio para resumir."}
+
+    with _gemini_slots:
+        return summarize_article_with_gemini(text, natural_language_query=natural_language_query)
+
+def summarize_batch(items: List[Dict], natural_language_query: Optional[str] = None) -> Iterator[dict]:
+    """
+    Resume vários artigos ao mesmo tempo. Cada item é {"input_value", "is_url"}.
+    Gera um resultado por item na ordem em que terminam: {"index", "input_value", "result"}.
+    Downloads e resumos já em cache voltam sem custo, então o lote leva
+    aproximadamente o tempo do artigo mais lento.
+    """
+    futures = {
+        _batch_executor.submit(_summarize_batch_item, item["input_value"], item.get("is_url", False),
+                               natural_language_query): index
+        for index, item in enumerate(items)
+    }
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"error": str(e)}
+        yield {"index": index, "input_value": items[index]["input_value"], "result": result}
+
 def summarize_article(input_value: str, is_url: bool = False, natural_language_query: Optional[str] = None) -> dict:
     if is_url:
         text = fetch_pdf_text_from_url(input_value)
@@ -349,4 +760,100 @@ def summarize_article(input_value: str, is_url: bool = False, natural_language_q
         return {"error": "Texto vazio para resumir."}
     
     # Repassa a query para a função do Gemini
-    return summarize_article_with_gemini(text, natural_language_query=natural_language_query)
\ No newline at end of file
+    return summarize_article_with_gemini(text, natural_language_query=natural_language_query)
+
+def stream_summarize_article(input_value: str, is_url: bool = False, natural_language_query: Optional[str] = None) -> Iterator[tuple]:
+    """Mesmo fluxo do summarize_article, emitindo eventos de progresso e os campos do resumo."""
+    if is_url:
+        yield "status", {"stage": "download", "message": "Baixando o PDF."}
+        text = fetch_pdf_text_from_url(input_value)
+        if not text:
+            yield "error", {"error": "Falha ao baixar/ler o PDF."}
+            return
+    else:
+        text = input_value or ''
+
+    if not text.strip():
+        yield "error", {"error": "Texto vazio para resumir."}
+        return
+
+    yield "status", {"stage": "summarize", "message": "Gerando o resumo."}
+    yield from stream_summary_with_gemini(text, natural_language_query=natural_language_query)
+
+
+# --- Versões assíncronas (views ASGI em api/views.py) ---
+# As chamadas ao Gemini usam generate_content_async. O download/extração de PDF
+# (stream para spool, cache em disco e pool de processos) continua síncrono e
+# roda numa thread, fora do event loop.
+
+async def call_model_structured_async(model, prompt_text: str, schema: dict) -> str:
+    config = {
+        "max_output_tokens": 8192,
+        "temperature": 0.2,
+        "response_mime_type": "application/json",
+        "response_schema": schema
+    }
+    try:
+        # Mesma política do call_model_structured: resumo é trabalho de fundo
+        await ratelimit.acquire_async("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.BACKGROUND)
+        response = await model.generate_content_async(prompt_text, generation_config=config)
+        return response.text
+    except Exception as e:
+        print(f"Erro na chamada do modelo: {e}")
+        return ""
+
+async def summarize_article_with_gemini_async(article_text: str, natural_language_query: Optional[str] = None) -> dict:
+    cached = await sync_to_async(get_cached_summary)(article_text, natural_language_query, MODEL_NAME, SUMMARY_PROMPT_VERSION)
+    if cached is not None:
+        return cached
+
+    if len(article_text) > SUMMARY_DIRECT_LIMIT:
+        # Etapa "map" usa o pool de threads dos trechos
+        prompt, complete = await asyncio.to_thread(_map_reduce_summary_prompt, article_text, natural_language_query)
+        if prompt is None:
+            return {"error": "O modelo retornou uma resposta vazia."}
+    else:
+        prompt, complete = _direct_summary_prompt(article_text, natural_language_query), True
+
+    model = genai.GenerativeModel(MODEL_NAME)
+    summary = _parse_summary(await call_model_structured_async(model, prompt, schema=SUMMARY_SCHEMA))
+    if complete and "error" not in summary:
+        await sync_to_async(store_summary)(article_text, natural_language_query, MODEL_NAME, SUMMARY_PROMPT_VERSION, summary)
+    return summary
+
+async def extract_text_content_async(input_value: str, is_url: bool = False) -> dict:
+    if is_url:
+        text = await asyncio.to_thread(fetch_pdf_text_from_url, input_value)
+        if not text:
+            return {"error": "Falha ao baixar/ler o PDF."}
+    else:
+        text = input_value or ''
+
+    if not text.strip():
+        return {"error": "Texto vazio."}
+    return {"text": text}
+
+async def summarize_article_async(input_value: str, is_url: bool = False, natural_language_query: Optional[str] = None) -> dict:
+    extracted = await extract_text_content_async(input_value, is_url=is_url)
+    if "error" in extracted:
+        if is_url:
+            return extracted
+        return {"error": "Texto vazio para resumir."}
+    return await summarize_article_with_gemini_async(extracted["text"], natural_language_query=natural_language_query)
+
+async def chat_with_context_async(context_text: str, messages: List[Dict[str, str]], mode: str = "full") -> dict:
+    started = time.perf_counter()
+    try:
+        # Montar o índice BM25 na primeira pergunta é trabalho de CPU: fora do loop
+        full_prompt = await asyncio.to_thread(_build_chat_prompt, context_text, messages, mode)
+        model = genai.GenerativeModel("gemini-2.5-flash")
+        await ratelimit.acquire_async("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.INTERACTIVE)
+        response = await model.generate_content_async(full_prompt)
+        return {
+            "response": response.text,
+            "mode": mode,
+            "prompt_chars": len(full_prompt),
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from typing import Optional
+
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from analyzer.models import SummaryCache
+from core.cache import normalize_query
+
+# Cache persistente dos resumos (tabela analyzer_summarycache). Falhas de banco
+# nunca impedem o resumo: no pior caso o Gemini é chamado normalmente.
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0}
+_purged_versions = set()
+
+
+def _key(article_text: str, query: Optional[str], model_name: str, prompt_version: str) -> dict:
+    normalized = normalize_query(query)
+    return {
+        "text_hash": hashlib.sha256(article_text.encode("utf-8")).hexdigest(),
+        "query_hash": hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+        "model_name": model_name,
+        "prompt_version": prompt_version,
+    }, normalized
+
+
+def get_cached_summary(article_text: str, query: Optional[str], model_name: str, prompt_version: str) -> Optional[dict]:
+    key, _ = _key(article_text, query, model_name, prompt_version)
+    try:
+        entry = SummaryCache.objects.filter(**key).only("id", "result").first()
+        if entry is not None:
+            SummaryCache.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    except DatabaseError as e:
+        print(f"Cache de resumos indisponível: {e}")
+        return None
+
+    with _lock:
+        _counters["hits" if entry is not None else "misses"] += 1
+    return entry.result if entry is not None else None
+
+
+def store_summary(article_text: str, query: Optional[str], model_name: str, prompt_version: str, result: dict) -> None:
+    key, normalized = _key(article_text, query, model_name, prompt_version)
+    try:
+        SummaryCache.objects.update_or_create(**key, defaults={"result": result, "query": normalized})
+        if prompt_version not in _purged_versions:
+            # Resumos de versões antigas do prompt nunca mais serão usados
+            removed, _ = SummaryCache.objects.exclude(prompt_version=prompt_version).delete()
+            _purged_versions.add(prompt_version)
+            if removed:
+                print(f"Cache de resumos: {removed} entradas de prompts antigos removidas.")
+    except DatabaseError as e:
+        print(f"Falha ao salvar resumo no cache: {e}")
+        return
+
+    with _lock:
+        _counters["stores"] += 1
+
+
+def summary_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    try:
+        aggregate = SummaryCache.objects.aggregate(total_hits=Sum("hits"))
+        stats["entries"] = SummaryCache.objects.count()
+        stats["lifetime_hits"] = aggregate["total_hits"] or 0
+    except DatabaseError:
+        pass
+    return stats
@@ -1,6 +1,12 @@
 from rest_framework import serializers
+from drf_spectacular.utils import extend_schema_field
+from analyzer.services import SUMMARY_BATCH_MAX_ITEMS
 from django.contrib.auth.models import User
+from django.db import transaction
 from favorites.models import Favorite
+from favorites.services import (
+    normalize_authors, get_or_create_paper, lock_user_favorites, FAVORITES_BULK_MAX_ITEMS, FAVORITE_FILE_TYPES,
+)
 
 # --- Serializers da Busca ---
 
@@ -41,6 +47,19 @@ class SearchQuerySerializer(serializers.Serializer):
         default=True,
         help_text="Filtrar apenas por artigos com PDF gratuito."
     )
+    pipeline = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Executa a expansão da query pelo Gemini e a busca em paralelo, pré-carregando a próxima página. "
+                  "Responde mais rápido quando o Gemini demora, mas pode gastar até duas buscas no Semantic Scholar."
+    )
+    offline = serializers.ChoiceField(
+        choices=['off', 'fallback', 'first'],
+        required=False,
+        default='fallback',
+        help_text="Índice local de artigos já vistos: 'fallback' responde por ele se o Semantic Scholar falhar ou demorar; "
+                  "'first' consulta o índice antes e só vai ao Semantic Scholar se achar poucos artigos; 'off' desliga."
+    )
 class ArticleSerializer(serializers.Serializer):
     """
     Define a estrutura de um único artigo na lista de resultados.
@@ -52,6 +71,8 @@ class ArticleSerializer(serializers.Serializer):
     abstract = serializers.CharField(allow_null=True)
     citationCount = serializers.IntegerField()
     journal = serializers.CharField(allow_null=True)
+    paperId = serializers.CharField(required=False, allow_null=True, help_text="Id do artigo no Semantic Scholar.")
+    openAccessPdf = serializers.URLField(required=False, allow_null=True, help_text="Link do PDF gratuito, se houver.")
 
 
 class ApiResponseSerializer(serializers.Serializer):
@@ -146,11 +167,69 @@ class ChatMessageSerializer(serializers.Serializer):
 class ChatInputSerializer(serializers.Serializer):
     context = serializers.CharField(help_text="O texto completo do artigo.")
     messages = ChatMessageSerializer(many=True)
+    mode = serializers.ChoiceField(
+        choices=[("rag", "Trechos relevantes"), ("full", "Artigo completo")],
+        default="full",
+        help_text="full (padrão): envia o artigo inteiro; rag: envia só os trechos mais relevantes para a pergunta."
+    )
 
 class ChatOutputSerializer(serializers.Serializer):
     response = serializers.CharField()
+    mode = serializers.CharField(required=False)
+    prompt_chars = serializers.IntegerField(required=False, help_text="Tamanho do prompt enviado ao modelo.")
+    elapsed = serializers.FloatField(required=False, help_text="Tempo total da resposta, em segundos.")
     error = serializers.CharField(required=False)
+
+class ChatSessionCreateSerializer(serializers.Serializer):
+    context = serializers.CharField(required=False, help_text="O texto completo do artigo (enviado só uma vez).")
+    document_hash = serializers.CharField(required=False, max_length=64,
+                                          help_text="Hash de um documento já enviado em outra sessão.")
+    mode = serializers.ChoiceField(choices=[("rag", "Trechos relevantes"), ("full", "Artigo completo")], default="full")
+
+    def validate(self, data):
+        if not data.get('context') and not data.get('document_hash'):
+            raise serializers.ValidationError("Envie 'context' ou 'document_hash'.")
+        return data
+
+class ChatSessionOutputSerializer(serializers.Serializer):
+    session_id = serializers.UUIDField()
+    document_hash = serializers.CharField()
+    mode = serializers.CharField()
+    messages = ChatMessageSerializer(many=True, required=False)
+
+class ChatSessionMessageSerializer(serializers.Serializer):
+    message = serializers.CharField(help_text="Nova mensagem do usuário.")
     
+class SummarizeBatchItemSerializer(serializers.Serializer):
+    input_value = serializers.CharField(help_text="O texto completo do artigo OU a URL para o PDF.")
+    is_url = serializers.BooleanField(default=False)
+
+class SummarizeBatchInputSerializer(SummarizeBaseInputSerializer):
+    """ Vários artigos (ex.: uma página de resultados da busca) resumidos de uma vez. """
+    items = SummarizeBatchItemSerializer(many=True, allow_empty=False, max_length=SUMMARY_BATCH_MAX_ITEMS)
+
+class JobSubmitSerializer(SummarizeJsonInputSerializer):
+    """ Job a partir de texto ou URL (mesmos campos do resumo via JSON). """
+    kind = serializers.ChoiceField(choices=[("summarize", "Resumo"), ("extract", "Extração de texto")])
+
+class JobUploadSerializer(serializers.Serializer):
+    """ Job a partir de upload (multipart/form-data). """
+    kind = serializers.ChoiceField(choices=[("summarize", "Resumo"), ("extract", "Extração de texto"), ("format", "Formatação LaTeX")])
+    file = serializers.FileField(help_text="Upload do arquivo (.pdf, ou .txt para formatação).")
+    query = serializers.CharField(required=False, allow_blank=True, help_text="(Resumo) Consulta para focar o resumo.")
+    style = serializers.CharField(required=False, allow_blank=True, help_text="(Formatação) Nome do estilo.")
+
+class JobSerializer(serializers.Serializer):
+    job_id = serializers.UUIDField()
+    kind = serializers.CharField()
+    status = serializers.ChoiceField(choices=["pending", "running", "succeeded", "failed"])
+    deduplicated = serializers.BooleanField(required=False, help_text="True se um job igual já existia.")
+    created_at = serializers.DateTimeField()
+    started_at = serializers.DateTimeField(allow_null=True)
+    finished_at = serializers.DateTimeField(allow_null=True)
+    result = serializers.JSONField(required=False)
+    error = serializers.CharField(required=False)
+
 # O SummarizeInputSerializer antigo ainda é útil para manter compatibilidade se necessário,
 # mas o SummarizeJsonInputSerializer é o novo padrão.
 class SummarizeInputSerializer(serializers.Serializer):
@@ -180,8 +259,106 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 # --- Serializers de Favoritos ---
 
+class FavoriteSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(help_text="Termos buscados no título, autores e resumo dos favoritos.")
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+class FavoriteListQuerySerializer(serializers.Serializer):
+    fields = serializers.CharField(
+        required=False,
+        help_text="Campos da resposta separados por vírgula (ex.: title,year). Os demais nem são lidos do banco."
+    )
+    year_from = serializers.IntegerField(required=False, help_text="Ano mínimo do artigo.")
+    year_to = serializers.IntegerField(required=False, help_text="Ano máximo do artigo.")
+    min_citations = serializers.IntegerField(required=False, min_value=0, help_text="Mínimo de citações.")
+    max_citations = serializers.IntegerField(required=False, min_value=0, help_text="Máximo de citações.")
+    cursor = serializers.CharField(required=False, help_text="Cursor da próxima página (campo 'next' da resposta).")
+    page_size = serializers.IntegerField(
+        required=False, min_value=1, max_value=200,
+        help_text="Itens por página. Com page_size ou cursor a resposta é paginada; sem eles, vem a lista completa."
+    )
+
+    def validate_fields(self, value):
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in FavoriteSerializer.Meta.fields]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Campos desconhecidos: {', '.join(unknown)}. Disponíveis: {', '.join(FavoriteSerializer.Meta.fields)}."
+            )
+        return fields
+
+@extend_schema_field(serializers.CharField())
+class AuthorsField(serializers.Field):
+    """Autores como texto separado por vírgulas (formato antigo da API); aceita também uma lista."""
+
+    def to_representation(self, value):
+        return ', '.join(value or [])
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, list)):
+            raise serializers.ValidationError("Informe os autores como texto ou lista de nomes.")
+        return normalize_authors(data)
+
 class FavoriteSerializer(serializers.ModelSerializer):
+    """
+    Mantém o formato plano de sempre (título, autores... no próprio favorito), mas os
+    dados do artigo vêm do catálogo compartilhado (Paper).
+    """
+    title = serializers.CharField(source='paper.title', max_length=500)
+    url = serializers.URLField(source='paper.url', max_length=500, required=False, allow_blank=True, allow_null=True)
+    authors = AuthorsField(source='paper.authors', required=False, allow_null=True)
+    year = serializers.IntegerField(source='paper.year', required=False, allow_null=True)
+    abstract = serializers.CharField(source='paper.abstract', required=False, allow_blank=True, allow_null=True)
+    citation_count = serializers.IntegerField(source='paper.citation_count', required=False, default=0)
+    paper_id = serializers.CharField(source='paper.external_id', max_length=100, required=False, allow_blank=True,
+                                     allow_null=True, help_text="paperId do Semantic Scholar.")
+    journal = serializers.CharField(source='paper.journal', max_length=300, required=False, allow_blank=True, allow_null=True)
+    open_access_pdf = serializers.URLField(source='paper.open_access_pdf', max_length=500, required=False,
+                                           allow_blank=True, allow_null=True)
+
     class Meta:
         model = Favorite
-        fields = ['id', 'user', 'title', 'url', 'authors', 'year', 'abstract', 'citation_count', 'created_at']
+        fields = ['id', 'user', 'title', 'url', 'authors', 'year', 'abstract', 'citation_count',
+                  'paper_id', 'journal', 'open_access_pdf', 'created_at']
         extra_kwargs = {'user': {'read_only': True}}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Projeção (?fields=): só os campos pedidos vão para a resposta
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def create(self, validated_data):
+        # Salvar o mesmo artigo de novo devolve o favorito que já existe
+        paper = get_or_create_paper(validated_data['paper'])
+        with transaction.atomic():
+            # Mesma trava do bulk_add_favorites, para a contagem de "created" do lote não incluir este
+            lock_user_favorites(validated_data['user'])
+            favorite, _ = Favorite.objects.get_or_create(user=validated_data['user'], paper=paper)
+        return favorite
+
+class FavoriteBulkSerializer(serializers.Serializer):
+    items = FavoriteSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=FAVORITES_BULK_MAX_ITEMS,
+        help_text=f"Até {FAVORITES_BULK_MAX_ITEMS} favoritos, no mesmo formato do POST /api/favorites/."
+    )
+
+class FavoriteBulkOutputSerializer(serializers.Serializer):
+    received = serializers.IntegerField(help_text="Favoritos recebidos.")
+    created = serializers.IntegerField(help_text="Favoritos novos.")
+    already_saved = serializers.IntegerField(help_text="Artigos que o usuário já tinha nos favoritos.")
+    papers_created = serializers.IntegerField(help_text="Artigos novos no catálogo.")
+
+class FavoriteImportSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="Arquivo NDJSON ou CSV, como os gerados pela exportação.")
+    type = serializers.ChoiceField(
+        choices=FAVORITE_FILE_TYPES, required=False,
+        help_text="Formato do arquivo. Se omitido, vem da extensão."
+    )
+
+class FavoriteExportQuerySerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=FAVORITE_FILE_TYPES, required=False, default='ndjson',
+                                   help_text="Formato da exportação: 'ndjson' (padrão) ou 'csv'.")
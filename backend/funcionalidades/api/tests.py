@@ -1,3 +1,107 @@
-from django.test import TestCase
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from api.views import _parse_range
+from writer import artifacts
+
+
+class ParseRangeTests(SimpleTestCase):
+    """Cabeçalho Range de um único intervalo, para um arquivo de 1000 bytes."""
+
+    def test_intervalo_fechado(self):
+        self.assertEqual(_parse_range("bytes=0-99", 1000), (0, 99))
+
+    def test_intervalo_aberto_vai_ate_o_fim(self):
+        self.assertEqual(_parse_range("bytes=500-", 1000), (500, 999))
+
+    def test_fim_alem_do_arquivo_e_truncado(self):
+        self.assertEqual(_parse_range("bytes=900-5000", 1000), (900, 999))
+
+    def test_sufixo(self):
+        self.assertEqual(_parse_range("bytes=-100", 1000), (900, 999))
+
+    def test_sufixo_maior_que_o_arquivo_pega_tudo(self):
+        self.assertEqual(_parse_range("bytes=-5000", 1000), (0, 999))
+
+    def test_sufixo_zero_e_invalido(self):
+        self.assertIsNone(_parse_range("bytes=-0", 1000))
+
+    def test_inicio_depois_do_fim(self):
+        self.assertIsNone(_parse_range("bytes=5-2", 1000))
+
+    def test_inicio_fora_do_arquivo(self):
+        self.assertIsNone(_parse_range("bytes=1000-", 1000))
+
+    def test_varios_intervalos_nao_sao_interpretados(self):
+        self.assertIsNone(_parse_range("bytes=0-1,5-6", 1000))
+
+    def test_cabecalhos_malformados(self):
+        for header in (None, "", "bytes=-", "bytes=a-b", "items=0-1", "bytes 0-1"):
+            with self.subTest(header=header):
+                self.assertIsNone(_parse_range(header, 1000))
+
+    def test_espacos_nas_pontas_sao_ignorados(self):
+        self.assertEqual(_parse_range("  bytes=1-2 ", 1000), (1, 2))
+
+
+class DownloadRangeTests(SimpleTestCase):
+    """Respostas do download de artefatos para os casos de Range."""
+
+    name = "0123456789abcdef-artigo"
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        Path(tmp.name, f"{self.name}.pdf").write_bytes(self.content)
+        patcher = mock.patch.object(artifacts, "ARTIFACT_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = f"/api/download/{self.name}/pdf/"
+
+    def _body(self, response):
+        body = b"".join(response.streaming_content)
+        response.close()
+        return body
+
+    def test_sem_range_envia_o_arquivo_inteiro(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self._body(response), self.content)
+
+    def test_range_parcial(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.content)}")
+        self.assertEqual(self._body(response), self.content[10:20])
+
+    def test_range_sufixo(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._body(response), self.content[-4:])
+
+    def test_range_invertido_responde_416(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5-2")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_varios_intervalos_enviam_o_arquivo_inteiro(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.content)
+
+    def test_if_range_desatualizado_envia_o_arquivo_inteiro(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"etag-antigo"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.content)
+
+    def test_etag_igual_responde_304(self):
+        first = self.client.get(self.url)
+        first.close()
+        etag = first["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -2,30 +2,66 @@ from django.urls import path
 from rest_framework.authtoken.views import obtain_auth_token
 from .views import (
     get_status, 
+    metrics_view,
     search_articles_view, 
     summarize_article_json_view, 
     summarize_article_file_view, 
+    summarize_article_stream_view,
+    summarize_batch_view,
     extract_text_json_view,
     extract_text_file_view, 
     chat_document_view,
+    chat_document_stream_view,
+    chat_session_create_view,
+    chat_session_detail_view,
+    chat_session_message_view,
     format_text_view, 
     download_file_view,
+    job_submit_view,
+    job_upload_view,
+    job_detail_view,
+    search_articles_async_view,
+    summarize_article_async_view,
+    extract_text_async_view,
+    chat_document_async_view,
     RegisterUserView,
     LogoutView,
     FavoriteListCreateView,
-    FavoriteDeleteView
+    FavoriteDeleteView,
+    favorite_search_view,
+    favorite_bulk_view,
+    favorite_import_view,
+    favorite_export_view,
 )
 
 urlpatterns = [
     path('status/', get_status, name='get_status'),
+    path('metrics/', metrics_view, name='metrics'),
     path('search/', search_articles_view, name='search_articles'),
     path('summarize/json/', summarize_article_json_view, name='summarize_json'),
     path('summarize/file/', summarize_article_file_view, name='summarize_file'),
+    path('summarize/stream/', summarize_article_stream_view, name='summarize_stream'),
+    path('summarize/batch/', summarize_batch_view, name='summarize_batch'),
     path('extract/json/', extract_text_json_view, name='extract_text_json'),
     path('extract/file/', extract_text_file_view, name='extract_text_file'),
     path('chat/', chat_document_view, name='chat_document'),
+    path('chat/stream/', chat_document_stream_view, name='chat_document_stream'),
+    path('chat/sessions/', chat_session_create_view, name='chat_session_create'),
+    path('chat/sessions/<uuid:session_id>/', chat_session_detail_view, name='chat_session_detail'),
+    path('chat/sessions/<uuid:session_id>/messages/', chat_session_message_view, name='chat_session_message'),
     path('format/', format_text_view, name='format_text'),
     path('download/<str:filename>/<str:file_type>/', download_file_view, name='download_file'),
+
+    # Versões assíncronas (servir com ASGI: uvicorn researchflow.asgi:application)
+    path('async/search/', search_articles_async_view, name='search_articles_async'),
+    path('async/summarize/json/', summarize_article_async_view, name='summarize_json_async'),
+    path('async/extract/json/', extract_text_async_view, name='extract_text_json_async'),
+    path('async/chat/', chat_document_async_view, name='chat_document_async'),
+
+    # Jobs
+    path('jobs/', job_submit_view, name='job_submit'),
+    path('jobs/upload/', job_upload_view, name='job_upload'),
+    path('jobs/<uuid:job_id>/', job_detail_view, name='job_detail'),
     
     # Auth
     path('register/', RegisterUserView.as_view(), name='register'),
@@ -34,5 +70,9 @@ urlpatterns = [
 
     # Favorites
     path('favorites/', FavoriteListCreateView.as_view(), name='favorites_list_create'),
+    path('favorites/search/', favorite_search_view, name='favorites_search'),
+    path('favorites/bulk/', favorite_bulk_view, name='favorites_bulk'),
+    path('favorites/import/', favorite_import_view, name='favorites_import'),
+    path('favorites/export/', favorite_export_view, name='favorites_export'),
     path('favorites/<int:pk>/', FavoriteDeleteView.as_view(), name='favorites_delete'),
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from rest_framework.decorators import api_view, parser_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema
@@ -7,13 +7,22 @@ from pathlib import Path
 import os
 from django.http import FileResponse
 import mimetypes
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, StreamingHttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+import asyncio
+import csv
+import json
+import re
+import time
 from pathlib import Path
 
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from django.contrib.auth.models import User
 from favorites.models import Favorite
+from favorites.services import list_favorites, search_favorites, bulk_add_favorites, read_favorites_file, csv_safe_row
 
 # Importa TODOS os serializers
 from .serializers import (
@@ -23,20 +32,54 @@ from .serializers import (
     SummarizeJsonInputSerializer, 
     SummarizeFormInputSerializer,
     SummarizeOutputSerializer,
+    SummarizeBatchInputSerializer,
     ExtractTextOutputSerializer,
     ChatInputSerializer,
     ChatOutputSerializer,
+    ChatSessionCreateSerializer,
+    ChatSessionOutputSerializer,
+    ChatSessionMessageSerializer,
+    JobSubmitSerializer,
+    JobUploadSerializer,
+    JobSerializer,
     FormatTextSerializer,
     FormatTextOutputSerializer,
     UserSerializer,
     RegisterSerializer,
-    FavoriteSerializer
+    FavoriteSerializer,
+    FavoriteSearchSerializer,
+    FavoriteListQuerySerializer,
+    FavoriteBulkSerializer,
+    FavoriteBulkOutputSerializer,
+    FavoriteImportSerializer,
+    FavoriteExportQuerySerializer,
 )
 
 # Importa a lógica de CADA app separado
-from explorer.services import extract_keywords_with_gemini, search_articles_from_api
-from analyzer.services import summarize_article, extract_text_content, extract_text_from_file_obj, chat_with_context
+from explorer.services import (
+    extract_keywords_with_gemini, search_articles_from_api, search_articles_pipelined,
+    extract_keywords_with_gemini_async, search_articles_from_api_async, search_articles_pipelined_async,
+    search_articles_local, search_with_local_fallback, SEARCH_LOCAL_MIN_RESULTS, SEARCH_OFFLINE_DEADLINE,
+)
+from analyzer.services import (
+    summarize_article, extract_text_content, extract_text_from_file_obj, chat_with_context,
+    stream_chat_with_context, stream_summarize_article,
+    summarize_article_async, extract_text_content_async, chat_with_context_async,
+    summarize_batch,
+)
 from writer.services import format_text_with_gemini, extract_text_from_file
+from writer.artifacts import artifact_path, artifact_stats
+from writer.latex import latex_stats
+from writer.style_exemplars import style_exemplar_stats
+from core.cache import cache_stats, flight_stats
+from core.http_client import http_stats
+from core.ratelimit import rate_limit_stats
+from core.search_index import search_index
+from analyzer.pdf_cache import pdf_cache
+from core.pdf import extraction_stats
+from analyzer.summary_cache import summary_cache_stats
+from jobs.services import submit_job, save_upload, get_job, job_to_dict, job_stats
+from analyzer.chat_sessions import create_session, get_session, session_history, post_message
 
 @extend_schema(exclude=True)
 @api_view(['GET'])
@@ -44,6 +87,25 @@ def get_status(request):
     """ Um endpoint simples para verificar se a API está online. """
     return Response({"status": "ok", "message": "Backend is running!"})
 
+@extend_schema(exclude=True)
+@api_view(['GET'])
+def metrics_view(request):
+    """ Métricas internas do processo (caches, etc.) para acompanhamento de desempenho. """
+    return Response({
+        "caches": cache_stats(),
+        "coalescing": flight_stats(),
+        "http": http_stats(),
+        "rate_limits": rate_limit_stats(),
+        "pdf_cache": pdf_cache.stats() if pdf_cache is not None else None,
+        "pdf_extraction": extraction_stats(),
+        "summary_cache": summary_cache_stats(),
+        "jobs": job_stats(),
+        "latex": latex_stats(),
+        "writer_artifacts": artifact_stats(),
+        "search_index": search_index.stats() if search_index is not None else None,
+        "style_exemplars": style_exemplar_stats(),
+    })
+
 @extend_schema(
     summary="Busca Artigos com IA",
     description="Recebe uma query de busca, usa IA para otimizá-la e retorna os artigos mais relevantes com filtros.",
@@ -60,13 +122,7 @@ def search_articles_view(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     validated_data = serializer.validated_data
-    
-    # 1. Processa a query com IA
-    keywords = extract_keywords_with_gemini(validated_data['query'])
-    
-    # 2. Busca no Semantic Scholar com todos os filtros
-    articles = search_articles_from_api(
-        query=keywords,
+    filters = dict(
         sort_by=validated_data['sort_by'],
         year_from=validated_data.get('year_from'),
         year_to=validated_data.get('year_to'),
@@ -74,25 +130,72 @@ def search_articles_view(request):
         is_open_access=validated_data['is_open_access']
     )
 
+    def upstream_search():
+        if validated_data['pipeline']:
+            # Expansão com IA e busca no Semantic Scholar em paralelo
+            _, found = search_articles_pipelined(validated_data['query'], **filters)
+            return found
+        # 1. Processa a query com IA
+        keywords = extract_keywords_with_gemini(validated_data['query'])
+
+        # 2. Busca no Semantic Scholar com todos os filtros
+        return search_articles_from_api(query=keywords, **filters)
+
+    offline = validated_data['offline']
+    local_filters = {k: v for k, v in filters.items() if k != 'sort_by'}
+    if offline == 'first':
+        local = search_articles_local(validated_data['query'], **local_filters)
+        if len(local) >= SEARCH_LOCAL_MIN_RESULTS:
+            return Response(_local_search_payload(local, upstream_failed=False))
+
+    if offline == 'off':
+        articles = upstream_search()
+    else:
+        articles, from_local = search_with_local_fallback(
+            upstream_search, lambda: search_articles_local(validated_data['query'], **local_filters)
+        )
+        if from_local:
+            return Response(_local_search_payload(articles, upstream_failed=True))
+
+    payload, status_code, headers = _search_response(articles)
+    return Response(payload, status=status_code, headers=headers)
+
+def _local_search_payload(articles, upstream_failed):
+    """Resposta montada pelo índice local de artigos já vistos (modo offline)."""
+    if upstream_failed:
+        message = f"A base de artigos falhou ou está lenta; mostrando {len(articles)} artigos que você já viu antes."
+    else:
+        message = f"Encontrei {len(articles)} artigos que você já viu antes!"
+    return {"success": True, "message": message, "articles": articles, "source": "local"}
+
+def _search_response(articles):
+    """Corpo, status e cabeçalhos da resposta de busca (usado pelas views síncrona e assíncrona)."""
+    if "error" in articles and articles.get("rate_limited"):
+        return {
+            "success": False,
+            "message": "Muitas buscas ao mesmo tempo! Aguarde alguns segundos e tente novamente.",
+            "articles": []
+        }, status.HTTP_429_TOO_MANY_REQUESTS, {"Retry-After": "5"}
+
     if "error" in articles:
-        return Response({
+        return {
             "success": False,
             "message": "Puxa, tive um problema para me conectar à base de dados. Tente novamente.",
             "articles": []
-        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        }, status.HTTP_503_SERVICE_UNAVAILABLE, None
     
     if len(articles) > 0:
-        return Response({
+        return {
             "success": True,
             "message": f"Encontrei {len(articles)} artigos excelentes para você!",
             "articles": articles
-        }, status=status.HTTP_200_OK)
+        }, status.HTTP_200_OK, None
     else:
-        return Response({
+        return {
             "success": True,
             "message": "Puxa, não encontrei artigos com esses filtros.",
             "articles": []
-        }, status=status.HTTP_200_OK)
+        }, status.HTTP_200_OK, None
 
 
 # --- NOVAS ROTAS DE RESUMO E CHAT ---
@@ -129,6 +232,71 @@ def summarize_article_json_view(request):
     
     return _handle_summarize_response(result)
 
+def _sse_response(events):
+    """Converte eventos (nome, dados) em Server-Sent Events, enviados assim que são gerados."""
+    def stream():
+        for name, data in events:
+            yield f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Impede que proxies (nginx) segurem os eventos em buffer
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@extend_schema(
+    summary="[JSON] Resume Artigo (streaming)",
+    description=(
+        "Mesma entrada do /summarize/json/, mas responde com Server-Sent Events: "
+        "'status' (progresso), 'field' (cada campo do resumo assim que fica pronto), "
+        "'done' (resumo completo) ou 'error'."
+    ),
+    request=SummarizeJsonInputSerializer,
+    responses={(200, 'text/event-stream'): {'type': 'string'}}
+)
+@api_view(['POST'])
+@parser_classes([JSONParser])
+def summarize_article_stream_view(request):
+    serializer = SummarizeJsonInputSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    return _sse_response(stream_summarize_article(
+        input_value=serializer.validated_data['input_value'],
+        is_url=serializer.validated_data['is_url'],
+        natural_language_query=serializer.validated_data.get('query') or None,
+    ))
+
+@extend_schema(
+    summary="[JSON] Resume Vários Artigos",
+    description=(
+        "Recebe até SUMMARY_BATCH_MAX_ITEMS artigos (texto ou URL) e resume todos em paralelo. "
+        "A resposta é NDJSON: uma linha por artigo, na ordem em que terminam "
+        "({index, input_value, result}), e uma última linha {done, total, elapsed}."
+    ),
+    request=SummarizeBatchInputSerializer,
+    responses={(200, 'application/x-ndjson'): {'type': 'string'}}
+)
+@api_view(['POST'])
+@parser_classes([JSONParser])
+def summarize_batch_view(request):
+    serializer = SummarizeBatchInputSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    items = [dict(item) for item in serializer.validated_data['items']]
+    query = serializer.validated_data.get('query') or None
+
+    def stream():
+        started = time.perf_counter()
+        for entry in summarize_batch(items, natural_language_query=query):
+            yield json.dumps(entry, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "total": len(items), "elapsed": round(time.perf_counter() - started, 3)}) + "\n"
+
+    response = StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 @extend_schema(
     summary="[UPLOAD] Resume PDF",
     request={
@@ -230,12 +398,96 @@ def chat_document_view(request):
         for m in messages
     ]
     
-    result = chat_with_context(context, messages_list)
+    result = chat_with_context(context, messages_list, mode=validated_data['mode'])
     
     if "error" in result:
         return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     return Response(result)
 
+@extend_schema(
+    summary="Chat com Contexto do Artigo (streaming)",
+    description=(
+        "Mesma entrada do /chat/, mas responde com Server-Sent Events: 'token' a cada "
+        "pedaço da resposta, depois 'done' (resposta completa e tempos) ou 'error'."
+    ),
+    request=ChatInputSerializer,
+    responses={(200, 'text/event-stream'): {'type': 'string'}}
+)
+@api_view(['POST'])
+def chat_document_stream_view(request):
+    serializer = ChatInputSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    validated_data = serializer.validated_data
+    messages_list = [
+        {"role": str(m['role']), "content": str(m['content'])}
+        for m in validated_data['messages']
+    ]
+    return _sse_response(stream_chat_with_context(validated_data['context'], messages_list, mode=validated_data['mode']))
+
+
+@extend_schema(
+    summary="Cria Sessão de Chat",
+    description="Guarda o texto do artigo no servidor e devolve o id da sessão. Os turnos seguintes enviam só a nova mensagem.",
+    request=ChatSessionCreateSerializer,
+    responses={201: ChatSessionOutputSerializer}
+)
+@api_view(['POST'])
+def chat_session_create_view(request):
+    serializer = ChatSessionCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    owner = request.user if request.user.is_authenticated else None
+    result = create_session(**serializer.validated_data, owner=owner)
+    if "error" in result:
+        return Response(result, status=status.HTTP_404_NOT_FOUND)
+    return Response(result, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    summary="Consulta ou Encerra Sessão de Chat",
+    responses={200: ChatSessionOutputSerializer, 204: None}
+)
+@api_view(['GET', 'DELETE'])
+def chat_session_detail_view(request, session_id):
+    session = get_session(session_id, request.user)
+    if session is None:
+        return Response({"error": "Sessão não encontrada ou expirada."}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'DELETE':
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({
+        "session_id": str(session.id),
+        "document_hash": session.document.sha256,
+        "mode": session.mode,
+        "messages": session_history(session),
+    })
+
+
+@extend_schema(
+    summary="Envia Mensagem na Sessão de Chat",
+    description="Recebe só a nova mensagem; o artigo e o histórico ficam guardados na sessão.",
+    request=ChatSessionMessageSerializer,
+    responses={200: ChatOutputSerializer}
+)
+@api_view(['POST'])
+def chat_session_message_view(request, session_id):
+    serializer = ChatSessionMessageSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    session = get_session(session_id, request.user)
+    if session is None:
+        return Response({"error": "Sessão não encontrada ou expirada."}, status=status.HTTP_404_NOT_FOUND)
+
+    result = post_message(session, serializer.validated_data['message'])
+    if "error" in result:
+        return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response(result)
+
 # --- ROTA DO FORMATADOR ---
 @extend_schema(
     summary="Formata Texto",
@@ -268,35 +520,265 @@ def format_text_view(request):
     else:
         return Response({"error": result.get("error")}, status=500)
 
+# --- ROTAS DE JOBS (execução em segundo plano) ---
+
+def _job_accepted(job, deduplicated):
+    data = {**job_to_dict(job), "deduplicated": deduplicated}
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+@extend_schema(
+    summary="Enfileira Resumo/Extração",
+    description="Mesma entrada do /summarize/json/ mais o campo kind. Retorna o id do job; acompanhe em /jobs/<id>/.",
+    request=JobSubmitSerializer,
+    responses={202: JobSerializer}
+)
+@api_view(['POST'])
+@parser_classes([JSONParser])
+def job_submit_view(request):
+    serializer = JobSubmitSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    payload = {"input_value": data['input_value'], "is_url": data['is_url']}
+    if data['kind'] == 'summarize':
+        payload["query"] = data.get('query') or None
+    return _job_accepted(*submit_job(data['kind'], payload, user=request.user))
+
+@extend_schema(
+    summary="Enfileira Resumo/Extração/Formatação de Arquivo",
+    request={'multipart/form-data': JobUploadSerializer},
+    responses={202: JobSerializer}
+)
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+def job_upload_view(request):
+    serializer = JobUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    uploaded_file = data['file']
+    file_path, file_bytes = save_upload(uploaded_file)
+    payload = {"file_path": file_path}
+    if data['kind'] == 'summarize':
+        payload["query"] = data.get('query') or None
+    elif data['kind'] == 'format':
+        payload["style"] = data.get('style')
+        payload["filename"] = Path(uploaded_file.name).stem
+    return _job_accepted(*submit_job(data['kind'], payload, file_bytes=file_bytes, user=request.user))
+
+@extend_schema(
+    summary="Status do Job",
+    description="Status (pending, running, succeeded, failed) e, quando concluído, o resultado.",
+    responses={200: JobSerializer}
+)
+@api_view(['GET'])
+def job_detail_view(request, job_id):
+    job = get_job(job_id, request.user)
+    if job is None:
+        return Response({"error": "Job não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_to_dict(job))
+
+class _FileRange:
+    """Lê só os bytes [start, start+length) de um arquivo aberto, para respostas 206."""
+
+    def __init__(self, fh, start, length):
+        self.fh = fh
+        self.remaining = length
+        fh.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+def _parse_range(header, size):
+    """Interpreta um único intervalo "bytes=a-b" (ou "bytes=-n"). Retorna (início, fim) ou None."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    return (start, end) if start <= end else None
+
+def _file_download_response(request, file_path, mime_type):
+    """
+    Envia o arquivo em blocos (FileResponse), sem carregá-lo na memória,
+    com ETag (responde 304 se o cliente já tem a versão) e Range (retomada de download).
+    """
+    stat = file_path.stat()
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and if_range and if_range.strip() != etag:
+        range_header = None  # o arquivo mudou desde o download parcial: envia inteiro
+
+    fh = open(file_path, 'rb')
+    if range_header and range_header.startswith('bytes=') and ',' not in range_header:
+        byte_range = _parse_range(range_header, stat.st_size)
+        if byte_range is None:
+            fh.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        start, end = byte_range
+        response = FileResponse(_FileRange(fh, start, end - start + 1), status=206, content_type=mime_type,
+                                as_attachment=True, filename=file_path.name)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    else:
+        response = FileResponse(fh, content_type=mime_type, as_attachment=True, filename=file_path.name)
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
 # 2. Nova view para Download (GET)
 @api_view(['GET'])
 def download_file_view(request, filename, file_type):
     """
     Rota para baixar arquivos 'pdf' ou 'tex'.
     """
-    base_dir = Path(__file__).resolve().parent.parent
-    folder_path = base_dir / 'arquivos'
-    
-    print(f"DEBUG: Buscando download em: {folder_path}") # Ajuda a ver no terminal
-
-    if file_type == 'pdf':
-        file_path = folder_path / f"{filename}.pdf"
-        mime_type = 'application/pdf'
-    elif file_type == 'tex':
-        file_path = folder_path / f"{filename}.tex"
-        if not file_path.exists():
-             file_path = folder_path / f"{filename}_temp.tex"
-        mime_type = 'text/plain'
-    else:
+    if file_type not in ('pdf', 'tex'):
         return Response({"error": "Tipo inválido"}, status=400)
 
-    if file_path.exists():
-        with open(file_path, 'rb') as fh:
-            response = HttpResponse(fh.read(), content_type=mime_type)
-            response['Content-Disposition'] = f'attachment; filename={file_path.name}'
-            return response
-    
-    raise Http404("Arquivo não encontrado.")
+    file_path = artifact_path(filename, file_type)
+    if file_path is None:
+        raise Http404("Arquivo não encontrado.")
+
+    mime_type = 'application/pdf' if file_type == 'pdf' else 'text/plain'
+    return _file_download_response(request, file_path, mime_type)
+
+
+# --- ROTAS ASSÍNCRONAS (ASGI) ---
+# Mesma entrada e saída das rotas síncronas, mas as chamadas ao Semantic Scholar e
+# ao Gemini são aguardadas no event loop: num servidor ASGI (uvicorn) um único
+# worker atende centenas de requisições esperando o upstream ao mesmo tempo.
+# São views Django puras porque o @api_view do DRF não suporta async.
+
+def _async_json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return None
+
+def _async_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return JsonResponse(data, status=status_code, headers=headers, safe=False, json_dumps_params={"ensure_ascii": False})
+
+@csrf_exempt
+@require_POST
+async def search_articles_async_view(request):
+    serializer = SearchQuerySerializer(data=_async_json_body(request))
+    if not serializer.is_valid():
+        return _async_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    validated_data = serializer.validated_data
+    filters = dict(
+        sort_by=validated_data['sort_by'],
+        year_from=validated_data.get('year_from'),
+        year_to=validated_data.get('year_to'),
+        offset=validated_data['offset'],
+        is_open_access=validated_data['is_open_access']
+    )
+    offline = validated_data['offline']
+    local_filters = {k: v for k, v in filters.items() if k != 'sort_by'}
+    if offline == 'first':
+        local = await asyncio.to_thread(search_articles_local, validated_data['query'], **local_filters)
+        if len(local) >= SEARCH_LOCAL_MIN_RESULTS:
+            return _async_response(_local_search_payload(local, upstream_failed=False))
+
+    async def upstream_search():
+        if validated_data['pipeline']:
+            _, found = await search_articles_pipelined_async(validated_data['query'], **filters)
+            return found
+        keywords = await extract_keywords_with_gemini_async(validated_data['query'])
+        return await search_articles_from_api_async(query=keywords, **filters)
+
+    if offline == 'off' or SEARCH_OFFLINE_DEADLINE <= 0:
+        articles = await upstream_search()
+    else:
+        task = asyncio.ensure_future(upstream_search())
+        try:
+            # shield: se passar do prazo, a busca termina em segundo plano e preenche o cache
+            articles = await asyncio.wait_for(asyncio.shield(task), SEARCH_OFFLINE_DEADLINE)
+        except asyncio.TimeoutError:
+            local = await asyncio.to_thread(search_articles_local, validated_data['query'], **local_filters)
+            if local:
+                return _async_response(_local_search_payload(local, upstream_failed=True))
+            # Nada no índice local: uma busca lenta ainda é melhor que um erro
+            articles = await task
+    if offline != 'off' and "error" in articles:
+        local = await asyncio.to_thread(search_articles_local, validated_data['query'], **local_filters)
+        if local:
+            return _async_response(_local_search_payload(local, upstream_failed=True))
+
+    payload, status_code, headers = _search_response(articles)
+    return _async_response(payload, status_code, headers)
+
+@csrf_exempt
+@require_POST
+async def summarize_article_async_view(request):
+    serializer = SummarizeJsonInputSerializer(data=_async_json_body(request))
+    if not serializer.is_valid():
+        return _async_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    result = await summarize_article_async(
+        input_value=serializer.validated_data['input_value'],
+        is_url=serializer.validated_data['is_url'],
+        natural_language_query=serializer.validated_data.get('query') or None
+    )
+    response = _handle_summarize_response(result)
+    return _async_response(response.data, response.status_code)
+
+@csrf_exempt
+@require_POST
+async def extract_text_async_view(request):
+    serializer = SummarizeJsonInputSerializer(data=_async_json_body(request))
+    if not serializer.is_valid():
+        return _async_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    result = await extract_text_content_async(
+        serializer.validated_data['input_value'],
+        is_url=serializer.validated_data['is_url']
+    )
+    if "error" in result:
+        return _async_response(result, status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return _async_response(result)
+
+@csrf_exempt
+@require_POST
+async def chat_document_async_view(request):
+    serializer = ChatInputSerializer(data=_async_json_body(request))
+    if not serializer.is_valid():
+        return _async_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    validated_data = serializer.validated_data
+    messages_list = [
+        {"role": str(m['role']), "content": str(m['content'])}
+        for m in validated_data['messages']
+    ]
+    result = await chat_with_context_async(validated_data['context'], messages_list, mode=validated_data['mode'])
+    if "error" in result:
+        return _async_response(result, status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return _async_response(result)
 
 
 # --- ROTAS DE AUTENTICAÇÃO ---
@@ -316,16 +798,164 @@ class LogoutView(APIView):
 
 # --- ROTAS DE FAVORITOS ---
 
+class FavoriteCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (created_at), usando o índice (user, -created_at). Só é
+    aplicada quando a requisição pede (cursor ou page_size), para manter a lista
+    completa como resposta padrão.
+    """
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'cursor' not in request.query_params and 'page_size' not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+@extend_schema(
+    parameters=[FavoriteListQuerySerializer],
+    methods=['GET'],
+)
 class FavoriteListCreateView(generics.ListCreateAPIView):
     serializer_class = FavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FavoriteCursorPagination
+
+    def _list_params(self) -> dict:
+        if not hasattr(self, '_params'):
+            serializer = FavoriteListQuerySerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._params = serializer.validated_data
+        return self._params
 
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user).order_by('-created_at')
+        if self.request.method != 'GET':
+            return Favorite.objects.filter(user=self.request.user)
+        params = self._list_params()
+        return list_favorites(
+            self.request.user,
+            fields=params.get('fields'),
+            year_from=params.get('year_from'),
+            year_to=params.get('year_to'),
+            min_citations=params.get('min_citations'),
+            max_citations=params.get('max_citations'),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self._list_params().get('fields'))
+        return super().get_serializer(*args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+@extend_schema(
+    summary="Busca nos Favoritos",
+    description="Busca textual ranqueada (título, autores e resumo) nos favoritos do usuário, pelo índice local.",
+    parameters=[FavoriteSearchSerializer],
+    responses={200: FavoriteSerializer(many=True)}
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def favorite_search_view(request):
+    serializer = FavoriteSearchSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    favorites = search_favorites(request.user, serializer.validated_data['q'], serializer.validated_data['limit'])
+    return Response(FavoriteSerializer(favorites, many=True).data)
+
+# Campos da exportação: o formato do POST, sem id e usuário, para poder ser importado de volta
+FAVORITE_EXPORT_FIELDS = [name for name in FavoriteSerializer.Meta.fields if name not in ('id', 'user')]
+
+def _bulk_save_favorites(request, items):
+    serializer = FavoriteBulkSerializer(data={"items": items})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    papers = [item['paper'] for item in serializer.validated_data['items']]
+    result = bulk_add_favorites(request.user, papers)
+    return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+@extend_schema(
+    summary="Salva Vários Favoritos",
+    description=(
+        "Recebe uma lista de favoritos (ou {\"items\": [...]}) e salva todos numa transação só. "
+        "Artigos que o usuário já tinha são ignorados."
+    ),
+    request=FavoriteBulkSerializer,
+    responses={200: FavoriteBulkOutputSerializer, 201: FavoriteBulkOutputSerializer}
+)
+@api_view(['POST'])
+@parser_classes([JSONParser])
+@permission_classes([permissions.IsAuthenticated])
+def favorite_bulk_view(request):
+    items = request.data.get('items') if isinstance(request.data, dict) else request.data
+    return _bulk_save_favorites(request, items)
+
+@extend_schema(
+    summary="Importa Favoritos",
+    description="Importa um arquivo NDJSON ou CSV (como os da exportação) com o mesmo processamento do /favorites/bulk/.",
+    request={'multipart/form-data': FavoriteImportSerializer},
+    responses={200: FavoriteBulkOutputSerializer, 201: FavoriteBulkOutputSerializer}
+)
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@permission_classes([permissions.IsAuthenticated])
+def favorite_import_view(request):
+    serializer = FavoriteImportSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    items = read_favorites_file(serializer.validated_data['file'], serializer.validated_data.get('type'))
+    if isinstance(items, dict):
+        return Response(items, status=status.HTTP_400_BAD_REQUEST)
+    return _bulk_save_favorites(request, items)
+
+class _Echo:
+    """Buffer do csv.writer que só devolve a linha escrita, para gerar o CSV aos poucos."""
+
+    def write(self, value):
+        return value
+
+@extend_schema(
+    summary="Exporta Favoritos",
+    description="Todos os favoritos do usuário em NDJSON (um por linha) ou CSV, gerados aos poucos.",
+    parameters=[FavoriteExportQuerySerializer],
+    responses={(200, 'application/x-ndjson'): {'type': 'string'}, (200, 'text/csv'): {'type': 'string'}}
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def favorite_export_view(request):
+    serializer = FavoriteExportQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    file_type = serializer.validated_data['type']
+    favorites = list_favorites(request.user).iterator(chunk_size=500)
+    row_serializer = FavoriteSerializer(fields=FAVORITE_EXPORT_FIELDS)
+
+    if file_type == 'csv':
+        writer = csv.DictWriter(_Echo(), fieldnames=FAVORITE_EXPORT_FIELDS)
+
+        def stream():
+            yield writer.writeheader()
+            for favorite in favorites:
+                yield writer.writerow(csv_safe_row(row_serializer.to_representation(favorite)))
+
+        content_type = "text/csv; charset=utf-8"
+    else:
+        def stream():
+            for favorite in favorites:
+                yield json.dumps(row_serializer.to_representation(favorite), ensure_ascii=False) + "\n"
+
+        content_type = "application/x-ndjson"
+
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="favoritos.{file_type}"'
+    return response
+
 class FavoriteDeleteView(generics.DestroyAPIView):
     serializer_class = FavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
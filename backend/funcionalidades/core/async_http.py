@@ -0,0 +1,82 @@
+import asyncio
+import random
+import time
+import weakref
+from typing import Optional
+from urllib.parse import urlsplit
+
+from core import http_client
+
+# Cliente HTTP de saída para as views assíncronas (ASGI). Usa httpx.AsyncClient,
+# com as mesmas regras de retry e as mesmas métricas do core/http_client.py.
+# httpx é opcional: sem ele, a chamada síncrona roda numa thread separada para
+# não travar o event loop.
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - depende do ambiente
+    httpx = None
+
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Um AsyncClient por event loop: o pool de conexões do httpx pertence ao loop que o criou
+_clients = weakref.WeakKeyDictionary()
+
+
+def _get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=http_client.POOL_CONNECTIONS * http_client.POOL_MAXSIZE,
+                max_keepalive_connections=http_client.POOL_MAXSIZE,
+            ),
+            timeout=http_client.DEFAULT_TIMEOUT,
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    """Mesmo cálculo do JitteredRetry: Retry-After (limitado) ou backoff exponencial com full jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), http_client.RETRY_AFTER_MAX)
+        except ValueError:
+            pass
+    backoff = min(http_client.BACKOFF_FACTOR * (2 ** attempt), http_client.BACKOFF_MAX)
+    return random.uniform(0, backoff)
+
+
+async def request(method: str, url: str, **kwargs):
+    """Equivalente assíncrono de http_client.request (params, headers, timeout...)."""
+    if httpx is None:
+        return await asyncio.to_thread(http_client.request, method, url, **kwargs)
+
+    kwargs.setdefault("timeout", http_client.DEFAULT_TIMEOUT)
+    host = urlsplit(url).netloc
+    retries = http_client.MAX_RETRIES if method.upper() in RETRY_METHODS else 0
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            response = await _get_client().request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt < retries:
+                await asyncio.sleep(_retry_delay(attempt, None))
+                attempt += 1
+                continue
+            http_client._record(host, None, time.monotonic() - start, attempt)
+            raise
+        if response.status_code in http_client.RETRY_STATUSES and attempt < retries:
+            await asyncio.sleep(_retry_delay(attempt, response.headers.get("retry-after")))
+            attempt += 1
+            continue
+        http_client._record(host, response.status_code, time.monotonic() - start, attempt)
+        return response
+
+
+async def get(url: str, **kwargs):
+    return await request("GET", url, **kwargs)
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Registro global dos caches criados, usado pelo endpoint de métricas
+_registry = {}
+_flight_registry = {}
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza uma consulta (Unicode, caixa e espaços) para servir de chave de cache."""
+    query = unicodedata.normalize("NFC", query or "")
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class TTLCache:
+    """
+    Cache em memória com expiração por tempo (TTL) e descarte LRU.
+    Opcionalmente guarda as entradas também em um arquivo SQLite (db_path),
+    para que sobrevivam a reinícios do servidor. Seguro para uso entre threads.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600,
+                 db_path: Optional[str] = None, disk_maxsize: int = 100000):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self.disk_maxsize = disk_maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+        _registry[name] = self
+
+    @staticmethod
+    def _disk_key(key: Hashable) -> str:
+        return json.dumps(key, ensure_ascii=False, default=str)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._data[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.name, self._disk_key(key)),
+                ).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self._disk_hits += 1
+                    return value
+
+            self._misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.name, self._disk_key(key), json.dumps(value, ensure_ascii=False), expires_at),
+                )
+                self._prune_disk()
+                self._db.commit()
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.name, self._disk_key(key)),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+                self._db.commit()
+
+    def _store(self, key, value, expires_at) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def _prune_disk(self) -> None:
+        """Remove entradas expiradas e, se passar do limite, as que expiram primeiro."""
+        self._db.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.name, time.time()),
+        )
+        self._db.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE namespace = ?"
+            " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.disk_maxsize),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescência de requisições: chamadas concorrentes com a mesma chave
+    compartilham uma única execução em andamento em vez de repeti-la.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._shared = 0
+        _flight_registry[name] = self
+
+    def do(self, key: Hashable, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+            else:
+                self._shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self._executed,
+                "shared": self._shared,
+            }
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight para corrotinas: chamadas concorrentes com a mesma chave, no mesmo
+    event loop, aguardam uma única tarefa em andamento.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._executed = 0
+        self._shared = 0
+        _flight_registry[name] = self
+
+    async def do(self, key: Hashable, fn, *args, **kwargs):
+        # Uma tarefa só pode ser aguardada no loop em que foi criada
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(loop_key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[loop_key] = task
+            self._executed += 1
+            task.add_done_callback(lambda _: self._calls.pop(loop_key, None))
+        else:
+            self._shared += 1
+        # shield: quem desistir (cancelamento) não cancela a tarefa dos demais
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self._executed,
+            "shared": self._shared,
+        }
+
+
+def cache_stats() -> dict:
+    """Estatísticas de todos os caches registrados no processo."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def flight_stats() -> dict:
+    """Estatísticas de coalescência de todas as instâncias de SingleFlight e AsyncSingleFlight."""
+    return {name: flight.stats() for name, flight in _flight_registry.items()}
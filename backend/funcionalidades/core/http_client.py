@@ -0,0 +1,135 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Cliente HTTP de saída compartilhado por todos os serviços (Semantic Scholar,
+# Wayback Machine, download de PDFs). Uma única Session mantém um pool de
+# conexões keep-alive por host, evitando um novo handshake TCP+TLS a cada chamada.
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "32"))  # quantos hosts mantêm pool
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))  # conexões reaproveitáveis por host
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "20"))
+RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "30"))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "15"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """
+    Retry do urllib3 com backoff exponencial e "full jitter", para que vários
+    workers não repitam a chamada no mesmo instante. O cabeçalho Retry-After
+    continua tendo prioridade, limitado a RETRY_AFTER_MAX segundos.
+    """
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, backoff)
+
+    def parse_retry_after(self, retry_after: str) -> float:
+        return min(super().parse_retry_after(retry_after), RETRY_AFTER_MAX)
+
+
+def _build_retry() -> Retry:
+    return JitteredRetry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_max=BACKOFF_MAX,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        respect_retry_after_header=True,
+        # Esgotadas as tentativas, devolve a última resposta para que o
+        # chamador trate o status (raise_for_status) como antes.
+        raise_on_status=False,
+    )
+
+
+class _HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.status = {}
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "status": dict(self.status),
+            "avg_time": round(self.total_time / self.requests, 4) if self.requests else 0.0,
+            "max_time": round(self.max_time, 4),
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Session única do processo, criada sob demanda."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=_build_retry(),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _record(host: str, status_code, elapsed: float, retries: int) -> None:
+    with _metrics_lock:
+        m = _metrics.setdefault(host, _HostMetrics())
+        m.requests += 1
+        m.retries += retries
+        m.total_time += elapsed
+        m.max_time = max(m.max_time, elapsed)
+        if status_code is None or status_code >= 400:
+            m.errors += 1
+        key = str(status_code) if status_code is not None else "exception"
+        m.status[key] = m.status.get(key, 0) + 1
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Mesma assinatura de requests.request, passando pelo pool compartilhado."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    host = urlsplit(url).netloc
+    start = time.monotonic()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        _record(host, None, time.monotonic() - start, 0)
+        raise
+    history = getattr(getattr(response.raw, "retries", None), "history", None) or ()
+    _record(host, response.status_code, time.monotonic() - start, len(history))
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def http_stats() -> dict:
+    """Métricas acumuladas por host de destino."""
+    with _metrics_lock:
+        return {host: m.as_dict() for host, m in _metrics.items()}
@@ -0,0 +1,173 @@
+import io
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from PyPDF2 import PdfReader
+
+# Motor único de extração de texto de PDFs (analyzer e writer). Documentos
+# pequenos são lidos na própria thread; documentos grandes são divididos em
+# faixas de páginas extraídas em paralelo num pool de processos.
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+DEFAULT_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0")) or None
+DEFAULT_TIME_BUDGET = float(os.getenv("PDF_TIME_BUDGET", "0")) or None
+SLOW_PAGE_SECONDS = float(os.getenv("PDF_SLOW_PAGE_SECONDS", "2"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"documents": 0, "pages": 0, "parallel_documents": 0, "total_time": 0.0, "truncated": 0}
+_slow_pages = deque(maxlen=50)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # "spawn" evita herdar locks das threads do servidor no fork
+                _executor = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+@contextmanager
+def _open_reader(source):
+    """PdfReader para a origem; o mapeamento em memória (caminhos) é fechado ao sair do bloco."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield PdfReader(io.BytesIO(source))
+    elif isinstance(source, str):
+        # Caminhos são mapeados em memória: o SO carrega só as páginas lidas
+        # e os workers compartilham o cache de páginas em vez de copiar os bytes.
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PdfReader(mapped)
+    else:
+        yield PdfReader(source)
+
+
+def _extract_range(source, start: int, end: int, deadline: Optional[float]) -> list:
+    """Extrai as páginas [start, end). Roda tanto no processo atual quanto nos workers."""
+    pages = []
+    with _open_reader(source) as reader:
+        for index in range(start, end):
+            if deadline is not None and time.time() > deadline:
+                break
+            began = time.perf_counter()
+            try:
+                text = reader.pages[index].extract_text() or ""
+            except Exception as e:
+                print(f"Erro ao extrair a página {index + 1}: {e}")
+                text = ""
+            pages.append((index, text, time.perf_counter() - began))
+    return pages
+
+
+def _extract_parallel(source, limit: int, deadline: Optional[float], time_budget: Optional[float]) -> Optional[list]:
+    """Divide as páginas em faixas, uma por worker. Retorna None se o pool não estiver utilizável."""
+    global _executor
+    step = -(-limit // PDF_WORKERS)
+    ranges = [(start, min(start + step, limit)) for start in range(0, limit, step)]
+    try:
+        futures = [_get_executor().submit(_extract_range, source, start, end, deadline) for start, end in ranges]
+    except BrokenProcessPool:
+        with _executor_lock:
+            _executor = None
+        print("Pool de extração de PDF indisponível; extraindo na thread atual.")
+        return None
+
+    done, not_done = wait(futures, timeout=time_budget + 1 if time_budget else None)
+    for future in not_done:
+        future.cancel()
+    pages = []
+    for (start, end), future in zip(ranges, futures):
+        if future not in done:
+            continue
+        error = future.exception()
+        if error is None:
+            pages.extend(future.result())
+            continue
+        # Worker morto ou erro na faixa: refaz só essa faixa na thread atual
+        print(f"Falha na faixa de páginas {start + 1}-{end}: {error!r}")
+        if isinstance(error, BrokenProcessPool):
+            with _executor_lock:
+                _executor = None
+        pages.extend(_extract_range(source, start, end, deadline))
+    return pages
+
+
+def extract_pdf_text(source, max_pages: Optional[int] = None, time_budget: Optional[float] = None,
+                     separator: str = "\n\n") -> dict:
+    """
+    Extrai o texto de um PDF (caminho, bytes ou arquivo aberto), na ordem das páginas.
+
+    Retorna um dicionário com:
+      text: texto das páginas não vazias unidas por `separator`;
+      page_count / extracted_pages: total de páginas e quantas foram lidas;
+      truncated: True se o limite de páginas ou o tempo (time_budget, em segundos) cortou o documento;
+      timings: lista de {"page", "seconds", "chars"} por página, para achar PDFs problemáticos.
+    """
+    max_pages = max_pages if max_pages is not None else DEFAULT_MAX_PAGES
+    time_budget = time_budget if time_budget is not None else DEFAULT_TIME_BUDGET
+
+    if hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        source = source.read()
+    elif isinstance(source, os.PathLike):
+        source = os.fspath(source)
+
+    started = time.perf_counter()
+    deadline = time.time() + time_budget if time_budget else None
+    with _open_reader(source) as reader:
+        page_count = len(reader.pages)
+    limit = min(page_count, max_pages) if max_pages else page_count
+
+    parallel = PDF_WORKERS > 1 and limit >= PDF_PARALLEL_MIN_PAGES
+    pages = _extract_parallel(source, limit, deadline, time_budget) if parallel else None
+    if pages is None:
+        parallel = False
+        pages = _extract_range(source, 0, limit, deadline)
+
+    pages.sort(key=lambda page: page[0])
+    elapsed = time.perf_counter() - started
+    truncated = len(pages) < page_count
+    timings = [{"page": index + 1, "seconds": round(seconds, 4), "chars": len(text)}
+               for index, text, seconds in pages]
+
+    with _stats_lock:
+        _stats["documents"] += 1
+        _stats["pages"] += len(pages)
+        _stats["parallel_documents"] += int(parallel)
+        _stats["total_time"] += elapsed
+        _stats["truncated"] += int(truncated)
+        for timing in timings:
+            if timing["seconds"] >= SLOW_PAGE_SECONDS:
+                _slow_pages.append({"page_count": page_count, **timing})
+
+    if truncated:
+        print(f"Extração parcial: {len(pages)} de {page_count} páginas em {elapsed:.1f}s.")
+
+    return {
+        "text": separator.join(text for _, text, _ in pages if text).strip(),
+        "page_count": page_count,
+        "extracted_pages": len(pages),
+        "truncated": truncated,
+        "elapsed": round(elapsed, 4),
+        "timings": timings,
+    }
+
+
+def extraction_stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "total_time": round(_stats["total_time"], 4), "slow_pages": list(_slow_pages)}
@@ -0,0 +1,293 @@
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Limitador de taxa (token bucket) por upstream e chave de API. Requisições que
+# passariam da cota esperam numa fila de prioridade limitada, em vez de irem
+# para o upstream e voltarem como 429.
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Cotas por upstream: (requisições por segundo, rajada máxima)
+UPSTREAM_LIMITS = {
+    "semantic_scholar": (
+        float(os.getenv("SEMANTIC_SCHOLAR_RPS", "1")),
+        int(os.getenv("SEMANTIC_SCHOLAR_BURST", "3")),
+    ),
+    "gemini": (
+        float(os.getenv("GEMINI_RPM", "60")) / 60,
+        int(os.getenv("GEMINI_BURST", "5")),
+    ),
+}
+MAX_QUEUE = int(os.getenv("RATE_LIMIT_MAX_QUEUE", "100"))
+MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+# Arquivo SQLite opcional para dividir o mesmo bucket entre vários processos (workers)
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB") or None
+# De quanto em quanto tempo uma espera assíncrona fora da cabeça da fila confere a vez
+ASYNC_POLL_INTERVAL = 0.05
+
+_priority = contextvars.ContextVar("rate_limit_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """A fila de espera está cheia ou o tempo máximo de espera foi atingido."""
+
+
+@contextmanager
+def priority(level: int):
+    """Define a prioridade das chamadas feitas dentro do bloco (ex: BACKGROUND)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket local ao processo."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Consome um token. Retorna 0 se conseguiu, ou quantos segundos faltam para o próximo."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket com estado num arquivo SQLite, compartilhado entre processos."""
+
+    def __init__(self, name: str, rate: float, capacity: int, db_path: str):
+        super().__init__(rate, capacity)
+        self.name = name
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RateLimiter:
+    """
+    Token bucket com fila de espera por prioridade (menor valor = atendido antes).
+    A fila é limitada em tamanho e em tempo de espera.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int, max_queue: int = MAX_QUEUE,
+                 max_wait: float = MAX_WAIT, db_path: Optional[str] = None):
+        self.name = name
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        if db_path:
+            self._bucket = SQLiteTokenBucket(name, rate, capacity, db_path)
+        else:
+            self._bucket = TokenBucket(rate, capacity)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._acquired = 0
+        self._rejected = 0
+        self._queued = 0
+        self._max_depth = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def acquire(self, level: Optional[int] = None) -> float:
+        """Bloqueia até haver um token disponível. Retorna o tempo de espera em segundos."""
+        level = _priority.get() if level is None else level
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        with self._cond:
+            if not self._queue and self._bucket.try_acquire() == 0:
+                self._acquired += 1
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                self._rejected += 1
+                raise RateLimitExceeded(f"Fila do limitador '{self.name}' está cheia.")
+
+            entry = (level, next(self._seq))
+            heapq.heappush(self._queue, entry)
+            self._queued += 1
+            self._max_depth = max(self._max_depth, len(self._queue))
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if self._queue[0] == entry:
+                        wait = self._bucket.try_acquire()
+                        if wait == 0:
+                            break
+                    else:
+                        wait = remaining
+                    if remaining <= 0:
+                        self._rejected += 1
+                        raise RateLimitExceeded(f"Tempo de espera esgotado no limitador '{self.name}'.")
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self._acquired += 1
+            self._total_wait += waited
+            self._max_wait_seen = max(self._max_wait_seen, waited)
+            return waited
+
+    def try_acquire(self) -> bool:
+        """Pega um token sem esperar, se não houver fila."""
+        with self._cond:
+            if not self._queue and self._bucket.try_acquire() == 0:
+                self._acquired += 1
+                return True
+            return False
+
+    async def _bucket_try_acquire(self) -> float:
+        # O bucket em SQLite faz I/O (BEGIN IMMEDIATE): fica fora do event loop
+        if isinstance(self._bucket, SQLiteTokenBucket):
+            return await asyncio.to_thread(self._bucket.try_acquire)
+        return self._bucket.try_acquire()
+
+    async def acquire_async(self, level: Optional[int] = None) -> float:
+        """
+        Mesma fila do acquire, mas a espera é um asyncio.sleep: centenas de chamadas
+        podem aguardar na fila sem ocupar uma thread cada.
+        """
+        level = _priority.get() if level is None else level
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        with self._cond:
+            queue_empty = not self._queue
+        if queue_empty and await self._bucket_try_acquire() == 0:
+            with self._cond:
+                self._acquired += 1
+            return 0.0
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._rejected += 1
+                raise RateLimitExceeded(f"Fila do limitador '{self.name}' está cheia.")
+            entry = (level, next(self._seq))
+            heapq.heappush(self._queue, entry)
+            self._queued += 1
+            self._max_depth = max(self._max_depth, len(self._queue))
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                with self._cond:
+                    at_head = self._queue[0] == entry
+                # Fora da cabeça da fila não há como saber quando chega a vez: verifica de tempos em tempos
+                wait = await self._bucket_try_acquire() if at_head else ASYNC_POLL_INTERVAL
+                if at_head and wait == 0:
+                    break
+                if remaining <= 0:
+                    with self._cond:
+                        self._rejected += 1
+                    raise RateLimitExceeded(f"Tempo de espera esgotado no limitador '{self.name}'.")
+                await asyncio.sleep(min(wait, remaining, ASYNC_POLL_INTERVAL))
+        finally:
+            with self._cond:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._acquired += 1
+            self._total_wait += waited
+            self._max_wait_seen = max(self._max_wait_seen, waited)
+        return waited
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_depth,
+                "acquired": self._acquired,
+                "queued": self._queued,
+                "rejected": self._rejected,
+                "avg_wait": round(self._total_wait / self._queued, 4) if self._queued else 0.0,
+                "max_wait": round(self._max_wait_seen, 4),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(upstream: str, api_key: Optional[str] = None) -> RateLimiter:
+    """Limitador do upstream para a chave de API informada (criado sob demanda)."""
+    key_id = hashlib.sha256((api_key or "").encode()).hexdigest()[:8]
+    name = f"{upstream}:{key_id}"
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate, capacity = UPSTREAM_LIMITS[upstream]
+            limiter = _limiters[name] = RateLimiter(name, rate, capacity, db_path=RATE_LIMIT_DB)
+        return limiter
+
+
+def acquire(upstream: str, api_key: Optional[str] = None, level: Optional[int] = None) -> float:
+    return get_limiter(upstream, api_key).acquire(level)
+
+
+async def acquire_async(upstream: str, api_key: Optional[str] = None, level: Optional[int] = None) -> float:
+    """Versão para views assíncronas: espera na mesma fila sem bloquear o event loop nem ocupar threads."""
+    return await get_limiter(upstream, api_key).acquire_async(level)
+
+
+def rate_limit_stats() -> dict:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
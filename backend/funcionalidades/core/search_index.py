@@ -0,0 +1,285 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from core.cache import normalize_query
+
+# Índice local de busca textual (SQLite FTS5) sobre os artigos já retornados pelo
+# explorer e sobre os favoritos de cada usuário. Serve a busca nos favoritos e o
+# modo offline da busca de artigos, sem ida ao Semantic Scholar.
+# Fica num arquivo SQLite próprio, separado do banco do Django.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_INDEX_DB = Path(os.getenv("SEARCH_INDEX_DB", str(BASE_DIR / ".cache" / "search_index.sqlite3")))
+SEARCH_INDEX_MAX_PAPERS = int(os.getenv("SEARCH_INDEX_MAX_PAPERS", "50000"))
+
+TOKEN = re.compile(r"\w+")
+
+
+def fts_query(text: str, match_all: bool = True) -> Optional[str]:
+    """Converte texto livre numa consulta FTS5 segura (termos entre aspas, o último como prefixo)."""
+    terms = [f'"{term}"' for term in TOKEN.findall(normalize_query(text))]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return (" " if match_all else " OR ").join(terms)
+
+
+class SearchIndex:
+    def __init__(self, db_path: Path, max_papers: int):
+        self.db_path = db_path
+        self.max_papers = max_papers
+        self._lock = threading.Lock()
+        self._db = None
+        self._searches = 0
+        self._indexed = 0
+        self._search_time = 0.0
+
+    def _conn(self) -> sqlite3.Connection:
+        # Criado sob demanda para não gerar arquivos só por importar o módulo
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS papers (
+                    key TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    authors TEXT NOT NULL DEFAULT '',
+                    year INTEGER,
+                    url TEXT,
+                    abstract TEXT NOT NULL DEFAULT '',
+                    citation_count INTEGER NOT NULL DEFAULT 0,
+                    journal TEXT,
+                    open_access INTEGER NOT NULL DEFAULT 0,
+                    seen_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS papers_seen_at ON papers (seen_at);
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                    title, authors, abstract,
+                    content='papers', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                    INSERT INTO papers_fts (rowid, title, authors, abstract)
+                    VALUES (new.rowid, new.title, new.authors, new.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                    INSERT INTO papers_fts (papers_fts, rowid, title, authors, abstract)
+                    VALUES ('delete', old.rowid, old.title, old.authors, old.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE OF title, authors, abstract ON papers BEGIN
+                    INSERT INTO papers_fts (papers_fts, rowid, title, authors, abstract)
+                    VALUES ('delete', old.rowid, old.title, old.authors, old.abstract);
+                    INSERT INTO papers_fts (rowid, title, authors, abstract)
+                    VALUES (new.rowid, new.title, new.authors, new.abstract);
+                END;
+
+                CREATE TABLE IF NOT EXISTS favorites (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    authors TEXT NOT NULL DEFAULT '',
+                    abstract TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS favorites_user ON favorites (user_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS favorites_fts USING fts5(
+                    title, authors, abstract,
+                    content='favorites', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS favorites_ai AFTER INSERT ON favorites BEGIN
+                    INSERT INTO favorites_fts (rowid, title, authors, abstract)
+                    VALUES (new.id, new.title, new.authors, new.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS favorites_ad AFTER DELETE ON favorites BEGIN
+                    INSERT INTO favorites_fts (favorites_fts, rowid, title, authors, abstract)
+                    VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS favorites_au AFTER UPDATE ON favorites BEGIN
+                    INSERT INTO favorites_fts (favorites_fts, rowid, title, authors, abstract)
+                    VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+                    INSERT INTO favorites_fts (rowid, title, authors, abstract)
+                    VALUES (new.id, new.title, new.authors, new.abstract);
+                END;
+
+                CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+                """
+            )
+            self._db = db
+        return self._db
+
+    def _timed_search(self, sql: str, text: str, params: tuple, limit: int) -> list:
+        """Busca com todos os termos; se não achar nada, com qualquer um deles (ordenado por BM25)."""
+        started = time.perf_counter()
+        rows = []
+        with self._lock:
+            db = self._conn()
+            for match_all in (True, False):
+                query = fts_query(text, match_all)
+                if query is None:
+                    break
+                rows = db.execute(sql, (query, *params, limit)).fetchall()
+                if rows:
+                    break
+            self._searches += 1
+            self._search_time += time.perf_counter() - started
+        return rows
+
+    # --- Artigos vistos pelo explorer ---
+
+    def index_papers(self, articles: Iterable[dict], open_access: bool = False) -> None:
+        """
+        Guarda (ou atualiza) os artigos de uma resposta do explorer. open_access indica
+        que a busca tinha o filtro de PDF gratuito, então todos os artigos são open access.
+        """
+        now = time.time()
+        rows = []
+        for article in articles:
+            title = (article.get("title") or "").strip()
+            if not title:
+                continue
+            url = article.get("url")
+            rows.append((
+                url or f"title:{normalize_query(title)}",
+                title,
+                ", ".join(article.get("authors") or []),
+                article.get("year"),
+                url,
+                article.get("abstract") or "",
+                article.get("citationCount") or 0,
+                article.get("journal"),
+                int(open_access),
+                now,
+            ))
+        if not rows:
+            return
+        with self._lock:
+            db = self._conn()
+            db.executemany(
+                "INSERT INTO papers (key, title, authors, year, url, abstract, citation_count, journal, open_access, seen_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET title = excluded.title, authors = excluded.authors,"
+                " year = excluded.year, abstract = excluded.abstract, citation_count = excluded.citation_count,"
+                " journal = excluded.journal, open_access = MAX(open_access, excluded.open_access),"
+                " seen_at = excluded.seen_at",
+                rows,
+            )
+            # Descarta os vistos há mais tempo além do limite
+            db.execute(
+                "DELETE FROM papers WHERE rowid IN (SELECT rowid FROM papers ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_papers,),
+            )
+            db.commit()
+            self._indexed += len(rows)
+
+    def search_papers(self, text: str, limit: int = 25, year_from: Optional[int] = None,
+                      year_to: Optional[int] = None, open_access_only: bool = False) -> List[dict]:
+        """Artigos já vistos mais relevantes para o texto, no mesmo formato do explorer."""
+        sql = (
+            "SELECT p.title, p.authors, p.year, p.url, p.abstract, p.citation_count, p.journal"
+            " FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid"
+            " WHERE papers_fts MATCH ? AND (? IS NULL OR p.year >= ?) AND (? IS NULL OR p.year <= ?)"
+            " AND p.open_access >= ?"
+            " ORDER BY bm25(papers_fts, 10.0, 3.0, 1.0) LIMIT ?"
+        )
+        params = (year_from, year_from, year_to, year_to, int(open_access_only))
+        rows = self._timed_search(sql, text, params, limit)
+        return [
+            {
+                "title": title,
+                "authors": [name for name in authors.split(", ") if name],
+                "year": year,
+                "url": url,
+                "abstract": abstract,
+                "citationCount": citations,
+                "journal": journal or "N/A",
+            }
+            for title, authors, year, url, abstract, citations, journal in rows
+        ]
+
+    # --- Favoritos ---
+
+    def upsert_favorite(self, favorite_id: int, user_id: int, title: str, authors: str, abstract: str) -> None:
+        self.upsert_favorites([(favorite_id, user_id, title, authors, abstract)])
+
+    def upsert_favorites(self, rows: Iterable[tuple]) -> None:
+        """Indexa vários favoritos (id, user_id, title, authors, abstract) numa transação só."""
+        rows = [
+            (favorite_id, user_id, title or "", authors or "", abstract or "")
+            for favorite_id, user_id, title, authors, abstract in rows
+        ]
+        with self._lock:
+            db = self._conn()
+            db.executemany(
+                "INSERT INTO favorites (id, user_id, title, authors, abstract) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET user_id = excluded.user_id, title = excluded.title,"
+                " authors = excluded.authors, abstract = excluded.abstract",
+                rows,
+            )
+            db.commit()
+
+    def delete_favorite(self, favorite_id: int) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM favorites WHERE id = ?", (favorite_id,))
+            db.commit()
+
+    def favorites_synced(self, source: str) -> bool:
+        """
+        True se o índice foi reconstruído a partir deste banco (source identifica o banco).
+        Trocar de banco (DB_ENGINE, SQLITE_PATH...) invalida o índice: os ids seriam de outros favoritos.
+        """
+        with self._lock:
+            row = self._conn().execute("SELECT value FROM meta WHERE name = 'favorites_synced'").fetchone()
+        return row is not None and row[0] == source
+
+    def favorites_count(self) -> int:
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM favorites").fetchone()[0]
+
+    def rebuild_favorites(self, rows: Iterable[tuple], source: str) -> int:
+        """Recria o índice de favoritos a partir de (id, user_id, title, authors, abstract) do banco source."""
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM favorites")
+            db.execute("INSERT INTO favorites_fts (favorites_fts) VALUES ('rebuild')")
+            count = 0
+            for row in rows:
+                db.execute(
+                    "INSERT OR REPLACE INTO favorites (id, user_id, title, authors, abstract) VALUES (?, ?, ?, ?, ?)",
+                    tuple(value if value is not None else "" for value in row),
+                )
+                count += 1
+            db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('favorites_synced', ?)", (source,))
+            db.commit()
+        return count
+
+    def search_favorites(self, user_id: int, text: str, limit: int = 20) -> List[int]:
+        """Ids dos favoritos do usuário ordenados por relevância (BM25, título com peso maior)."""
+        sql = (
+            "SELECT f.id FROM favorites_fts JOIN favorites f ON f.id = favorites_fts.rowid"
+            " WHERE favorites_fts MATCH ? AND f.user_id = ?"
+            " ORDER BY bm25(favorites_fts, 10.0, 3.0, 1.0) LIMIT ?"
+        )
+        return [row[0] for row in self._timed_search(sql, text, (user_id,), limit)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "searches": self._searches,
+                "indexed": self._indexed,
+                "avg_search_ms": round(self._search_time / self._searches * 1000, 3) if self._searches else 0.0,
+                "max_papers": self.max_papers,
+            }
+            if self._db is not None:
+                stats["papers"] = self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+                stats["favorites"] = self._db.execute("SELECT COUNT(*) FROM favorites").fetchone()[0]
+            return stats
+
+
+search_index = SearchIndex(SEARCH_INDEX_DB, SEARCH_INDEX_MAX_PAPERS) if SEARCH_INDEX_ENABLED else None
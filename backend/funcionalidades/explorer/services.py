@@ -1,10 +1,16 @@
+import asyncio
 import os
 import json
+import sqlite3
 import requests
 import google.generativeai as genai
 from dotenv import load_dotenv
 from pathlib import Path # Importe a biblioteca Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from core.cache import TTLCache, SingleFlight, AsyncSingleFlight, normalize_query
+from core import async_http, http_client, ratelimit
+from core.search_index import search_index
 
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -13,8 +19,58 @@ load_dotenv(dotenv_path=env_path)
 # Configura a API do Google com a chave que está no .env
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def extract_keywords_with_gemini(natural_language_query: str) -> str:
-    prompt = f"""
+# Cache da tradução consulta -> palavras-chave. Paginar, mudar a ordenação ou o
+# filtro de open access não muda a consulta, então não precisa chamar o Gemini de novo.
+# KEYWORDS_CACHE_DB (opcional) aponta para um arquivo SQLite que persiste o cache.
+keywords_cache = TTLCache(
+    name="keywords",
+    maxsize=int(os.getenv("KEYWORDS_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("KEYWORDS_CACHE_TTL", str(24 * 3600))),
+    db_path=os.getenv("KEYWORDS_CACHE_DB") or None,
+)
+
+# Cache dos resultados do Semantic Scholar, chaveado pela tupla canônica de
+# parâmetros enviada ao /paper/search, e coalescência de buscas idênticas simultâneas.
+search_cache = TTLCache(
+    name="search_results",
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "600")),
+)
+_search_flight = SingleFlight("semantic_scholar_search")
+
+SEARCH_PAGE_SIZE = 20
+# Modo offline da busca: prazo do Semantic Scholar antes de responder pelo índice
+# local e mínimo de artigos locais para o modo "first" dispensar o Semantic Scholar.
+SEARCH_OFFLINE_DEADLINE = float(os.getenv("SEARCH_OFFLINE_DEADLINE", "8"))
+SEARCH_LOCAL_MIN_RESULTS = int(os.getenv("SEARCH_LOCAL_MIN_RESULTS", "5"))
+_upstream_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_UPSTREAM_WORKERS", "8")),
+    thread_name_prefix="search-upstream",
+)
+SEMANTIC_SCHOLAR_API_URL = os.getenv("SEMANTIC_SCHOLAR_API_URL", "https://api.semanticscholar.org/graph/v1").rstrip('/')
+SEARCH_URL = f"{SEMANTIC_SCHOLAR_API_URL}/paper/search"
+
+# Pool usado pelo modo em pipeline: busca especulativa com a query bruta,
+# expansão pelo Gemini em paralelo e pré-carregamento da próxima página.
+_pipeline_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_PIPELINE_WORKERS", "8")),
+    thread_name_prefix="search-pipeline",
+)
+KEYWORDS_TIMEOUT = float(os.getenv("SEARCH_KEYWORDS_TIMEOUT", "10"))
+# A busca especulativa só sai se o Gemini não responder nesse tempo
+SPECULATIVE_DELAY = float(os.getenv("SEARCH_SPECULATIVE_DELAY", "1.5"))
+
+# Query usada na primeira página de cada busca (expandida pelo Gemini ou a original).
+# As páginas seguintes e o pré-carregamento usam a mesma, para a paginação por offset
+# percorrer sempre o mesmo conjunto de resultados.
+query_pins = TTLCache(
+    name="search_query_pins",
+    maxsize=int(os.getenv("SEARCH_PIN_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SEARCH_PIN_TTL", "3600")),
+)
+
+def _keywords_prompt(natural_language_query: str) -> str:
+    return f"""
     Você é um assistente de pesquisa especialista em otimizar buscas para o Semantic Scholar. Sua única tarefa é converter a consulta do usuário nos melhores e mais eficazes termos de busca.
 
     Siga estas regras estritamente:
@@ -40,37 +96,41 @@ def extract_keywords_with_gemini(natural_language_query: str) -> str:
     **Consulta do Usuário:** "{natural_language_query}"
     **Sua Saída:**
     """
+
+def _parse_keywords(response_text: str) -> str:
+    cleaned_text = response_text.strip().replace('```json', '').replace('```', '')
+    return json.loads(cleaned_text)['keywords']
+
+def extract_keywords_with_gemini(natural_language_query: str) -> str:
+    cache_key = normalize_query(natural_language_query)
+    cached = keywords_cache.get(cache_key)
+    if cached is not None:
+        print(f"Termos de busca obtidos do cache: '{cached}'")
+        return cached
+
+    prompt = _keywords_prompt(natural_language_query)
     try:
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"))
         model = genai.GenerativeModel('gemini-2.5-flash') 
         response = model.generate_content(prompt)
-        cleaned_text = response.text.strip().replace('```json', '').replace('```', '')
-        data = json.loads(cleaned_text)
-        keywords = data['keywords']
+        keywords = _parse_keywords(response.text)
         print(f"Termos de busca AVANÇADOS (PT+EN+Filtros) otimizados pelo Gemini: '{keywords}'")
+        keywords_cache.set(cache_key, keywords)
         return keywords
     except (json.JSONDecodeError, KeyError, Exception) as e:
         print(f"Erro ao processar resposta do Gemini: {e}. Usando fallback.")
         return natural_language_query # Fallback para a query original
 
-def search_articles_from_api(query: str, sort_by: str, year_from: int = None, year_to: int = None, offset: int = 0, is_open_access: bool = False):
-    """
-    Busca artigos com filtros avançados de ordenação, ano, open access e paginação.
-    """
+def _search_params(query: str, sort_by: str, year_from: int = None, year_to: int = None, offset: int = 0, is_open_access: bool = False) -> dict:
+    """Parâmetros do /paper/search com os filtros de ordenação, ano, open access e paginação."""
     print(f"--- INICIANDO BUSCA AVANÇADA ---")
     print(f"Query: '{query}', Sort: '{sort_by}', Ano: {year_from}-{year_to}, Offset: {offset}, OpenAccess: {is_open_access}")
-    
-    base_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    api_key = os.getenv("SEMANTIC_API_KEY")
-    if not api_key:
-        return {"error": "Chave da API do Semantic Scholar não configurada."}
 
-    headers = { 'x-api-key': api_key }
-    
     params = {
         'query': query,
-        'limit': 20, # O limite de resultados por página
+        'limit': SEARCH_PAGE_SIZE, # O limite de resultados por página
         'offset': offset, # O ponto de início da paginação
-        'fields': 'title,authors,year,url,abstract,citationCount,journal'
+        'fields': 'paperId,title,authors,year,url,abstract,citationCount,journal,openAccessPdf'
     }
 
     # --- LÓGICA DE FILTROS DINÂMICOS ---
@@ -101,38 +161,339 @@ def search_articles_from_api(query: str, sort_by: str, year_from: int = None, ye
         params['openAccessPdf'] = 'true'
         print("Filtro aplicado: Apenas Open Access")
 
+    return params
+
+def search_articles_from_api(query: str, sort_by: str, year_from: int = None, year_to: int = None, offset: int = 0, is_open_access: bool = False):
+    """
+    Busca artigos com filtros avançados de ordenação, ano, open access e paginação.
+    """
+    api_key = os.getenv("SEMANTIC_API_KEY")
+    if not api_key:
+        return {"error": "Chave da API do Semantic Scholar não configurada."}
+
+    headers = { 'x-api-key': api_key }
+    params = _search_params(query, sort_by, year_from, year_to, offset, is_open_access)
+
+    cache_key = tuple(sorted((k, str(v)) for k, v in params.items()))
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        print(f"Resultados obtidos do cache ({len(cached)} artigos).")
+        return cached
+
+    return _search_flight.do(cache_key, _fetch_search_results, SEARCH_URL, params, headers, cache_key)
+
+def _parse_search_results(data: dict) -> list:
+    """Converte a resposta do /paper/search na lista de artigos (só os que têm resumo)."""
+    results = []
+    articles_data = data.get('data', [])
+    print(f"Total de artigos brutos recebidos da API: {len(articles_data)}")
+
+    if articles_data:
+        for item in articles_data:
+            if not item.get('abstract'):
+                continue
+            
+            journal_info = item.get('journal')
+            journal_name = journal_info.get('name', 'N/A') if journal_info else 'N/A'
+            open_access = item.get('openAccessPdf') or {}
+            results.append({
+                'paperId': item.get('paperId'),
+                'title': item.get('title'),
+                'authors': [author['name'] for author in item.get('authors', [])],
+                'year': item.get('year'),
+                'url': item.get('url'),
+                'abstract': item.get('abstract'),
+                'citationCount': item.get('citationCount', 0),
+                'journal': journal_name,
+                'openAccessPdf': open_access.get('url') or None,
+            })
+    return results
+
+def _store_results(cache_key: tuple, params: dict, results: list) -> None:
+    """Guarda os resultados no cache e no índice local (usado pelo modo offline e pela busca nos favoritos)."""
+    search_cache.set(cache_key, results)
+    if search_index is None:
+        return
+    try:
+        search_index.index_papers(results, open_access='openAccessPdf' in params)
+    except sqlite3.Error as e:
+        print(f"Falha ao indexar resultados da busca: {e}")
+
+def search_articles_local(natural_language_query: str, year_from: int = None, year_to: int = None,
+                          offset: int = 0, is_open_access: bool = False) -> list:
+    """Busca só no índice local de artigos já vistos (sem Gemini nem Semantic Scholar)."""
+    if search_index is None:
+        return []
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=15)
+        articles = search_index.search_papers(
+            natural_language_query, limit=offset + SEARCH_PAGE_SIZE,
+            year_from=year_from, year_to=year_to, open_access_only=is_open_access,
+        )
+    except sqlite3.Error as e:
+        print(f"Índice local de artigos indisponível: {e}")
+        return []
+    return articles[offset:]
+
+def search_with_local_fallback(search, local_search, deadline: float = None):
+    """
+    Roda a busca no Semantic Scholar e, se ela falhar (erro ou limite de taxa), responde
+    pelo índice local. Depois do prazo, só responde pelo índice se ele tiver artigos:
+    sem nada local, continua esperando a busca, que pode ser lenta mas válida.
+    Retorna (artigos, veio_do_indice_local). Após o prazo a busca segue em segundo
+    plano, preenchendo o cache e o índice local.
+    """
+    deadline = SEARCH_OFFLINE_DEADLINE if deadline is None else deadline
+    if deadline <= 0:
+        articles = search()
+    else:
+        future = _upstream_executor.submit(search)
+        try:
+            articles = future.result(timeout=deadline)
+        except FuturesTimeout:
+            local = local_search()
+            if local:
+                print(f"Busca no Semantic Scholar passou de {deadline}s; respondendo pelo índice local.")
+                return local, True
+            articles = future.result()
+    if "error" in articles:
+        local = local_search()
+        if local:
+            return local, True
+    return articles, False
+
+def _fetch_search_results(base_url: str, params: dict, headers: dict, cache_key: tuple):
+    """Faz a chamada real ao Semantic Scholar e guarda no cache apenas respostas bem-sucedidas."""
+    try:
+        ratelimit.acquire("semantic_scholar", headers.get('x-api-key'))
+        response = http_client.get(base_url, params=params, headers=headers, timeout=15)
+        if response.status_code == 429:
+            print("Semantic Scholar respondeu 429 mesmo após as novas tentativas.")
+            return {"error": "Limite de requisições da base de artigos atingido.", "rate_limited": True}
         response.raise_for_status()
         
-        data = response.json()
-        
-        results = []
-        articles_data = data.get('data', [])
-        print(f"Total de artigos brutos recebidos da API: {len(articles_data)}")
-
-        if articles_data:
-            for item in articles_data:
-                if not item.get('abstract'):
-                    continue
-                
-                journal_info = item.get('journal')
-                journal_name = journal_info.get('name', 'N/A') if journal_info else 'N/A'
-                results.append({
-                    'title': item.get('title'),
-                    'authors': [author['name'] for author in item.get('authors', [])],
-                    'year': item.get('year'),
-                    'url': item.get('url'),
-                    'abstract': item.get('abstract'),
-                    'citationCount': item.get('citationCount', 0),
-                    'journal': journal_name
-                })
-        
+        results = _parse_search_results(response.json())
         print(f"Total de artigos com resumo: {len(results)}. Retornando TODOS.")
+        _store_results(cache_key, params, results)
         
         # Retorna todos os resultados encontrados (até o limite de 25)
         return results
 
+    except ratelimit.RateLimitExceeded as e:
+        print(f"Busca recusada pelo limitador local: {e}")
+        return {"error": "Limite de requisições da base de artigos atingido.", "rate_limited": True}
     except requests.exceptions.RequestException as e:
         print(f"Erro ao chamar a API do Semantic Scholar: {e}")
-        return {"error": "Falha ao se comunicar com a base de dados de artigos."}
\ No newline at end of file
+        return {"error": "Falha ao se comunicar com a base de dados de artigos."}
+
+def _pin_key(natural_language_query: str, filters: dict) -> tuple:
+    return (normalize_query(natural_language_query), filters['sort_by'], filters['year_from'],
+            filters['year_to'], bool(filters['is_open_access']))
+
+def search_articles_pipelined(natural_language_query: str, sort_by: str, year_from: int = None, year_to: int = None,
+                              offset: int = 0, is_open_access: bool = False, prefetch_next: bool = True):
+    """
+    Busca em pipeline: o Gemini expande a consulta e, se demorar mais que
+    SPECULATIVE_DELAY, uma busca especulativa com a query original vai para o
+    Semantic Scholar. Os resultados expandidos substituem os especulativos (que ficam
+    como fallback se a busca expandida falhar, vier vazia ou o Gemini passar do tempo).
+    A query escolhida fica fixada para as próximas páginas, e a próxima página é
+    pré-carregada em segundo plano no cache. Cada chamada faz no máximo duas buscas.
+
+    Retorna a tupla (query_usada, artigos).
+    """
+    filters = dict(sort_by=sort_by, year_from=year_from, year_to=year_to, is_open_access=is_open_access)
+    pin_key = _pin_key(natural_language_query, filters)
+    searches = 0
+
+    query_used = query_pins.get(pin_key) or keywords_cache.get(normalize_query(natural_language_query))
+    if query_used is not None:
+        # Query já conhecida: não há o que adiantar, segue direto.
+        searches += 1
+        articles = search_articles_from_api(query=query_used, offset=offset, **filters)
+    else:
+        keywords_future = _pipeline_executor.submit(extract_keywords_with_gemini, natural_language_query)
+        raw_future = None
+        try:
+            keywords = keywords_future.result(timeout=SPECULATIVE_DELAY)
+        except FuturesTimeout:
+            raw_future = _pipeline_executor.submit(
+                search_articles_from_api, query=natural_language_query, offset=offset, **filters
+            )
+            searches += 1
+            try:
+                keywords = keywords_future.result(timeout=max(KEYWORDS_TIMEOUT - SPECULATIVE_DELAY, 0))
+            except FuturesTimeout:
+                # O Gemini continua rodando e preenche o cache de palavras-chave.
+                print(f"Gemini excedeu {KEYWORDS_TIMEOUT}s; usando a busca especulativa.")
+                keywords = None
+
+        query_used = natural_language_query
+        articles = None
+        if keywords and normalize_query(keywords) != normalize_query(natural_language_query):
+            expanded = search_articles_from_api(query=keywords, offset=offset, **filters)
+            searches += 1
+            if isinstance(expanded, list) and expanded:
+                query_used, articles = keywords, expanded
+        if articles is None:
+            if raw_future is not None:
+                articles = raw_future.result()
+            else:
+                searches += 1
+                articles = search_articles_from_api(query=natural_language_query, offset=offset, **filters)
+
+    if isinstance(articles, list) and articles:
+        if query_pins.get(pin_key) is None:
+            query_pins.set(pin_key, query_used)
+        # Duas buscas nesta chamada (especulativa + expandida) já bastam
+        if prefetch_next and searches < 2:
+            _pipeline_executor.submit(
+                _prefetch_page, query_used, offset + SEARCH_PAGE_SIZE, filters
+            )
+    return query_used, articles
+
+def _prefetch_page(query: str, offset: int, filters: dict) -> None:
+    """Aquece o cache de resultados com a próxima página (prioridade baixa no limitador)."""
+    try:
+        with ratelimit.priority(ratelimit.BACKGROUND):
+            search_articles_from_api(query=query, offset=offset, **filters)
+    except Exception as e:
+        print(f"Falha ao pré-carregar a página (offset {offset}): {e}")
+
+
+# --- Versões assíncronas (views ASGI em api/views.py) ---
+# Nada de SQLite no event loop: o cache de palavras-chave (quando persistido em disco)
+# e a gravação no índice local rodam em threads; as esperas do limitador de taxa e do
+# HTTP não ocupam thread nenhuma.
+
+_async_search_flight = AsyncSingleFlight("semantic_scholar_search_async")
+# Referências às tarefas em segundo plano (pré-carregamento, buscas especulativas)
+_background_tasks = set()
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def _cache_get_async(cache: TTLCache, key):
+    if cache.db_path:
+        return await asyncio.to_thread(cache.get, key)
+    return cache.get(key)
+
+async def _cache_set_async(cache: TTLCache, key, value) -> None:
+    if cache.db_path:
+        await asyncio.to_thread(cache.set, key, value)
+    else:
+        cache.set(key, value)
+
+async def extract_keywords_with_gemini_async(natural_language_query: str) -> str:
+    cache_key = normalize_query(natural_language_query)
+    cached = await _cache_get_async(keywords_cache, cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        await ratelimit.acquire_async("gemini", os.getenv("GOOGLE_API_KEY"))
+        model = genai.GenerativeModel('gemini-2.5-flash')
+        response = await model.generate_content_async(_keywords_prompt(natural_language_query))
+        keywords = _parse_keywords(response.text)
+        await _cache_set_async(keywords_cache, cache_key, keywords)
+        return keywords
+    except Exception as e:
+        print(f"Erro ao processar resposta do Gemini: {e}. Usando fallback.")
+        return natural_language_query
+
+async def search_articles_from_api_async(query: str, sort_by: str, year_from: int = None, year_to: int = None,
+                                         offset: int = 0, is_open_access: bool = False):
+    """
+    Mesma busca do search_articles_from_api, sem ocupar uma thread enquanto espera o
+    Semantic Scholar. Buscas idênticas simultâneas viram uma só chamada.
+    """
+    api_key = os.getenv("SEMANTIC_API_KEY")
+    if not api_key:
+        return {"error": "Chave da API do Semantic Scholar não configurada."}
+
+    headers = { 'x-api-key': api_key }
+    params = _search_params(query, sort_by, year_from, year_to, offset, is_open_access)
+    cache_key = tuple(sorted((k, str(v)) for k, v in params.items()))
+    cached = await _cache_get_async(search_cache, cache_key)
+    if cached is not None:
+        return cached
+
+    return await _async_search_flight.do(cache_key, _fetch_search_results_async, params, headers, cache_key)
+
+async def _fetch_search_results_async(params: dict, headers: dict, cache_key: tuple):
+    try:
+        await ratelimit.acquire_async("semantic_scholar", headers.get('x-api-key'))
+        response = await async_http.get(SEARCH_URL, params=params, headers=headers, timeout=15)
+        if response.status_code == 429:
+            return {"error": "Limite de requisições da base de artigos atingido.", "rate_limited": True}
+        response.raise_for_status()
+    except ratelimit.RateLimitExceeded as e:
+        print(f"Busca recusada pelo limitador local: {e}")
+        return {"error": "Limite de requisições da base de artigos atingido.", "rate_limited": True}
+    except Exception as e:
+        print(f"Erro ao chamar a API do Semantic Scholar: {e}")
+        return {"error": "Falha ao se comunicar com a base de dados de artigos."}
+
+    results = _parse_search_results(response.json())
+    # O índice local é SQLite (FTS5): a gravação sai do event loop
+    await asyncio.to_thread(_store_results, cache_key, params, results)
+    return results
+
+async def search_articles_pipelined_async(natural_language_query: str, sort_by: str, year_from: int = None,
+                                          year_to: int = None, offset: int = 0, is_open_access: bool = False,
+                                          prefetch_next: bool = True):
+    """Mesmo pipeline do search_articles_pipelined, com tarefas asyncio no lugar do pool de threads."""
+    filters = dict(sort_by=sort_by, year_from=year_from, year_to=year_to, is_open_access=is_open_access)
+    pin_key = _pin_key(natural_language_query, filters)
+    searches = 0
+
+    query_used = query_pins.get(pin_key) or await _cache_get_async(keywords_cache, normalize_query(natural_language_query))
+    if query_used is not None:
+        searches += 1
+        articles = await search_articles_from_api_async(query=query_used, offset=offset, **filters)
+    else:
+        # _spawn: se passar do tempo, o Gemini e a busca especulativa terminam em segundo plano
+        keywords_task = _spawn(extract_keywords_with_gemini_async(natural_language_query))
+        raw_task = None
+        try:
+            keywords = await asyncio.wait_for(asyncio.shield(keywords_task), timeout=SPECULATIVE_DELAY)
+        except asyncio.TimeoutError:
+            raw_task = _spawn(search_articles_from_api_async(query=natural_language_query, offset=offset, **filters))
+            searches += 1
+            try:
+                keywords = await asyncio.wait_for(asyncio.shield(keywords_task),
+                                                  timeout=max(KEYWORDS_TIMEOUT - SPECULATIVE_DELAY, 0))
+            except asyncio.TimeoutError:
+                print(f"Gemini excedeu {KEYWORDS_TIMEOUT}s; usando a busca especulativa.")
+                keywords = None
+
+        query_used = natural_language_query
+        articles = None
+        if keywords and normalize_query(keywords) != normalize_query(natural_language_query):
+            expanded = await search_articles_from_api_async(query=keywords, offset=offset, **filters)
+            searches += 1
+            if isinstance(expanded, list) and expanded:
+                query_used, articles = keywords, expanded
+        if articles is None:
+            if raw_task is not None:
+                articles = await raw_task
+            else:
+                searches += 1
+                articles = await search_articles_from_api_async(query=natural_language_query, offset=offset, **filters)
+
+    if isinstance(articles, list) and articles:
+        if query_pins.get(pin_key) is None:
+            query_pins.set(pin_key, query_used)
+        if prefetch_next and searches < 2:
+            _spawn(_prefetch_page_async(query_used, offset + SEARCH_PAGE_SIZE, filters))
+    return query_used, articles
+
+async def _prefetch_page_async(query: str, offset: int, filters: dict) -> None:
+    """Aquece o cache de resultados com a próxima página (prioridade baixa no limitador)."""
+    try:
+        with ratelimit.priority(ratelimit.BACKGROUND):
+            await search_articles_from_api_async(query=query, offset=offset, **filters)
+    except Exception as e:
+        print(f"Falha ao pré-carregar a página (offset {offset}): {e}")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class FavoritesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'favorites'
+
+    def ready(self):
+        from favorites import signals  # noqa: F401 (registra os sinais do índice de busca)
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorites', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Paper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('url', models.URLField(blank=True, max_length=500, null=True, unique=True)),
+                ('title', models.CharField(max_length=500)),
+                ('authors', models.JSONField(blank=True, default=list)),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('abstract', models.TextField(blank=True, null=True)),
+                ('citation_count', models.IntegerField(default=0)),
+                ('journal', models.CharField(blank=True, max_length=300, null=True)),
+                ('open_access_pdf', models.URLField(blank=True, max_length=500, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='paper',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='favorites.paper'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+import json
+
+from django.db import migrations
+
+
+def _split_authors(authors):
+    """O campo antigo guardava os autores como texto (separados por vírgula ou JSON)."""
+    if not authors:
+        return []
+    try:
+        parsed = json.loads(authors)
+        if isinstance(parsed, list):
+            return [str(name).strip() for name in parsed if str(name).strip()]
+    except ValueError:
+        pass
+    return [name.strip() for name in authors.split(',') if name.strip()]
+
+
+def favorites_to_papers(apps, schema_editor):
+    """Cria um Paper por artigo distinto (pela URL) e aponta cada favorito para ele; remove favoritos repetidos."""
+    Favorite = apps.get_model('favorites', 'Favorite')
+    Paper = apps.get_model('favorites', 'Paper')
+
+    for favorite in list(Favorite.objects.order_by('id')):
+        url = favorite.url or None
+        if url:
+            paper = Paper.objects.filter(url=url).first()
+        else:
+            paper = Paper.objects.filter(url=None, title=favorite.title, year=favorite.year).first()
+
+        if paper is None:
+            paper = Paper.objects.create(
+                url=url,
+                title=favorite.title,
+                authors=_split_authors(favorite.authors),
+                year=favorite.year,
+                abstract=favorite.abstract,
+                citation_count=favorite.citation_count,
+            )
+        elif favorite.citation_count > paper.citation_count or (favorite.abstract and not paper.abstract):
+            paper.citation_count = max(paper.citation_count, favorite.citation_count)
+            paper.abstract = paper.abstract or favorite.abstract
+            paper.save(update_fields=['citation_count', 'abstract'])
+
+        if Favorite.objects.filter(user_id=favorite.user_id, paper=paper).exists():
+            favorite.delete()
+        else:
+            favorite.paper = paper
+            favorite.save(update_fields=['paper'])
+
+
+def papers_to_favorites(apps, schema_editor):
+    Favorite = apps.get_model('favorites', 'Favorite')
+    for favorite in Favorite.objects.select_related('paper'):
+        paper = favorite.paper
+        favorite.title = paper.title
+        favorite.url = paper.url
+        favorite.authors = ', '.join(paper.authors)
+        favorite.year = paper.year
+        favorite.abstract = paper.abstract
+        favorite.citation_count = paper.citation_count
+        favorite.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorites', '0002_paper'),
+    ]
+
+    operations = [
+        migrations.RunPython(favorites_to_papers, papers_to_favorites),
+    ]
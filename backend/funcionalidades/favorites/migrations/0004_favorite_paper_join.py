@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorites', '0003_favorites_to_papers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Default só para o caminho de volta: a coluna é recriada vazia e o 0003 a preenche
+        migrations.AlterField(
+            model_name='favorite',
+            name='title',
+            field=models.CharField(default='', max_length=500),
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='abstract',
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='authors',
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='citation_count',
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='title',
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='url',
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='year',
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='paper',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='favorites.paper'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'paper'), name='unique_favorite_per_user'),
+        ),
+    ]
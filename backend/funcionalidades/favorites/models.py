@@ -1,15 +1,46 @@
 from django.db import models
 from django.contrib.auth.models import User
 
-class Favorite(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
+class Paper(models.Model):
+    """
+    Catálogo compartilhado de artigos: cada artigo é guardado uma vez, com os
+    metadados do Semantic Scholar, e os favoritos de todos os usuários apontam para ele.
+    """
+    external_id = models.CharField(max_length=100, unique=True, blank=True, null=True)  # paperId do Semantic Scholar
+    url = models.URLField(max_length=500, unique=True, blank=True, null=True)
     title = models.CharField(max_length=500)
-    url = models.URLField(max_length=500, blank=True, null=True)
-    authors = models.TextField(blank=True, null=True) # Storing as text (comma separated or JSON) simplification
+    authors = models.JSONField(default=list, blank=True)  # lista de nomes
     year = models.IntegerField(blank=True, null=True)
     abstract = models.TextField(blank=True, null=True)
     citation_count = models.IntegerField(default=0)
+    journal = models.CharField(max_length=300, blank=True, null=True)
+    open_access_pdf = models.URLField(max_length=500, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Filtros por ano e citações na listagem de favoritos
+            models.Index(fields=['year', 'citation_count'], name='paper_year_citations_idx'),
+            models.Index(fields=['citation_count'], name='paper_citations_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+class Favorite(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
+    paper = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='favorites')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'paper'], name='unique_favorite_per_user'),
+        ]
+        indexes = [
+            # Listagem paginada: favoritos do usuário do mais recente para o mais antigo
+            models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.title} ({self.user.username})"
+        return f"{self.paper.title} ({self.user.username})"
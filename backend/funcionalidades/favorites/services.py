@@ -0,0 +1,355 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+from typing import Iterable, List, Optional
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from favorites.models import Favorite, Paper
+from core.search_index import search_index
+
+# Catálogo de artigos (Paper) compartilhado entre os usuários e busca nos favoritos
+# pelo índice local (core/search_index.py). O índice é mantido pelos sinais de
+# favorites/signals.py; na primeira busca do processo ele é reconstruído a partir do
+# banco se ainda não estiver sincronizado (ex.: índice apagado ou dados migrados).
+
+# Coluna de cada campo da API de favoritos, para carregar só os campos pedidos (?fields=)
+FAVORITE_COLUMNS = {
+    'id': 'id',
+    'user': 'user',
+    'title': 'paper__title',
+    'url': 'paper__url',
+    'authors': 'paper__authors',
+    'year': 'paper__year',
+    'abstract': 'paper__abstract',
+    'citation_count': 'paper__citation_count',
+    'paper_id': 'paper__external_id',
+    'journal': 'paper__journal',
+    'open_access_pdf': 'paper__open_access_pdf',
+    'created_at': 'created_at',
+}
+
+FAVORITES_BULK_MAX_ITEMS = int(os.getenv("FAVORITES_BULK_MAX_ITEMS", "5000"))
+FAVORITE_FILE_TYPES = ('ndjson', 'csv')
+
+# Metadados que um novo favorito pode completar num Paper já existente
+PAPER_METADATA = ('title', 'authors', 'year', 'abstract', 'journal', 'open_access_pdf')
+
+
+def normalize_authors(authors) -> list:
+    """Autores como lista de nomes, recebidos em lista ou em texto separado por vírgulas."""
+    if not authors:
+        return []
+    if isinstance(authors, str):
+        authors = authors.split(',')
+    return [str(name).strip() for name in authors if str(name).strip()]
+
+
+def _find_paper(external_id, url, title, year):
+    if external_id:
+        paper = Paper.objects.filter(external_id=external_id).first()
+        if paper is not None:
+            return paper
+    if url:
+        return Paper.objects.filter(url=url).first()
+    if not external_id:
+        # Sem identificador nenhum: mesmo título e ano é o mesmo artigo
+        return Paper.objects.filter(external_id=None, url=None, title=title, year=year).first()
+    return None
+
+
+def _paper_data(data: dict):
+    """(external_id, url, metadados, citações) dos dados de um artigo."""
+    metadata = {field: data.get(field) for field in PAPER_METADATA}
+    metadata['authors'] = normalize_authors(metadata['authors'])
+    return data.get('external_id') or None, data.get('url') or None, metadata, data.get('citation_count') or 0
+
+
+def _merge_paper(paper: Paper, fields: dict, citation_count: int) -> list:
+    """Completa os campos vazios do Paper e atualiza as citações. Retorna os campos alterados."""
+    changed = []
+    for field, value in fields.items():
+        if value not in (None, '', []) and getattr(paper, field) in (None, '', []):
+            setattr(paper, field, value)
+            changed.append(field)
+    if citation_count > paper.citation_count:
+        paper.citation_count = citation_count
+        changed.append('citation_count')
+    return changed
+
+
+def get_or_create_paper(data: dict) -> Paper:
+    """
+    Paper do catálogo para os dados de um artigo (pelo paperId do Semantic Scholar,
+    pela URL ou por título e ano). Num Paper existente, só completa os campos vazios
+    e atualiza o número de citações, para um usuário não sobrescrever os dados dos outros.
+    """
+    external_id, url, metadata, citation_count = _paper_data(data)
+
+    paper = _find_paper(external_id, url, metadata['title'], metadata['year'])
+    if paper is None:
+        try:
+            with transaction.atomic():
+                return Paper.objects.create(external_id=external_id, url=url, citation_count=citation_count, **metadata)
+        except IntegrityError:
+            # Outra requisição criou o mesmo artigo ao mesmo tempo
+            paper = _find_paper(external_id, url, metadata['title'], metadata['year'])
+            if paper is None:
+                raise
+
+    changed = _merge_paper(paper, {'external_id': external_id, 'url': url, **metadata}, citation_count)
+    if changed:
+        paper.save(update_fields=changed + ['updated_at'])
+    return paper
+
+
+class _PaperLookup:
+    """Papers já existentes para um lote de artigos, buscados com três consultas no total."""
+
+    def __init__(self, items: list):
+        external_ids = {external_id for external_id, _, _, _ in items if external_id}
+        urls = {url for _, url, _, _ in items if url}
+        titles = {metadata['title'] for external_id, url, metadata, _ in items if not external_id and not url}
+        self.by_external_id = {p.external_id: p for p in Paper.objects.filter(external_id__in=external_ids)}
+        self.by_url = {p.url: p for p in Paper.objects.filter(url__in=urls)}
+        self.by_title = {
+            (p.title, p.year): p
+            for p in Paper.objects.filter(external_id=None, url=None, title__in=titles)
+        }
+
+    def find(self, external_id, url, title, year) -> Optional[Paper]:
+        # Mesma ordem de _find_paper: paperId, URL e, sem nenhum dos dois, título e ano
+        if external_id and external_id in self.by_external_id:
+            return self.by_external_id[external_id]
+        if url:
+            return self.by_url.get(url)
+        if not external_id:
+            return self.by_title.get((title, year))
+        return None
+
+
+def lock_user_favorites(user) -> None:
+    """
+    Dentro de uma transação, serializa as escritas de favoritos do usuário (trava a linha
+    dele). No SQLite é desnecessário: a transação de escrita já é exclusiva.
+    """
+    User.objects.select_for_update().filter(pk=user.pk).exists()
+
+
+def bulk_add_favorites(user, items: List[dict]) -> dict:
+    """
+    Salva vários favoritos de uma vez, numa transação só: os Papers que faltam são
+    criados com um bulk_create, os favoritos com outro, e os que o usuário já tinha
+    são ignorados. Em Papers existentes só os metadados vazios e as citações são
+    atualizados (os identificadores não, para não colidir com outro Paper do lote).
+    """
+    items = [_paper_data(item) for item in items]
+    with transaction.atomic():
+        lock_user_favorites(user)
+        lookup = _PaperLookup(items)
+        new_papers, seen = [], set()
+        for external_id, url, metadata, citation_count in items:
+            if lookup.find(external_id, url, metadata['title'], metadata['year']) is not None:
+                continue
+            key = (external_id, url) if external_id or url else (metadata['title'], metadata['year'])
+            if key not in seen:
+                seen.add(key)
+                new_papers.append(Paper(external_id=external_id, url=url, citation_count=citation_count, **metadata))
+        # ignore_conflicts: artigos repetidos no lote (ou criados ao mesmo tempo) ficam com o primeiro
+        Paper.objects.bulk_create(new_papers, ignore_conflicts=True)
+        if new_papers:
+            lookup = _PaperLookup(items)
+
+        papers, changed_papers, changed_fields = [], {}, set()
+        for external_id, url, metadata, citation_count in items:
+            paper = lookup.find(external_id, url, metadata['title'], metadata['year'])
+            if paper is None:
+                continue
+            papers.append(paper)
+            changed = _merge_paper(paper, metadata, citation_count)
+            if changed:
+                changed_papers[paper.pk] = paper
+                changed_fields.update(changed)
+        if changed_papers:
+            Paper.objects.bulk_update(list(changed_papers.values()), sorted(changed_fields | {'updated_at'}))
+
+        paper_ids = {paper.pk for paper in papers}
+        saved = Favorite.objects.filter(user=user, paper_id__in=paper_ids)
+        existing = set(saved.values_list('paper_id', flat=True))
+        Favorite.objects.bulk_create(
+            [Favorite(user=user, paper_id=paper_id) for paper_id in paper_ids - existing],
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts não diz quais linhas entraram: conta de novo depois do insert
+        created = set(saved.values_list('paper_id', flat=True)) - existing
+
+    # bulk_create e bulk_update não disparam os sinais: o índice é atualizado aqui
+    reindexed = Favorite.objects.filter(Q(user=user, paper_id__in=created) | Q(paper_id__in=changed_papers))
+    index_favorites(reindexed.select_related('paper').iterator(chunk_size=500))
+    return {
+        "received": len(items),
+        "created": len(created),
+        "already_saved": len(paper_ids) - len(created),
+        "papers_created": len(new_papers),
+    }
+
+
+def list_favorites(user, fields: Optional[Iterable[str]] = None, year_from: Optional[int] = None,
+                   year_to: Optional[int] = None, min_citations: Optional[int] = None,
+                   max_citations: Optional[int] = None):
+    """
+    Favoritos do usuário, mais recentes primeiro, com os filtros aplicados no banco.
+    Com fields, só as colunas desses campos são lidas (o resumo, por exemplo, fica de fora).
+    """
+    favorites = Favorite.objects.filter(user=user).select_related('paper').order_by('-created_at')
+    if year_from is not None:
+        favorites = favorites.filter(paper__year__gte=year_from)
+    if year_to is not None:
+        favorites = favorites.filter(paper__year__lte=year_to)
+    if min_citations is not None:
+        favorites = favorites.filter(paper__citation_count__gte=min_citations)
+    if max_citations is not None:
+        favorites = favorites.filter(paper__citation_count__lte=max_citations)
+    if fields:
+        # id e created_at sempre: a paginação por cursor usa o created_at
+        columns = {'id', 'created_at', 'paper', *(FAVORITE_COLUMNS[field] for field in fields)}
+        favorites = favorites.only(*columns)
+    return favorites
+
+
+# Células de CSV que o Excel/LibreOffice interpretariam como fórmula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _looks_like_formula(value: str) -> bool:
+    # Aspas no começo também contam: "'=x" precisa de outra aspa para voltar igual na importação
+    return value.lstrip("'").startswith(CSV_FORMULA_PREFIXES)
+
+
+def csv_safe_row(row: dict) -> dict:
+    """Prefixa com ' os textos que começam como fórmula (CSV injection); read_favorites_file desfaz."""
+    return {
+        key: "'" + value if isinstance(value, str) and _looks_like_formula(value) else value
+        for key, value in row.items()
+    }
+
+
+def _csv_unescape(value: str) -> str:
+    if value.startswith("'") and _looks_like_formula(value[1:]):
+        return value[1:]
+    return value
+
+
+def read_favorites_file(uploaded_file, file_type: Optional[str] = None):
+    """
+    Lê um arquivo exportado (NDJSON ou CSV, pela extensão se file_type não vier) e
+    retorna a lista de favoritos como dicionários, ou {"error": ...}.
+    """
+    file_type = file_type or os.path.splitext(uploaded_file.name or '')[1].lstrip('.').lower()
+    if file_type == 'jsonl':
+        file_type = 'ndjson'
+    if file_type not in FAVORITE_FILE_TYPES:
+        return {"error": "Formato não reconhecido: envie um arquivo .ndjson ou .csv (ou informe o campo type)."}
+    try:
+        text = uploaded_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return {"error": "O arquivo precisa estar em UTF-8."}
+
+    if file_type == 'csv':
+        # Células vazias contam como campo ausente (ano, citações...)
+        return [
+            {key: _csv_unescape(value) for key, value in row.items() if key and value not in ('', None)}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    items = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            return {"error": f"Linha {number}: JSON inválido."}
+        if not isinstance(item, dict):
+            return {"error": f"Linha {number}: cada linha deve ser um objeto JSON."}
+        items.append(item)
+    return items
+
+
+def _index_row(favorite: Favorite) -> tuple:
+    paper = favorite.paper
+    return favorite.pk, favorite.user_id, paper.title, ', '.join(paper.authors), paper.abstract
+
+
+def index_favorite(favorite: Favorite) -> None:
+    if search_index is None:
+        return
+    try:
+        search_index.upsert_favorite(*_index_row(favorite))
+    except sqlite3.Error as e:
+        print(f"Falha ao indexar favorito {favorite.pk}: {e}")
+
+
+def index_favorites(favorites: Iterable[Favorite]) -> None:
+    if search_index is None:
+        return
+    try:
+        search_index.upsert_favorites(_index_row(favorite) for favorite in favorites)
+    except sqlite3.Error as e:
+        print(f"Falha ao indexar favoritos: {e}")
+
+
+def unindex_favorite(favorite_id: int) -> None:
+    if search_index is None:
+        return
+    try:
+        search_index.delete_favorite(favorite_id)
+    except sqlite3.Error as e:
+        print(f"Falha ao remover favorito {favorite_id} do índice: {e}")
+
+
+def _database_identity() -> str:
+    return f"{connection.vendor}:{connection.settings_dict['NAME']}"
+
+
+_index_count_checked = False
+
+
+def ensure_favorites_indexed() -> None:
+    """
+    Reconstrói o índice se ele veio de outro banco ou, na primeira busca do processo,
+    se o número de favoritos não bate (ex.: banco recriado com flush).
+    """
+    global _index_count_checked
+    source = _database_identity()
+    synced = search_index.favorites_synced(source)
+    if synced and not _index_count_checked:
+        _index_count_checked = True
+        synced = search_index.favorites_count() == Favorite.objects.count()
+    if synced:
+        return
+    rows = (
+        (pk, user_id, title, ', '.join(authors or []), abstract)
+        for pk, user_id, title, authors, abstract in Favorite.objects.values_list(
+            "id", "user_id", "paper__title", "paper__authors", "paper__abstract"
+        ).iterator()
+    )
+    count = search_index.rebuild_favorites(rows, source)
+    print(f"Índice de favoritos reconstruído ({count} favoritos).")
+
+
+def search_favorites(user, text: str, limit: int = 20) -> List[Favorite]:
+    """Favoritos do usuário mais relevantes para o texto, em ordem de relevância."""
+    # Sempre filtrado pelo usuário: um índice desatualizado não pode devolver favoritos de outra pessoa
+    favorites = Favorite.objects.filter(user=user).select_related('paper')
+    if search_index is None:
+        # Sem o índice: busca simples no título (sem ranking)
+        return list(favorites.filter(paper__title__icontains=text).order_by('-created_at')[:limit])
+    ensure_favorites_indexed()
+    ids = search_index.search_favorites(user.pk, text, limit)
+    found = favorites.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
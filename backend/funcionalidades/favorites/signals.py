@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from favorites.models import Favorite, Paper
+from favorites.services import index_favorite, index_favorites, unindex_favorite
+
+# Mantém o índice de busca local em dia a cada favorito salvo ou removido. O índice é
+# outro arquivo, fora da transação do banco: só é atualizado depois do commit, para
+# que um save desfeito (rollback) não deixe entradas no índice.
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index_favorite(instance))
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    favorite_id = instance.pk
+    transaction.on_commit(lambda: unindex_favorite(favorite_id))
+
+
+@receiver(post_save, sender=Paper)
+def paper_saved(sender, instance, created, **kwargs):
+    # Metadados completados num artigo já favoritado valem para todos os favoritos dele
+    if not created:
+        transaction.on_commit(lambda: index_favorites(instance.favorites.select_related('paper')))
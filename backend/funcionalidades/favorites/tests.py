@@ -0,0 +1,70 @@
+import csv
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+
+from favorites.services import csv_safe_row, read_favorites_file
+
+
+class CsvSafeRowTests(SimpleTestCase):
+
+    def test_prefixa_inicios_de_formula(self):
+        for value in ("=SUM(A1:A2)", "+55 11", "-1", "@cmd", "\tx", "\rx"):
+            with self.subTest(value=value):
+                self.assertEqual(csv_safe_row({"title": value})["title"], "'" + value)
+
+    def test_textos_comuns_ficam_iguais(self):
+        row = {"title": "Deep learning", "authors": "A. Silva, B. Souza", "abstract": "x = y", "url": ""}
+        self.assertEqual(csv_safe_row(row), row)
+
+    def test_valores_que_nao_sao_texto_ficam_iguais(self):
+        row = {"year": 2020, "citation_count": -1, "journal": None}
+        self.assertEqual(csv_safe_row(row), row)
+
+    def test_aspas_antes_de_formula_ganham_mais_uma(self):
+        self.assertEqual(csv_safe_row({"title": "'=x"})["title"], "''=x")
+
+    def test_aspas_sem_formula_ficam_iguais(self):
+        self.assertEqual(csv_safe_row({"title": "'citação'"})["title"], "'citação'")
+
+
+class CsvRoundTripTests(SimpleTestCase):
+    """O que sai do export em CSV volta igual pelo read_favorites_file."""
+
+    def _round_trip(self, rows):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(csv_safe_row(row))
+        uploaded = SimpleUploadedFile("favoritos.csv", buffer.getvalue().encode("utf-8"))
+        return read_favorites_file(uploaded)
+
+    def test_valores_escapados_voltam_ao_original(self):
+        titles = ["=HYPERLINK(\"http://example.org\")", "+1", "-x", "@y", "'=z", "''@w", "'texto'", "normal"]
+        rows = [{"title": title, "url": f"https://example.org/{i}"} for i, title in enumerate(titles)]
+        self.assertEqual([item["title"] for item in self._round_trip(rows)], titles)
+
+    def test_celulas_vazias_viram_campo_ausente(self):
+        items = self._round_trip([{"title": "a", "year": "", "url": "https://example.org/a"}])
+        self.assertEqual(items, [{"title": "a", "url": "https://example.org/a"}])
+
+
+class ReadFavoritesFileTests(SimpleTestCase):
+
+    def test_tipo_desconhecido(self):
+        result = read_favorites_file(SimpleUploadedFile("favoritos.txt", b"x"))
+        self.assertIn("error", result)
+
+    def test_ndjson_ignora_linhas_vazias(self):
+        uploaded = SimpleUploadedFile("favoritos.jsonl", b'{"title": "a"}\n\n{"title": "b"}\n')
+        self.assertEqual(read_favorites_file(uploaded), [{"title": "a"}, {"title": "b"}])
+
+    def test_ndjson_invalido_aponta_a_linha(self):
+        uploaded = SimpleUploadedFile("favoritos.ndjson", b'{"title": "a"}\n{quebrado\n')
+        self.assertEqual(read_favorites_file(uploaded), {"error": "Linha 2: JSON inválido."})
+
+    def test_ndjson_linha_que_nao_e_objeto(self):
+        uploaded = SimpleUploadedFile("favoritos.ndjson", b'["a"]\n')
+        self.assertIn("error", read_favorites_file(uploaded))
@@ -0,0 +1,42 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import models
+
+class Job(models.Model):
+    """Operação longa (resumo, extração, formatação) executada fora da requisição."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Na fila'),
+        (RUNNING, 'Executando'),
+        (SUCCEEDED, 'Concluído'),
+        (FAILED, 'Falhou'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=30)
+    input_hash = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    # Quem enviou o job; sem login o job é anônimo e basta conhecer o id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Processo que está executando o job (host:pid:boot) e o último sinal de vida dele
+    owner = models.CharField(max_length=100, blank=True, default='')
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'input_hash'], name='job_kind_input_idx'),
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from jobs.models import Job
+
+# Fila de jobs local: o registro fica no banco (SQLite) e a execução num pool de
+# threads do próprio processo, sem broker externo. A requisição só enfileira e
+# devolve o id; o cliente acompanha por GET /api/jobs/<id>/.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_UPLOAD_DIR = Path(os.getenv("JOB_UPLOAD_DIR", str(BASE_DIR / ".cache" / "jobs")))
+# Resultados concluídos há menos que isso são reaproveitados para a mesma entrada
+JOB_DEDUP_TTL = float(os.getenv("JOB_DEDUP_TTL", str(3600)))
+# Enquanto executa um job, o processo renova o heartbeat_at a cada JOB_HEARTBEAT_INTERVAL;
+# jobs "executando" sem sinal de vida há mais que JOB_STALE_AFTER são órfãos e viram falhos
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", str(4 * JOB_HEARTBEAT_INTERVAL)))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-worker")
+_submit_lock = threading.Lock()
+_recovered = False
+_stats_lock = threading.Lock()
+_stats = {"submitted": 0, "deduplicated": 0, "succeeded": 0, "failed": 0, "orphaned": 0}
+# Identifica este processo; o sufixo aleatório distingue um reinício que reaproveite o mesmo pid
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_running = set()
+_running_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+# --- Handlers: recebem o payload e retornam um dicionário (com "error" em caso de falha) ---
+
+def _run_summarize(payload: dict) -> dict:
+    from analyzer.services import summarize_article, summarize_article_with_gemini
+    if payload.get("file_path"):
+        text_result = _read_upload(payload["file_path"])
+        if "error" in text_result:
+            return text_result
+        return summarize_article_with_gemini(text_result["text"], natural_language_query=payload.get("query"))
+    return summarize_article(payload["input_value"], is_url=payload.get("is_url", False),
+                             natural_language_query=payload.get("query"))
+
+
+def _run_extract(payload: dict) -> dict:
+    from analyzer.services import extract_text_content
+    if payload.get("file_path"):
+        return _read_upload(payload["file_path"])
+    return extract_text_content(payload["input_value"], is_url=payload.get("is_url", False))
+
+
+def _run_format(payload: dict) -> dict:
+    from writer.services import extract_text_from_file, format_text_with_gemini
+    with open(payload["file_path"], "rb") as f:
+        extracted_text = extract_text_from_file(f)
+    result = format_text_with_gemini(extracted_text, payload.get("style"), payload["filename"])
+    if not result.get("success"):
+        return {"error": result.get("error") or "Falha na formatação."}
+    base_name = result["base_filename"]
+    return {
+        "message": "Sucesso",
+        "pdf_download_url": f"/download/{base_name}/pdf/",
+        "tex_download_url": f"/download/{base_name}/tex/",
+    }
+
+
+def _read_upload(path: str) -> dict:
+    from analyzer.services import extract_text_from_file_obj
+    with open(path, "rb") as f:
+        return extract_text_from_file_obj(f)
+
+
+HANDLERS = {
+    "summarize": _run_summarize,
+    "extract": _run_extract,
+    "format": _run_format,
+}
+
+
+def input_hash(kind: str, payload: dict, file_bytes: Optional[bytes] = None) -> str:
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    if file_bytes is not None:
+        digest.update(hashlib.sha256(file_bytes).digest())
+    return digest.hexdigest()
+
+
+def save_upload(uploaded_file) -> tuple:
+    """Guarda o arquivo enviado para o worker ler depois. Retorna (caminho, bytes)."""
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    suffix = Path(uploaded_file.name).suffix.lower()
+    JOB_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    path = JOB_UPLOAD_DIR / f"{hashlib.sha256(data).hexdigest()}{suffix}"
+    if not path.exists():
+        path.write_bytes(data)
+    return str(path), data
+
+
+def _execute(job_id) -> None:
+    close_old_connections()
+    try:
+        # Marca como "executando" só se ainda estiver na fila (evita rodar duas vezes)
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+            status=Job.RUNNING, started_at=now, owner=OWNER, heartbeat_at=now
+        )
+        if not claimed:
+            return
+        with _running_lock:
+            _running.add(job_id)
+        job = Job.objects.get(pk=job_id)
+        try:
+            result = HANDLERS[job.kind](job.payload)
+        except Exception as e:
+            traceback.print_exc()
+            result = {"error": str(e)}
+
+        failed = "error" in result
+        Job.objects.filter(pk=job_id).update(
+            status=Job.FAILED if failed else Job.SUCCEEDED,
+            result=result,
+            error=result.get("error", "") if failed else "",
+            finished_at=timezone.now(),
+        )
+        with _stats_lock:
+            _stats["failed" if failed else "succeeded"] += 1
+    finally:
+        with _running_lock:
+            claimed_here = job_id in _running
+            _running.discard(job_id)
+        if claimed_here:
+            _fail_unfinished(job_id)
+        close_old_connections()
+
+
+def _fail_unfinished(job_id) -> None:
+    """
+    Se a thread saiu sem gravar o resultado (erro no próprio banco, resultado inválido...),
+    o job ficaria "executando" para sempre neste processo, que os órfãos não cobrem.
+    """
+    try:
+        failed = Job.objects.filter(pk=job_id, status=Job.RUNNING, owner=OWNER).update(
+            status=Job.FAILED, error="Execução interrompida por um erro interno.", finished_at=timezone.now()
+        )
+    except Exception as e:
+        print(f"Falha ao encerrar o job {job_id}: {e}")
+        return
+    if failed:
+        with _stats_lock:
+            _stats["failed"] += 1
+
+
+def _heartbeat_loop() -> None:
+    """Renova o heartbeat_at dos jobs que este processo está executando."""
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with _running_lock:
+            running = list(_running)
+        if not running:
+            continue
+        try:
+            Job.objects.filter(pk__in=running, status=Job.RUNNING, owner=OWNER).update(heartbeat_at=timezone.now())
+        except Exception as e:
+            print(f"Falha ao renovar o heartbeat dos jobs: {e}")
+        finally:
+            close_old_connections()
+
+
+def _start_heartbeat() -> None:
+    global _heartbeat_thread
+    if _heartbeat_thread is None:
+        _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+        _heartbeat_thread.start()
+
+
+def _owner_is_dead(owner: str) -> bool:
+    """Dono neste mesmo host cujo processo não existe mais (sem esperar o heartbeat vencer)."""
+    host, _, rest = owner.partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit() or owner == OWNER:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+def _fail_orphans(job_ids: list) -> None:
+    if not job_ids:
+        return
+    now = timezone.now()
+    failed = Job.objects.filter(pk__in=job_ids, status=Job.RUNNING).exclude(owner=OWNER).update(
+        status=Job.FAILED, error="Execução interrompida (o processo que executava o job parou).", finished_at=now
+    )
+    if failed:
+        with _stats_lock:
+            _stats["orphaned"] += failed
+
+
+def _orphan_ids(jobs) -> list:
+    """Jobs "executando" de outro processo sem heartbeat recente ou cujo processo dono já morreu."""
+    cutoff = timezone.now() - timedelta(seconds=JOB_STALE_AFTER)
+    running = jobs.filter(status=Job.RUNNING).exclude(owner=OWNER)
+    ids = list(running.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    ).values_list("pk", flat=True))
+    ids += [pk for pk, owner in running.exclude(pk__in=ids).values_list("pk", "owner") if _owner_is_dead(owner)]
+    return ids
+
+
+def _recover() -> None:
+    """Na primeira submissão do processo: reenfileira pendentes, encerra órfãos e limpa jobs antigos."""
+    global _recovered
+    if _recovered:
+        return
+    _recovered = True
+    _start_heartbeat()
+    now = timezone.now()
+    _fail_orphans(_orphan_ids(Job.objects.all()))
+    Job.objects.filter(finished_at__lt=now - timedelta(seconds=JOB_RETENTION)).delete()
+    if JOB_UPLOAD_DIR.exists():
+        cutoff = now.timestamp() - JOB_RETENTION
+        for path in JOB_UPLOAD_DIR.iterdir():
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+    for job_id in Job.objects.filter(status=Job.PENDING).values_list("pk", flat=True):
+        _executor.submit(_execute, job_id)
+
+
+def submit_job(kind: str, payload: dict, file_bytes: Optional[bytes] = None, user=None) -> tuple:
+    """
+    Enfileira um job e retorna (job, deduplicado). Se já existe um job igual do mesmo
+    usuário (ou anônimo, sem login) na fila, executando ou concluído há pouco tempo,
+    ele é devolvido em vez de criar outro.
+    """
+    user = user if user is not None and user.is_authenticated else None
+    if kind not in HANDLERS:
+        raise ValueError(f"Tipo de job desconhecido: {kind}")
+    key = input_hash(kind, {k: v for k, v in payload.items() if k != "file_path"}, file_bytes)
+
+    with _submit_lock:
+        _recover()
+        same_input = Job.objects.filter(kind=kind, input_hash=key, user=user)
+        # Um job "executando" cujo processo parou nunca vai terminar: encerra em vez de reaproveitar
+        _fail_orphans(_orphan_ids(same_input))
+        recent = timezone.now() - timedelta(seconds=JOB_DEDUP_TTL)
+        existing = (
+            same_input.filter(status__in=[Job.PENDING, Job.RUNNING]).first()
+            or same_input.filter(status=Job.SUCCEEDED, finished_at__gte=recent)
+            .order_by("-finished_at").first()
+        )
+        if existing is not None:
+            with _stats_lock:
+                _stats["deduplicated"] += 1
+            return existing, True
+        job = Job.objects.create(kind=kind, input_hash=key, payload=payload, user=user)
+
+    with _stats_lock:
+        _stats["submitted"] += 1
+    _executor.submit(_execute, job.pk)
+    return job, False
+
+
+def get_job(job_id, user=None) -> Optional[Job]:
+    """
+    Job visível para o usuário: os anônimos para qualquer um com o id, os de um
+    usuário só para ele (o resultado traz o texto e o resumo do artigo).
+    """
+    jobs = Job.objects.filter(pk=job_id)
+    if user is not None and user.is_authenticated:
+        jobs = jobs.filter(Q(user__isnull=True) | Q(user=user))
+    else:
+        jobs = jobs.filter(user__isnull=True)
+    return jobs.first()
+
+
+def job_to_dict(job: Job) -> dict:
+    data = {
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == Job.SUCCEEDED:
+        data["result"] = job.result
+    elif job.status == Job.FAILED:
+        data["error"] = job.error
+    return data
+
+
+def job_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["workers"] = JOB_WORKERS
+    stats["queued"] = _executor._work_queue.qsize()
+    return stats
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
     'analyzer',
     'writer',
     'favorites',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -88,12 +90,59 @@ WSGI_APPLICATION = 'researchflow.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Perfil escolhido por DB_ENGINE:
+#   sqlite (padrão): cada conexão ajusta busy timeout e mmap (e, com SQLITE_WAL, liga o
+#   WAL, em que leituras não esperam as escritas, com synchronous=NORMAL); transações de
+#   escrita pegam o lock já no início (IMMEDIATE), em vez de falhar com "database is locked" no meio.
+#   postgres: conexões persistentes (DB_CONN_MAX_AGE) ou o pool do psycopg (DB_POOL).
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'researchflow'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.getenv('DB_POOL', 'false').lower() in ('1', 'true', 'yes'):
+        # Requer psycopg[pool]; o pool substitui as conexões persistentes
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH') or BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {},
+        }
+    }
+    # SQLITE_TUNING=false volta à configuração padrão do Django (útil para comparar)
+    if os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes'):
+        init_command = (
+            f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '10000'))};"
+            f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))};"
+        )
+        # O WAL fica gravado no próprio arquivo do banco, então só é ligado quando pedido
+        # (SQLITE_WAL=true, em produção): o db.sqlite3 de desenvolvimento é versionado.
+        if os.getenv('SQLITE_WAL', 'false').lower() in ('1', 'true', 'yes'):
+            # synchronous=NORMAL só é seguro contra corrupção no modo WAL
+            init_command = 'PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;' + init_command
+        DATABASES['default']['OPTIONS'] = {
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': init_command,
+        }
 
 
 # Password validation
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+# Armazenamento dos arquivos gerados pelo writer (.tex e .pdf) na pasta arquivos/.
+# Cada formatação trabalha numa pasta própria (arquivos/.work/<uuid>/), apagada no
+# fim; só o .tex e o .pdf finais são guardados, com o hash do .tex no nome
+# ("<hash>-<nome>"), então uploads simultâneos com o mesmo nome não se sobrescrevem.
+# Um coletor remove artefatos vencidos (TTL) e os mais antigos além do limite de espaço.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARTIFACT_DIR = Path(os.getenv("WRITER_ARTIFACT_DIR", str(BASE_DIR / "arquivos")))
+WORK_DIR = ARTIFACT_DIR / ".work"
+ARTIFACT_TTL = float(os.getenv("WRITER_ARTIFACT_TTL", str(7 * 24 * 3600)))
+ARTIFACT_MAX_BYTES = int(os.getenv("WRITER_ARTIFACT_MAX_BYTES", str(500 * 1024 * 1024)))
+ARTIFACT_GC_INTERVAL = float(os.getenv("WRITER_ARTIFACT_GC_INTERVAL", "300"))
+# Pastas de trabalho mais antigas que isso são de formatações interrompidas
+WORK_DIR_STALE_AFTER = 3600
+
+HASH_CHARS = 16
+# Só os arquivos com esse formato de nome são gerenciados (e apagados) pelo coletor
+ARTIFACT_NAME = re.compile(rf"^[0-9a-f]{{{HASH_CHARS}}}-[\w.-]+$")
+FILE_TYPES = {"pdf": ".pdf", "tex": ".tex"}
+
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+_stats_lock = threading.Lock()
+_stats = {"stored": 0, "expired": 0, "evicted": 0, "freed_bytes": 0}
+
+
+def safe_name(filename: str) -> str:
+    name = re.sub(r"[^\w.-]", "_", filename or "").strip("._")
+    return name[:80] or "documento"
+
+
+@contextmanager
+def job_workdir():
+    """Pasta de trabalho exclusiva de uma formatação; apagada (com .aux, .log etc.) ao sair."""
+    path = WORK_DIR / uuid.uuid4().hex
+    path.mkdir(parents=True, exist_ok=True)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def store(tex_path: str, pdf_path: str, filename: str) -> str:
+    """Move o .tex e o .pdf finais para o armazenamento e retorna o nome do artefato."""
+    digest = hashlib.sha256(Path(tex_path).read_bytes()).hexdigest()[:HASH_CHARS]
+    name = f"{digest}-{safe_name(filename)}"
+    ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+    for source, suffix in ((tex_path, ".tex"), (pdf_path, ".pdf")):
+        target = ARTIFACT_DIR / f"{name}{suffix}"
+        # os.replace é atômico: um download em andamento nunca vê um arquivo pela metade
+        os.replace(source, target)
+    with _stats_lock:
+        _stats["stored"] += 1
+    maybe_collect_garbage()
+    return name
+
+
+def artifact_path(name: str, file_type: str) -> Optional[Path]:
+    """Caminho de um artefato ('pdf' ou 'tex'), ou None se não existir ou o nome for inválido."""
+    suffix = FILE_TYPES.get(file_type)
+    if suffix is None or not re.fullmatch(r"[\w.-]+", name or "") or name.startswith("."):
+        return None
+    path = ARTIFACT_DIR / f"{name}{suffix}"
+    if not path.exists() and file_type == "tex":
+        # Arquivos antigos, gerados antes do armazenamento, podem ter só o _temp.tex
+        path = ARTIFACT_DIR / f"{name}_temp.tex"
+    return path if path.is_file() else None
+
+
+def _managed_artifacts() -> list:
+    """Artefatos gerenciados como (mtime, bytes, [arquivos]): o .tex e o .pdf andam juntos."""
+    if not ARTIFACT_DIR.exists():
+        return []
+    groups = {}
+    for path in ARTIFACT_DIR.iterdir():
+        if path.is_file() and ARTIFACT_NAME.match(path.stem):
+            stat = path.stat()
+            mtime, size, paths = groups.get(path.stem, (0.0, 0, []))
+            groups[path.stem] = (max(mtime, stat.st_mtime), size + stat.st_size, paths + [path])
+    return list(groups.values())
+
+
+def _remove(paths: list) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def collect_garbage() -> dict:
+    """Remove artefatos vencidos, depois os mais antigos até caber em ARTIFACT_MAX_BYTES."""
+    now = time.time()
+    expired = evicted = freed = 0
+
+    if WORK_DIR.exists():
+        for path in WORK_DIR.iterdir():
+            if now - path.stat().st_mtime > WORK_DIR_STALE_AFTER:
+                shutil.rmtree(path, ignore_errors=True)
+
+    artifacts = sorted(_managed_artifacts(), key=lambda item: item[0])
+    kept = []
+    for mtime, size, paths in artifacts:
+        if now - mtime > ARTIFACT_TTL:
+            _remove(paths)
+            expired += 1
+            freed += size
+        else:
+            kept.append((mtime, size, paths))
+
+    total = sum(size for _, size, _ in kept)
+    for mtime, size, paths in kept:
+        if total <= ARTIFACT_MAX_BYTES:
+            break
+        _remove(paths)
+        evicted += 1
+        freed += size
+        total -= size
+
+    with _stats_lock:
+        _stats["expired"] += expired
+        _stats["evicted"] += evicted
+        _stats["freed_bytes"] += freed
+    if expired or evicted:
+        print(f"Artefatos do writer: {expired} vencidos e {evicted} descartados ({freed} bytes).")
+    return {"expired": expired, "evicted": evicted, "freed_bytes": freed}
+
+
+def maybe_collect_garbage() -> None:
+    """Roda o coletor no máximo uma vez a cada ARTIFACT_GC_INTERVAL segundos."""
+    global _last_gc
+    with _gc_lock:
+        if _last_gc and time.monotonic() - _last_gc < ARTIFACT_GC_INTERVAL:
+            return
+        _last_gc = time.monotonic()
+    try:
+        collect_garbage()
+    except OSError as e:
+        print(f"Falha na limpeza dos artefatos do writer: {e}")
+
+
+def artifact_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    artifacts = _managed_artifacts()
+    stats["artifacts"] = len(artifacts)
+    stats["bytes"] = sum(size for _, size, _ in artifacts)
+    stats["max_bytes"] = ARTIFACT_MAX_BYTES
+    return stats
@@ -0,0 +1,283 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from core.cache import SingleFlight
+
+# Serviço de compilação LaTeX do writer:
+#   1. cache de PDFs pelo hash do .tex final (documento idêntico não recompila);
+#   2. formato pré-compilado (.fmt) do preâmbulo fixo, para não recarregar
+#      amsmath, babel, fontenc... a cada compilação (pacote mylatexformat);
+#   3. número limitado de pdflatex simultâneos, cada um com timeout;
+#   4. os PDFs e formatos do cache saem por idade (sem uso) e por espaço total.
+# Qualquer falha no formato cai na compilação normal.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LATEX_CACHE_DIR = Path(os.getenv("LATEX_CACHE_DIR", str(BASE_DIR / ".cache" / "latex")))
+LATEX_COMPILER = os.getenv("LATEX_COMPILER", "pdflatex")
+LATEX_TIMEOUT = float(os.getenv("LATEX_TIMEOUT", "60"))
+LATEX_MAX_CONCURRENT = int(os.getenv("LATEX_MAX_CONCURRENT", "2"))
+LATEX_USE_FORMAT = os.getenv("LATEX_USE_FORMAT", "true").lower() in ("1", "true", "yes")
+LATEX_CACHE_TTL = float(os.getenv("LATEX_CACHE_TTL", str(7 * 24 * 3600)))
+LATEX_CACHE_MAX_BYTES = int(os.getenv("LATEX_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+LATEX_CACHE_GC_INTERVAL = float(os.getenv("LATEX_CACHE_GC_INTERVAL", "300"))
+CACHE_SUBDIRS = ("pdf", "formats")
+
+# Pacotes que não podem ir para o formato: são carregados depois do \endofdump
+FORMAT_EXCLUDED_PACKAGES = ("hyperref",)
+
+_compile_slots = threading.BoundedSemaphore(LATEX_MAX_CONCURRENT)
+_compile_flight = SingleFlight("latex_compile")
+_format_lock = threading.Lock()
+_failed_formats = set()
+_stats_lock = threading.Lock()
+_stats = {"cache_hits": 0, "compiles": 0, "failures": 0, "timeouts": 0,
+          "format_builds": 0, "format_compiles": 0, "compile_time": 0.0,
+          "cache_expired": 0, "cache_evicted": 0, "cache_freed_bytes": 0}
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def _count(key: str, amount=1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def _touch(path: Path) -> None:
+    """Marca o arquivo do cache como usado agora (a limpeza descarta os sem uso há mais tempo)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _cached_files() -> list:
+    """Arquivos do cache (PDFs e formatos) como (mtime, bytes, caminho)."""
+    files = []
+    for subdir in CACHE_SUBDIRS:
+        directory = LATEX_CACHE_DIR / subdir
+        if not directory.exists():
+            continue
+        for path in directory.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                files.append((stat.st_mtime, stat.st_size, path))
+    return files
+
+
+def collect_cache_garbage() -> dict:
+    """Remove PDFs e formatos sem uso há mais de LATEX_CACHE_TTL, depois os mais antigos até caber em LATEX_CACHE_MAX_BYTES."""
+    now = time.time()
+    expired = evicted = freed = 0
+    kept = []
+    for mtime, size, path in sorted(_cached_files(), key=lambda item: item[0]):
+        if now - mtime > LATEX_CACHE_TTL:
+            path.unlink(missing_ok=True)
+            expired += 1
+            freed += size
+        else:
+            kept.append((mtime, size, path))
+
+    total = sum(size for _, size, _ in kept)
+    for mtime, size, path in kept:
+        if total <= LATEX_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        evicted += 1
+        freed += size
+        total -= size
+
+    with _stats_lock:
+        _stats["cache_expired"] += expired
+        _stats["cache_evicted"] += evicted
+        _stats["cache_freed_bytes"] += freed
+    if expired or evicted:
+        print(f"Cache LaTeX: {expired} vencidos e {evicted} descartados ({freed} bytes).")
+    return {"expired": expired, "evicted": evicted, "freed_bytes": freed}
+
+
+def maybe_collect_cache_garbage() -> None:
+    """Roda a limpeza do cache no máximo uma vez a cada LATEX_CACHE_GC_INTERVAL segundos."""
+    global _last_gc
+    with _gc_lock:
+        if _last_gc and time.monotonic() - _last_gc < LATEX_CACHE_GC_INTERVAL:
+            return
+        _last_gc = time.monotonic()
+    try:
+        collect_cache_garbage()
+    except OSError as e:
+        print(f"Falha na limpeza do cache LaTeX: {e}")
+
+
+def _split_preamble(source: str):
+    """Separa o preâmbulo (até \\begin{document}) do corpo. Retorna (None, source) se não houver."""
+    marker = "\\begin{document}"
+    position = source.find(marker)
+    if position == -1:
+        return None, source
+    return source[:position], source[position:]
+
+
+def _dump_point(preamble: str) -> int:
+    """Posição do primeiro \\usepackage que não pode ir para o formato (ou o fim do preâmbulo)."""
+    positions = [preamble.find(f"{{{name}}}") for name in FORMAT_EXCLUDED_PACKAGES]
+    positions = [preamble.rfind("\\usepackage", 0, p) for p in positions if p != -1]
+    positions = [p for p in positions if p != -1]
+    return min(positions) if positions else len(preamble)
+
+
+def _run(args, cwd: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        args,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        # errors='replace' troca caracteres inválidos do log em vez de travar
+        errors='replace',
+        timeout=LATEX_TIMEOUT,
+    )
+
+
+def _ensure_format(dumped_preamble: str) -> Optional[Path]:
+    """Caminho do .fmt para esse preâmbulo, gerando-o na primeira vez. None se não for possível."""
+    fmt_name = "pre_" + hashlib.sha256(dumped_preamble.encode("utf-8")).hexdigest()[:16]
+    fmt_path = LATEX_CACHE_DIR / "formats" / f"{fmt_name}.fmt"
+    if fmt_path.exists():
+        _touch(fmt_path)
+        return fmt_path
+    if fmt_name in _failed_formats:
+        return None
+
+    with _format_lock:
+        if fmt_path.exists():
+            return fmt_path
+        fmt_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="latex-fmt-") as work:
+            Path(work, "preamble.tex").write_text(dumped_preamble + "\\begin{document}\\end{document}\n", encoding="utf-8")
+            try:
+                process = _run(
+                    [LATEX_COMPILER, "-ini", "-interaction=nonstopmode", f"-jobname={fmt_name}",
+                     f"&{LATEX_COMPILER}", "mylatexformat.ltx", "preamble.tex"],
+                    cwd=work,
+                )
+            except (OSError, subprocess.TimeoutExpired) as e:
+                process = None
+                print(f"Falha ao gerar o formato do preâmbulo: {e}")
+            built = Path(work, f"{fmt_name}.fmt")
+            if process is None or process.returncode != 0 or not built.exists():
+                print("Formato do preâmbulo indisponível (mylatexformat?); compilando sem ele.")
+                _failed_formats.add(fmt_name)
+                return None
+            shutil.move(str(built), fmt_path)
+    _count("format_builds")
+    print(f"Formato do preâmbulo gerado: {fmt_path.name}")
+    return fmt_path
+
+
+def _compile(source: str, sha: str) -> Optional[Path]:
+    """Compila o documento num diretório temporário e guarda o PDF no cache."""
+    cached_pdf = LATEX_CACHE_DIR / "pdf" / f"{sha}.pdf"
+    if cached_pdf.exists():
+        _count("cache_hits")
+        _touch(cached_pdf)
+        return cached_pdf
+
+    preamble, body = _split_preamble(source)
+    fmt_path = None
+    compile_source = source
+    if LATEX_USE_FORMAT and preamble is not None:
+        dump_at = _dump_point(preamble)
+        fmt_path = _ensure_format(preamble[:dump_at])
+        if fmt_path is not None:
+            # O formato já contém o preâmbulo até o \endofdump; o resto é lido normalmente
+            compile_source = (f"%&{fmt_path.stem}\n" + preamble[:dump_at] + "\\endofdump\n"
+                              + preamble[dump_at:] + body)
+
+    with _compile_slots, tempfile.TemporaryDirectory(prefix="latex-") as work:
+        Path(work, "document.tex").write_text(compile_source, encoding="utf-8")
+        args = [LATEX_COMPILER, "-interaction=nonstopmode"]
+        if fmt_path is not None:
+            try:
+                shutil.copy(fmt_path, work)
+                args.append(f"-fmt={fmt_path.stem}")
+            except FileNotFoundError:
+                # O formato saiu do cache entre a geração e a cópia: compila sem ele
+                fmt_path = None
+                Path(work, "document.tex").write_text(source, encoding="utf-8")
+        args.append("document.tex")
+
+        started = time.perf_counter()
+        try:
+            process = _run(args, cwd=work)
+        except subprocess.TimeoutExpired:
+            _count("timeouts")
+            print(f"Compilação LaTeX passou de {LATEX_TIMEOUT:.0f}s e foi interrompida.")
+            return None
+        finally:
+            _count("compile_time", time.perf_counter() - started)
+        _count("compiles")
+        if fmt_path is not None:
+            _count("format_compiles")
+
+        pdf = Path(work, "document.pdf")
+        if process.returncode != 0 or not pdf.exists():
+            _count("failures")
+            print("=" * 30)
+            print("ERRO DE COMPILAÇÃO LATEX (LOG):")
+            # Mostra as últimas 20 linhas do erro para debug
+            print('\n'.join(process.stdout.splitlines()[-20:]))
+            print("=" * 30)
+            return None
+
+        cached_pdf.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(pdf), cached_pdf)
+    maybe_collect_cache_garbage()
+    return cached_pdf
+
+
+def compile_tex(source: str, output_pdf: str) -> Optional[str]:
+    """
+    Compila o código LaTeX completo e grava o PDF em output_pdf.
+    Documentos idênticos (mesmo hash) são servidos do cache; compilações
+    idênticas simultâneas são feitas uma vez só. Retorna output_pdf ou None.
+    """
+    if shutil.which(LATEX_COMPILER) is None:
+        print(f"Compilador LaTeX '{LATEX_COMPILER}' não encontrado no PATH.")
+        return None
+
+    sha = hashlib.sha256(f"{LATEX_COMPILER}\n{source}".encode("utf-8")).hexdigest()
+    cached_pdf = _compile_flight.do(sha, _compile, source, sha)
+    if cached_pdf is None:
+        return None
+    try:
+        shutil.copyfile(cached_pdf, output_pdf)
+    except FileNotFoundError:
+        # Descartado pela limpeza do cache logo depois de compilado: compila de novo
+        cached_pdf = _compile_flight.do(sha, _compile, source, sha)
+        if cached_pdf is None:
+            return None
+        shutil.copyfile(cached_pdf, output_pdf)
+    return output_pdf
+
+
+def latex_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["compile_time"] = round(stats["compile_time"], 3)
+    stats["max_concurrent"] = LATEX_MAX_CONCURRENT
+    files = _cached_files()
+    stats["cache_files"] = len(files)
+    stats["cache_bytes"] = sum(size for _, size, _ in files)
+    stats["cache_max_bytes"] = LATEX_CACHE_MAX_BYTES
+    return stats
@@ -1,3 +1,27 @@
 from django.db import models
 
-# Create your models here.
+
+class StyleExemplar(models.Model):
+    """
+    Descrição e exemplo LaTeX (few-shot) de um estilo de formatação, gerado uma vez
+    pelo Gemini e reaproveitado, chaveado por (estilo normalizado, versão do prompt).
+    """
+    style_key = models.CharField(max_length=200)
+    style = models.CharField(max_length=200)
+    prompt_version = models.CharField(max_length=20)
+    model_name = models.CharField(max_length=100)
+    exemplar = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['style_key', 'prompt_version'],
+                name='unique_style_exemplar_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.style} v{self.prompt_version}"
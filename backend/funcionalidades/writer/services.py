@@ -3,12 +3,16 @@ import re
 from dotenv import load_dotenv
 import google.generativeai as genai
 from pathlib import Path
-from typing import Optional
-from PyPDF2 import PdfReader
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from pylatex import Document, Command, Package
 from pylatex.utils import NoEscape
-import subprocess
-from pathlib import Path
+from core import ratelimit
+from core.pdf import extract_pdf_text
+from analyzer.chunking import SECTION_HEADING, split_text_into_chunks
+from writer.artifacts import job_workdir, safe_name, store
+from writer.latex import compile_tex
+from writer.style_exemplars import FEWSHOT_MODEL_NAME, get_style_exemplar
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -36,13 +40,14 @@ def limpar_resposta_ia(texto: str) -> str:
     return texto.strip()
 
 def decide_fewshot(style: str) -> str:
-    """Gera um exemplo curto para guiar a IA."""
+    """Gera um exemplo curto para guiar a IA (use get_style_exemplar, que guarda o resultado)."""
     prompt = f"""
         Descreva o estilo {style}. Forneça um exemplo de SEÇÃO e uma EQUAÇÃO matemática (usando \\begin{{equation}})
         válidos para LaTeX. Não inclua cabeçalhos.
     """
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.BACKGROUND)
+        model = genai.GenerativeModel(FEWSHOT_MODEL_NAME)
         response = model.generate_content(prompt)
         return response.text
     except:
@@ -56,9 +61,7 @@ def extract_text_from_file(uploaded_file):
         text = ""
         
         if filename_lower.endswith('.pdf'):
-            reader = PdfReader(uploaded_file)
-            parts = [page.extract_text() for page in reader.pages if page.extract_text()]
-            text = '\n'.join(parts)
+            text = extract_pdf_text(uploaded_file, separator='\n')['text']
         elif filename_lower.endswith('.txt'):
             text = uploaded_file.read().decode('utf-8')
         
@@ -67,13 +70,13 @@ def extract_text_from_file(uploaded_file):
         print(f"Erro na extração: {e}")
         return None
 
-def convert_text_to_latex_file(conteudo_limpo: str, filename) -> str:
-    """Salva o conteúdo LIMPO em um arquivo .tex temporário."""
-    base_dir = Path(__file__).resolve().parent.parent
-    folder_path = base_dir / 'arquivos'
+def convert_text_to_latex_file(conteudo_limpo: str, filename, folder_path: Optional[Path] = None) -> str:
+    """Salva o conteúdo LIMPO em um arquivo .tex temporário (por padrão, na pasta arquivos/)."""
+    if folder_path is None:
+        folder_path = Path(__file__).resolve().parent.parent / 'arquivos'
     folder_path.mkdir(parents=True, exist_ok=True)
     
-    filename = filename.replace(' ', '_')
+    filename = safe_name(filename)
     output_path = folder_path / f'{filename}_temp.tex'
     
     try:
@@ -86,7 +89,7 @@ def convert_text_to_latex_file(conteudo_limpo: str, filename) -> str:
         return ""
 
 def convert_tex_file_to_pdf(tex_file_path: str) -> Optional[str]:
-    """Usa PyLaTeX para gerar o .tex e subprocess para compilar o PDF (seguro contra erros de encoding)."""
+    """Usa PyLaTeX para gerar o .tex e o writer.latex para compilar o PDF (com cache e timeout)."""
     try:
         # Configurações de Geometria e Documento
         geometry_options = {"tmargin": "2.5cm", "lmargin": "3cm", "rmargin": "2cm", "bmargin": "2.5cm"}
@@ -118,73 +121,109 @@ def convert_tex_file_to_pdf(tex_file_path: str) -> Optional[str]:
         # 1. Gera apenas o arquivo .tex final (estrutura + conteúdo)
         # O PyLaTeX adiciona .tex automaticamente, então passamos sem extensão
         doc.generate_tex(base_filename)
-        
-        # 2. Compilação Manual Robusta
-        # Define diretório de trabalho e nome do arquivo
-        working_dir = os.path.dirname(os.path.abspath(base_filename))
-        tex_filename = os.path.basename(base_filename) + ".tex"
-        pdf_filename = os.path.basename(base_filename) + ".pdf"
-        full_pdf_path = os.path.join(working_dir, pdf_filename)
+        with open(base_filename + ".tex", 'r', encoding='utf-8') as f:
+            tex_source = f.read()
 
-        print(f"Iniciando compilação manual do arquivo: {tex_filename}...")
-
-        # Comando do pdflatex
-        cmd = ['pdflatex', '-interaction=nonstopmode', tex_filename]
-        
-        # Executa o processo
-        # errors='replace' é o segredo: troca caracteres inválidos do log por  em vez de travar
-        process = subprocess.run(
-            cmd,
-            cwd=working_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='replace' 
-        )
-
-        if process.returncode == 0:
-            if os.path.exists(full_pdf_path):
-                print(f"PDF gerado com sucesso: {full_pdf_path}")
-                return full_pdf_path
-        else:
-            print("="*30)
-            print("ERRO DE COMPILAÇÃO LATEX (LOG):")
-            # Mostra as últimas 20 linhas do erro para debug
-            print('\n'.join(process.stdout.splitlines()[-20:]))
-            print("="*30)
-            return None
-            
+        # 2. Compilação: o PDF fica em cache pelo hash do .tex final, e o preâmbulo
+        # fixo acima é pré-compilado uma vez em um formato (.fmt)
+        full_pdf_path = os.path.abspath(base_filename + ".pdf")
+        print(f"Iniciando compilação do arquivo: {os.path.basename(base_filename)}.tex...")
+        if compile_tex(tex_source, full_pdf_path):
+            print(f"PDF gerado com sucesso: {full_pdf_path}")
+            return full_pdf_path
         return None
-        
+
     except Exception as e:
         print("="*30)
         print(f"ERRO GERAL NO PROCESSO: {e}")
         print("="*30)
         return None
-        
-    except Exception as e:
-        print("="*30)
-        print(f"ERRO DE COMPILAÇÃO LATEX: {e}")
-        print("DICA: Abra o arquivo .log na pasta 'arquivos' para ver o erro detalhado.")
-        print("="*30)
-        return None
+
+LATEX_ENV = re.compile(r"\\(begin|end)\s*\{([^}]*)\}")
+
+def _sem_comentarios(texto: str) -> str:
+    """
+    Remove comentários LaTeX (% até o fim da linha), mantendo o \\% escapado. Um % depois
+    de um número par de barras (ex.: \\\\% = quebra de linha + comentário) começa um comentário.
+    """
+    return re.sub(r"(?<!\\)((?:\\\\)*)%.*", r"\1", texto)
 
 def validar_balanceamento_latex(texto: str) -> bool:
-    """Verifica se o número de begins e ends parece correto."""
-    num_begin = texto.count("\\begin{")
-    num_end = texto.count("\\end{")
-    
-    if num_begin != num_end:
-        print(f"AVISO: O código gerado parece desbalanceado! \\begin: {num_begin}, \\end: {num_end}")
-        # Se quiser ser agressivo, retorne False para nem tentar compilar
-        # return False 
+    """
+    Verifica se o fragmento LaTeX está bem formado: cada \\begin{x} fechado pelo
+    \\end{x} correspondente na ordem certa, chaves balanceadas e $ de math em par.
+    """
+    texto = _sem_comentarios(texto)
+    problemas = []
+
+    pilha = []
+    for comando, ambiente in LATEX_ENV.findall(texto):
+        if comando == "begin":
+            pilha.append(ambiente)
+        elif pilha and pilha[-1] == ambiente:
+            pilha.pop()
+        else:
+            aberto = pilha[-1] if pilha else "nenhum"
+            problemas.append(f"\\end{{{ambiente}}} fecha '{aberto}'")
+            break
+    if pilha and not problemas:
+        problemas.append(f"ambientes não fechados: {', '.join(pilha)}")
+
+    # \{ e \} são chaves literais; \\ é quebra de linha
+    sem_escapes = re.sub(r"\\[\\{}$]", "", texto)
+    profundidade = 0
+    for caractere in sem_escapes:
+        if caractere == "{":
+            profundidade += 1
+        elif caractere == "}":
+            profundidade -= 1
+            if profundidade < 0:
+                break
+    if profundidade != 0:
+        problemas.append("chaves desbalanceadas")
+    if sem_escapes.count("$") % 2:
+        problemas.append("$ sem par")
+
+    if problemas:
+        print(f"AVISO: O código gerado parece desbalanceado! {'; '.join(problemas)}")
+        return False
     return True
 
-def format_text_with_gemini(input_text, style, filename) -> dict:
-    few_shot = decide_fewshot(style)
-    
-    prompt = f"""
+# Textos longos são convertidos por seções, em paralelo; cada trecho é validado
+# e só o trecho inválido é pedido de novo.
+FORMAT_MODEL_NAME = "gemini-2.5-flash"
+FORMAT_CHUNK_CHARS = int(os.getenv("FORMAT_CHUNK_CHARS", "12000"))
+FORMAT_CHUNK_RETRIES = int(os.getenv("FORMAT_CHUNK_RETRIES", "2"))
+_format_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FORMAT_WORKERS", "4")),
+    thread_name_prefix="format-chunk",
+)
+
+def _split_sections(input_text: str) -> List[str]:
+    """Divide o texto em trechos que começam, sempre que possível, num título de seção."""
+    linhas = []
+    for linha in input_text.splitlines():
+        # O PDF vem com uma linha por linha do texto: separa os títulos para o chunking
+        if len(linha.strip()) <= 80 and SECTION_HEADING.match(linha):
+            linhas.append("")
+        linhas.append(linha)
+    return split_text_into_chunks("\n".join(linhas), max_chars=FORMAT_CHUNK_CHARS)
+
+def _format_prompt(chunk: str, few_shot: str, index: int, total: int, retry: bool) -> str:
+    parte = ""
+    if total > 1:
+        parte = f"""
+        15. This is PART {index} OF {total} of a longer document; the parts are converted separately and concatenated.
+            Convert ONLY this part. Do not add a title, abstract or conclusion that is not in this part.
+            The part may start or end in the middle of a section: do not invent section headings for it.
+        """
+    if retry:
+        parte += """
+        IMPORTANT: A previous answer for this text was rejected because its LaTeX was not balanced
+        (an environment left open or closed in the wrong order, unbalanced braces or an unpaired $).
+        Check every \\begin/\\end pair, every brace and every $ before answering.
+        """
+    return f"""
         You are a LaTeX formatting specialist. Your task is to convert the text below into LaTeX.
 
         STRICT RULES (To avoid breaking the compiler):
@@ -207,41 +246,80 @@ def format_text_with_gemini(input_text, style, filename) -> dict:
             - `$` becomes `\\$`
             - `#` becomes `\\#`
         14. Desired style: {few_shot}.
-        
+        {parte}
         Original Text:
-        {input_text[:50000]}
+        {chunk}
 
         The API must translate the final response into Portuguese.
     """
-    
+
+def _convert_chunk(chunk: str, few_shot: str, index: int, total: int) -> str:
+    """
+    Converte um trecho para LaTeX, repetindo só este trecho se o resultado vier
+    desbalanceado ou se a chamada falhar (429, timeout, resposta bloqueada ou vazia).
+    """
+    model = genai.GenerativeModel(FORMAT_MODEL_NAME)
+    texto_limpo = ""
+    ultimo_erro = None
+    for tentativa in range(FORMAT_CHUNK_RETRIES + 1):
+        try:
+            ratelimit.acquire("gemini", os.getenv("GOOGLE_API_KEY"), level=ratelimit.BACKGROUND)
+            response = model.generate_content(_format_prompt(chunk, few_shot, index, total, retry=tentativa > 0))
+            # response.text levanta ValueError quando o candidato foi bloqueado ou veio sem partes
+            texto = response.text
+        except Exception as e:
+            ultimo_erro = e
+            print(f"Erro ao converter o trecho {index}/{total} (tentativa {tentativa + 1}): {e}")
+            continue
+        if not texto:
+            continue
+        # Limpa a resposta (remove markdown, documentclass duplicado, etc)
+        texto_limpo = limpar_resposta_ia(texto)
+        if validar_balanceamento_latex(texto_limpo):
+            return texto_limpo
+        print(f"Trecho {index}/{total} desbalanceado (tentativa {tentativa + 1}).")
+    if not texto_limpo:
+        detalhe = f": {ultimo_erro}" if ultimo_erro else ""
+        raise ValueError(f"O modelo não converteu o trecho {index}/{total}{detalhe}")
+    # Esgotadas as tentativas, segue com a última versão (o pdflatex roda em nonstopmode)
+    return texto_limpo
+
+def format_text_with_gemini(input_text, style, filename) -> dict:
+    # Exemplo do estilo vem do cache (ou dos estilos conhecidos); o Gemini só é chamado para estilos novos
+    few_shot = get_style_exemplar(style, decide_fewshot)
+
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        
-        if not response.text: return None
-        
-        print("IA gerou texto. Limpando e compilando...")
-        
-        # 1. Limpa a resposta (remove markdown, documentclass duplicado, etc)
-        texto_limpo = limpar_resposta_ia(response.text)
-        # Validação simples (apenas printa aviso no console por enquanto)
+        chunks = _split_sections(input_text or "")
+        if not chunks:
+            return {"success": False, "error": "Texto vazio para formatar."}
+        total = len(chunks)
+        print(f"Convertendo {total} trecho(s) para LaTeX em paralelo...")
+
+        # 1. Converte os trechos em paralelo; o map devolve na ordem original
+        fragmentos = list(_format_executor.map(
+            _convert_chunk, chunks, [few_shot] * total, range(1, total + 1), [total] * total
+        ))
+        texto_limpo = "\n\n".join(fragmentos)
+        print("IA gerou texto. Compilando...")
         validar_balanceamento_latex(texto_limpo)
 
-        # 2. Salva o .tex
-        caminho_tex = convert_text_to_latex_file(texto_limpo, filename)
-        
-        # 3. Compila para gerar o PDF
-        caminho_pdf = convert_tex_file_to_pdf(caminho_tex)
-        
-        if caminho_pdf and os.path.exists(caminho_pdf):
-            # RETORNA UM DICIONÁRIO
-            return {
-                "success": True,
-                "base_filename": os.path.basename(caminho_pdf).replace('.pdf', '')
-            }
-        else:
-             return {"success": False, "error": "Erro na compilação do PDF"}
+        # Pasta exclusiva desta formatação: uploads com o mesmo nome não colidem
+        with job_workdir() as pasta_trabalho:
+            # 2. Salva o .tex
+            caminho_tex = convert_text_to_latex_file(texto_limpo, filename, pasta_trabalho)
+
+            # 3. Compila para gerar o PDF
+            caminho_pdf = convert_tex_file_to_pdf(caminho_tex)
+
+            if not (caminho_pdf and os.path.exists(caminho_pdf)):
+                return {"success": False, "error": "Erro na compilação do PDF"}
+
+            # 4. Guarda o .tex e o .pdf finais (nome com o hash do conteúdo)
+            nome_artefato = store(caminho_tex.replace('_temp.tex', '.tex'), caminho_pdf, filename)
+
+        # RETORNA UM DICIONÁRIO
+        return {"success": True, "base_filename": nome_artefato}
 
     except Exception as e:
         print(f"Erro no fluxo Gemini: {e}")
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "error": str(e)}
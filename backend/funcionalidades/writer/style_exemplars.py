@@ -0,0 +1,189 @@
+import os
+import threading
+from datetime import timedelta
+from typing import Callable
+
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.cache import SingleFlight, normalize_query
+from writer.models import StyleExemplar
+
+# Exemplos de estilo (few-shot) usados pelo format_text_with_gemini. O exemplo só
+# depende do nome do estilo, então não há motivo para pedir um novo ao Gemini a cada
+# formatação: os estilos conhecidos já vêm prontos abaixo e os demais são gerados
+# uma vez e guardados na tabela writer_styleexemplar.
+
+# Incremente ao mudar o prompt do decide_fewshot: exemplos antigos são descartados
+FEWSHOT_PROMPT_VERSION = "1"
+FEWSHOT_MODEL_NAME = "gemini-2.0-flash"
+STYLE_EXEMPLAR_TTL = float(os.getenv("STYLE_EXEMPLAR_TTL", str(30 * 24 * 3600)))
+STYLE_EXEMPLAR_MAX_ENTRIES = int(os.getenv("STYLE_EXEMPLAR_MAX_ENTRIES", "200"))
+
+_EQUATION = r"""\begin{equation}
+    \mathcal{L}(\theta) = -\frac{1}{N} \sum_{i=1}^{N} \log p_\theta(y_i \mid x_i)
+    \label{eq:perda}
+\end{equation}"""
+
+BUILTIN_EXEMPLARS = {
+    "ieee": (
+        "Estilo IEEE (conferências e periódicos): texto em duas colunas, títulos de seção numerados "
+        "em algarismos romanos e caixa alta (I. INTRODUÇÃO), subseções com letras (A., B.), "
+        "referências numéricas entre colchetes [1] e equações numeradas à direita.\n"
+        "\\section{Introdução}\n"
+        "Modelos de linguagem vêm sendo aplicados à análise de artigos científicos [1], [2].\n"
+        "\\subsection{Formulação do Problema}\n"
+        "O treinamento minimiza a perda da Eq.~\\eqref{eq:perda}:\n" + _EQUATION
+    ),
+    "acm": (
+        "Estilo ACM (acmart): títulos de seção numerados em algarismos arábicos e caixa alta, "
+        "resumo antes da introdução, citações numéricas entre colchetes [1] e equações numeradas.\n"
+        "\\section{Introdução}\n"
+        "Trabalhos recentes exploram a recomendação de artigos a partir de citações [1].\n"
+        "\\subsection{Modelo}\n"
+        "Definimos a função objetivo na Equação~\\ref{eq:perda}:\n" + _EQUATION
+    ),
+    "sbc": (
+        "Estilo SBC (Sociedade Brasileira de Computação): coluna única, seções numeradas em algarismos "
+        "arábicos (1. Introdução), resumo e abstract no início, citações no formato autor-ano "
+        "[Silva 2020] e equações numeradas.\n"
+        "\\section{Introdução}\n"
+        "A busca de artigos relevantes é uma etapa custosa da pesquisa [Silva 2020].\n"
+        "\\subsection{Metodologia}\n"
+        "A perda utilizada no treinamento é dada por:\n" + _EQUATION
+    ),
+    "abnt": (
+        "Estilo ABNT (NBR 14724/6023): coluna única, seções numeradas progressivamente (1, 1.1, 1.1.1), "
+        "títulos de seção em caixa alta, citações autor-data (SILVA, 2020) e equações numeradas.\n"
+        "\\section{INTRODUÇÃO}\n"
+        "Segundo Silva (2020), a revisão sistemática exige critérios explícitos de seleção.\n"
+        "\\subsection{Objetivos}\n"
+        "O critério de otimização adotado é apresentado na Equação~\\ref{eq:perda}:\n" + _EQUATION
+    ),
+    "aaai": (
+        "Estilo AAAI: duas colunas, seções numeradas sem caixa alta, citações autor-ano "
+        "(Silva et al. 2020) e equações numeradas; sem cabeçalhos ou rodapés personalizados.\n"
+        "\\section{Introdução}\n"
+        "Agentes baseados em modelos de linguagem podem auxiliar revisões da literatura (Silva et al. 2020).\n"
+        "\\section{Método}\n"
+        "O modelo é ajustado minimizando:\n" + _EQUATION
+    ),
+    "springer lncs": (
+        "Estilo Springer LNCS (llncs): coluna única, seções numeradas (1 Introdução), subseções em "
+        "negrito (1.1), citações numéricas entre colchetes [1] e equações numeradas.\n"
+        "\\section{Introdução}\n"
+        "A extração de informação de artigos científicos foi estudada em diversos contextos [1].\n"
+        "\\subsection{Definições}\n"
+        "Seja $\\theta$ o conjunto de parâmetros do modelo; a perda é:\n" + _EQUATION
+    ),
+}
+
+# Nomes alternativos (já normalizados) para os estilos conhecidos
+STYLE_ALIASES = {
+    "ieee conference": "ieee",
+    "ieee conference template": "ieee",
+    "ieeetran": "ieee",
+    "acm sigconf": "acm",
+    "acmart": "acm",
+    "sbc template": "sbc",
+    "abnt nbr 14724": "abnt",
+    "aaai conference": "aaai",
+    "lncs": "springer lncs",
+    "springer": "springer lncs",
+}
+
+_lock = threading.Lock()
+_counters = {"builtin_hits": 0, "hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+_purged_versions = set()
+_generate_flight = SingleFlight("style_exemplars")
+
+
+def style_key(style: str) -> str:
+    key = normalize_query(style)
+    return STYLE_ALIASES.get(key, key)
+
+
+def _count(key: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[key] += amount
+
+
+def _lookup(key: str):
+    entry = StyleExemplar.objects.filter(
+        style_key=key, prompt_version=FEWSHOT_PROMPT_VERSION,
+        created_at__gte=timezone.now() - timedelta(seconds=STYLE_EXEMPLAR_TTL),
+    ).only("id", "exemplar").first()
+    if entry is not None:
+        StyleExemplar.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    return entry
+
+
+def _store(key: str, style: str, exemplar: str) -> None:
+    StyleExemplar.objects.update_or_create(
+        style_key=key, prompt_version=FEWSHOT_PROMPT_VERSION,
+        # created_at é auto_now_add: sem renová-lo aqui, um exemplo vencido nunca voltaria a valer
+        defaults={"style": style[:200], "model_name": FEWSHOT_MODEL_NAME, "exemplar": exemplar,
+                  "created_at": timezone.now()},
+    )
+    _count("stores")
+    removed = 0
+    if FEWSHOT_PROMPT_VERSION not in _purged_versions:
+        # Exemplos de versões antigas do prompt nunca mais serão usados
+        removed, _ = StyleExemplar.objects.exclude(prompt_version=FEWSHOT_PROMPT_VERSION).delete()
+        _purged_versions.add(FEWSHOT_PROMPT_VERSION)
+    # Descarta os menos usados recentemente além do limite
+    stale = StyleExemplar.objects.order_by("-last_used_at").values_list("pk", flat=True)[STYLE_EXEMPLAR_MAX_ENTRIES:]
+    stale = list(stale)
+    if stale:
+        removed += StyleExemplar.objects.filter(pk__in=stale).delete()[0]
+    if removed:
+        _count("evicted", removed)
+
+
+def _generate(key: str, style: str, generate: Callable[[str], str]) -> str:
+    try:
+        entry = _lookup(key)
+    except DatabaseError as e:
+        print(f"Exemplos de estilo indisponíveis: {e}")
+        entry = None
+    if entry is not None:
+        _count("hits")
+        return entry.exemplar
+
+    _count("misses")
+    exemplar = generate(style)
+    if exemplar:
+        try:
+            _store(key, style, exemplar)
+        except DatabaseError as e:
+            print(f"Falha ao salvar exemplo de estilo: {e}")
+    return exemplar
+
+
+def get_style_exemplar(style: str, generate: Callable[[str], str]) -> str:
+    """
+    Exemplo few-shot do estilo: pronto para os estilos conhecidos, do banco para os
+    já gerados e, na primeira vez, gerado com generate(style) e guardado.
+    Pedidos simultâneos do mesmo estilo novo geram o exemplo uma vez só.
+    """
+    key = style_key(style)
+    if key in BUILTIN_EXEMPLARS:
+        _count("builtin_hits")
+        return BUILTIN_EXEMPLARS[key]
+    if not key:
+        return ""
+    return _generate_flight.do(key, _generate, key, style, generate)
+
+
+def style_exemplar_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    stats["builtin_styles"] = len(BUILTIN_EXEMPLARS)
+    try:
+        aggregate = StyleExemplar.objects.aggregate(total_hits=Sum("hits"))
+        stats["entries"] = StyleExemplar.objects.count()
+        stats["lifetime_hits"] = aggregate["total_hits"] or 0
+    except DatabaseError:
+        pass
+    return stats
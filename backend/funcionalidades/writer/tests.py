@@ -1,3 +1,80 @@
-from django.test import TestCase
+from contextlib import redirect_stdout
+from io import StringIO
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from writer.services import _sem_comentarios, validar_balanceamento_latex
+
+
+class ValidarBalanceamentoLatexTests(SimpleTestCase):
+
+    def assertBalanceado(self, texto):
+        self.assertTrue(validar_balanceamento_latex(texto), texto)
+
+    def assertDesbalanceado(self, texto):
+        # O validador avisa no stdout; aqui só interessa o retorno
+        with redirect_stdout(StringIO()):
+            self.assertFalse(validar_balanceamento_latex(texto), texto)
+
+    def test_fragmento_bem_formado(self):
+        self.assertBalanceado(
+            "\\section{Introdução}\n"
+            "\\begin{itemize}\n\\item Um \\textbf{item} com $x^{2}$\n"
+            "\\begin{enumerate}\\item aninhado\\end{enumerate}\n\\end{itemize}\n"
+        )
+
+    def test_ambientes_fora_de_ordem(self):
+        self.assertDesbalanceado("\\begin{itemize}\\begin{enumerate}\\end{itemize}\\end{enumerate}")
+
+    def test_ambiente_nao_fechado(self):
+        self.assertDesbalanceado("\\begin{itemize}\\item a")
+
+    def test_end_sem_begin(self):
+        self.assertDesbalanceado("texto\\end{itemize}")
+
+    def test_chaves_escapadas_sao_literais(self):
+        self.assertBalanceado("o conjunto \\{1, 2\\} e \\textbf{negrito}")
+        self.assertBalanceado("só abre: \\{")
+
+    def test_chave_aberta_sem_par(self):
+        self.assertDesbalanceado("\\textbf{sem fechar")
+
+    def test_chave_fechada_antes_de_abrir(self):
+        self.assertDesbalanceado("}\\textbf{a")
+
+    def test_barra_dupla_antes_da_chave_nao_escapa(self):
+        # \\ é quebra de linha: a chave seguinte é de verdade
+        self.assertDesbalanceado("linha\\\\{")
+        self.assertBalanceado("linha\\\\{a}")
+
+    def test_percentual_escapado_nao_e_comentario(self):
+        self.assertDesbalanceado("50\\% de \\textbf{ganho")
+        self.assertBalanceado("50\\% de \\textbf{ganho}")
+
+    def test_comentario_e_ignorado(self):
+        self.assertBalanceado("\\textbf{a} % comentário com { e $ soltos\n")
+
+    def test_comentario_depois_de_quebra_de_linha(self):
+        self.assertBalanceado("fim da linha\\\\% comentário com {\n")
+
+    def test_math_com_cifrao_em_par(self):
+        self.assertBalanceado("a equação $E = mc^2$ e $\\alpha$")
+
+    def test_cifrao_sem_par(self):
+        self.assertDesbalanceado("custa $10 reais")
+
+    def test_cifrao_escapado(self):
+        self.assertBalanceado("custa \\$10 reais")
+
+
+class SemComentariosTests(SimpleTestCase):
+
+    def test_remove_ate_o_fim_da_linha(self):
+        self.assertEqual(_sem_comentarios("a % b\nc"), "a \nc")
+
+    def test_mantem_percentual_escapado(self):
+        self.assertEqual(_sem_comentarios("10\\% a mais"), "10\\% a mais")
+
+    def test_barras_pares_antes_do_percentual(self):
+        self.assertEqual(_sem_comentarios("a\\\\% b"), "a\\\\")
+        self.assertEqual(_sem_comentarios("a\\\\\\% b"), "a\\\\\\% b")
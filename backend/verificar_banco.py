@@ -1,21 +1,39 @@
-import sqlite3
 import os
+import sys
+
+# Usa a conexão do Django, então respeita o perfil de banco do settings (DB_ENGINE,
+# SQLITE_PATH, POSTGRES_*...) em vez de abrir o db.sqlite3 direto.
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'funcionalidades')
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'researchflow.settings')
+
+import django
+from django.db import DatabaseError, connection
+
+
+def describe_database():
+    settings = connection.settings_dict
+    print(f"🔌 Conectando ao banco de dados ({connection.vendor}): {settings['NAME']}")
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                cursor.execute(f"PRAGMA {pragma}")
+                print(f"   {pragma} = {cursor.fetchone()[0]}")
+    else:
+        print(f"   CONN_MAX_AGE = {settings['CONN_MAX_AGE']}, pool = {bool(settings['OPTIONS'].get('pool'))}")
 
-# Caminho para o banco de dados
-db_path = os.path.join(os.path.dirname(__file__), 'funcionalidades', 'db.sqlite3')
 
 def check_database():
-    print(f"🔌 Conectando ao banco de dados em: {db_path}")
-    
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
+        from django.contrib.auth.models import User
+        from favorites.models import Favorite
+
+        describe_database()
+
         # 1. Verificar Usuários
         print("\n--- 👤 Usuários Cadastrados ---")
-        cursor.execute("SELECT id, username, email, is_active FROM auth_user")
-        users = cursor.fetchall()
-        
+        users = list(User.objects.values_list('id', 'username', 'email', 'is_active'))
+
         if not users:
             print("⚠️ Nenhum usuário encontrado.")
         else:
@@ -27,13 +45,8 @@ def check_database():
         # 2. Verificar Favoritos
         print("\n--- ⭐ Artigos Salvos (Favoritos) ---")
         try:
-            cursor.execute("""
-                SELECT f.id, u.username, f.title, f.year 
-                FROM favorites_favorite f
-                JOIN auth_user u ON f.user_id = u.id
-            """)
-            favorites = cursor.fetchall()
-            
+            favorites = list(Favorite.objects.order_by('id').values_list('id', 'user__username', 'paper__title', 'paper__year'))
+
             if not favorites:
                 print("⚠️ Nenhum favorito salvo encontrado.")
             else:
@@ -41,14 +54,14 @@ def check_database():
                 print("-" * 60)
                 for fav in favorites:
                     print(f"{fav[0]:<5} {fav[1]:<15} {fav[3] or 'N/A':<6} {fav[2][:40]}...")
-        except sqlite3.OperationalError:
-            print("⚠️ A tabela de favoritos ainda não existe ou está vazia.")
+        except DatabaseError:
+            print("⚠️ A tabela de favoritos ainda não existe ou está vazia (rode o migrate).")
 
-        conn.close()
         print("\n✅ Verificação concluída com sucesso!")
-        
+
     except Exception as e:
         print(f"\n❌ Erro ao ler o banco de dados: {e}")
 
 if __name__ == "__main__":
+    django.setup()
     check_database()
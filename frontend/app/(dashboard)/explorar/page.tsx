@@ -229,7 +229,7 @@ export default function ExplorarPage() {
     const token = getToken()
     if (token) {
       try {
-        const res = await fetch(`${API_URL}/favorites/`, {
+        const res = await fetch(`${API_URL}/favorites/?fields=url`, {
           headers: { "Authorization": `Token ${token}` }
         })
         if (res.ok) {